@@ -4,13 +4,20 @@ from __future__ import annotations
 
 import logging
 
+from aiofiles.os import makedirs as aio_makedirs
 from google import genai
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 
 from . import agents
-from .const import CONF_API_KEY, DOMAIN
-from .storage import async_read_parsed_rulebook
+from .agents.budget import async_remove_prompt_stats
+from .automation_index import AutomationIndex
+from .const import CONF_API_KEY, DOMAIN, SESSIONS_DB_FILENAME, STORAGE_DIR
+from .entity_resolver import EntityResolver
+from .history import RulebookHistory
+from .interaction_layer import RegistrySnapshot
+from .sqlite_session_service import SqliteSessionService
+from .storage import async_get_parsed_rulebook_cache, async_read_parsed_rulebook
 from .types import RulebookConfigEntry, RulebookContext
 
 __all__ = [
@@ -32,9 +39,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: RulebookConfigEntry) ->
     # Register all agents
     llm_agent = await agents.async_create(hass, entry)
     client = genai.Client(api_key=entry.options[CONF_API_KEY])
+
+    # Conversations are persisted so they survive a restart
+    await aio_makedirs(hass.config.path(STORAGE_DIR, entry.entry_id), exist_ok=True)
+    session_service = SqliteSessionService(
+        hass, hass.config.path(STORAGE_DIR, entry.entry_id, SESSIONS_DB_FILENAME)
+    )
+    await session_service.async_setup()
+
+    history = RulebookHistory(hass, entry.entry_id)
+    await history.async_load()
+
+    registry_snapshot = RegistrySnapshot(hass)
+    entry.async_on_unload(registry_snapshot.async_start())
+    entity_resolver = EntityResolver(hass)
+    entry.async_on_unload(entity_resolver.async_start())
+    automation_index = AutomationIndex(hass)
+    entry.async_on_unload(automation_index.async_start())
+
     entry.runtime_data = RulebookContext(
         agent=llm_agent,
         client=client,
+        session_service=session_service,
+        history=history,
+        registry_snapshot=registry_snapshot,
+        entity_resolver=entity_resolver,
+        automation_index=automation_index,
     )
 
     await hass.config_entries.async_forward_entry_setups(
@@ -46,7 +76,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: RulebookConfigEntry) ->
 
 async def async_unload_entry(hass: HomeAssistant, entry: RulebookConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(
-        entry,
-        PLATFORMS,
-    )
+    async_get_parsed_rulebook_cache(hass).invalidate(entry.entry_id)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    await entry.runtime_data.session_service.async_close()
+    async_remove_prompt_stats(hass, entry.entry_id)
+    return True
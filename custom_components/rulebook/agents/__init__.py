@@ -2,14 +2,20 @@
 
 import logging
 from collections.abc import Callable
+from typing import Any
 
 from google.adk.agents import BaseAgent, LlmAgent
 from homeassistant.core import HomeAssistant
 
 from custom_components.rulebook.const import RULEBOOK_AGENT_ID
+from custom_components.rulebook.storage import async_read_rulebook_index
 from custom_components.rulebook.types import RulebookConfigEntry
 
 from .area_agent import async_create_agent as async_create_area_agent
+from .automation_agent import (
+    async_create_agent as async_create_automation_agent,
+)
+from .budget import async_get_prompt_stats
 from .const import AGENT_MODEL
 from .location_agent import (
     async_create_agent as async_create_location_agent,
@@ -17,6 +23,7 @@ from .location_agent import (
 from .person_agent import (
     async_create_agent as async_create_person_agent,
 )
+from .policy import INTERACTIVE_POLICY, generate_content_config
 from .rulebook_parser_agent import (
     async_create_agent as async_create_rulebook_parser_agent,
 )
@@ -28,6 +35,7 @@ _AGENT_FACTORIES: list[Callable[[HomeAssistant, RulebookConfigEntry], BaseAgent]
     async_create_area_agent,
     async_create_person_agent,
     async_create_location_agent,
+    async_create_automation_agent,
 ]
 
 
@@ -39,9 +47,46 @@ async def async_create(
 
     sub_agents_instances = [factory(hass, config_entry) for factory in _AGENT_FACTORIES]
 
+    async def resolve_entity_mentions_tool(mentions: list[str]) -> dict[str, Any]:
+        """Resolves mentions of devices or entities to Home Assistant entity ids.
+
+        Args:
+            mentions: Descriptions of devices or entities, e.g. 'porch light'.
+
+        Returns:
+            A dictionary mapping each mention to a list of candidate entities
+            with their 'entity_id', 'name', 'area' and 'score', best first.
+        """
+        resolver = config_entry.runtime_data.entity_resolver
+        return {
+            mention: [candidate.as_dict() for candidate in candidates]
+            for mention, candidates in resolver.resolve_all(mentions).items()
+        }
+
+    async def resolve_rulebook_entities_tool() -> dict[str, Any]:
+        """Resolves the entities mentioned in the rulebook's smart home rules.
+
+        Returns:
+            A dictionary mapping each entity mentioned in the smart home rules
+            to a list of candidate entities with their 'entity_id', 'name',
+            'area' and 'score', best first.
+        """
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "The rulebook has not been parsed yet.",
+            }
+        return await resolve_entity_mentions_tool(list(index.mentions))
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
     return LlmAgent(
         name="Coordinator",
         model=AGENT_MODEL,
-        description="I coordinate greetings and tasks, including rulebook parsing, area, person, and location management. After parsing the rulebook, review the output and determine if there were any significant changes that other sub-agents need to be made aware of. If so, inform the relevant sub-agents to take appropriate actions.",
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
+        description="I coordinate greetings and tasks, including rulebook parsing, area, person, location, and automation management. After parsing the rulebook, review the output and determine if there were any significant changes that other sub-agents need to be made aware of. If so, inform the relevant sub-agents to take appropriate actions.",
         sub_agents=sub_agents_instances,
+        tools=[resolve_entity_mentions_tool, resolve_rulebook_entities_tool],
     )
@@ -1,19 +1,22 @@
 """Agent for managing Home Assistant areas."""
 
 import logging
+from typing import Any
 
 from google.adk.agents import LlmAgent
 from homeassistant.core import HomeAssistant
 
-from custom_components.rulebook.data.home import ParsedHomeDetails
+from custom_components.rulebook.data.reconcile import reconcile
 from custom_components.rulebook.interaction_layer import (
     async_create_area,
-    async_get_areas,
+    async_create_areas,
 )
-from custom_components.rulebook.storage import async_read_parsed_rulebook
+from custom_components.rulebook.storage import async_read_rulebook_index
 from custom_components.rulebook.types import RulebookConfigEntry
 
+from .budget import async_get_prompt_stats
 from .const import AGENT_MODEL
+from .policy import INTERACTIVE_POLICY, generate_content_config
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,14 +34,37 @@ def async_create_agent(
         An LlmAgent instance for managing areas.
     """
 
-    async def get_areas_tool() -> list[dict[str, str | None]]:
+    async def get_areas_tool() -> dict[str, Any]:
         """Fetches all defined areas in Home Assistant.
 
         Returns:
-            A list of dictionaries, where each dictionary represents an area
-            and contains its 'name' and 'id'.
+            A dictionary with the 'version' of the areas and an 'areas' list,
+            where each item represents an area and contains its 'name', 'id' and
+            'aliases', the other names the area is known by.
         """
-        return await async_get_areas(hass)
+        snapshot = config_entry.runtime_data.registry_snapshot
+        return {"version": snapshot.version, "areas": snapshot.areas()}
+
+    async def get_area_changes_tool(since_version: int) -> dict[str, Any]:
+        """Fetches the areas that changed in Home Assistant since a version.
+
+        Args:
+            since_version: The 'version' returned by an earlier call to get_areas_tool
+                or get_area_changes_tool.
+
+        Returns:
+            A dictionary with the current 'version' and the 'changed' areas
+            and 'removed' area ids under 'areas'. If 'full' is true, all areas
+            are listed as changed.
+        """
+        changes = config_entry.runtime_data.registry_snapshot.changes_since(
+            since_version
+        )
+        return {
+            "version": changes["version"],
+            "full": changes["full"],
+            "areas": changes["areas"],
+        }
 
     async def get_rulebook_areas_tool() -> list[str] | None:
         """Fetches area mentions from the parsed rulebook.
@@ -46,13 +72,30 @@ def async_create_agent(
         Returns:
             A list of area names mentioned in the rulebook, or None if not found.
         """
-        parsed_rulebook: ParsedHomeDetails | None = await async_read_parsed_rulebook(
-            hass, config_entry.entry_id
-        )
-        if parsed_rulebook and parsed_rulebook.area_mentions:
-            return parsed_rulebook.area_mentions
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index and index.areas:
+            return list(index.areas)
         return None
 
+    async def get_area_alignment_report_tool() -> dict[str, Any]:
+        """Compares the areas in the rulebook with the areas in Home Assistant.
+
+        Returns:
+            A report with the 'matched' areas, 'likely_matches' with similar but
+            not equal names, the areas 'missing_in_home_assistant' that are only
+            mentioned in the rulebook and the areas 'missing_in_rulebook' that are
+            only defined in Home Assistant. 'aligned' is true if nothing differs.
+        """
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "The rulebook has not been parsed yet.",
+            }
+        snapshot = config_entry.runtime_data.registry_snapshot
+        report = reconcile(index.areas, snapshot.areas())
+        return {"version": snapshot.version, **report.as_dict()}
+
     async def create_home_assistant_area_tool_func(
         area_name: str,
     ) -> dict[str, str | None] | None:
@@ -66,9 +109,29 @@ def async_create_agent(
         """
         return await async_create_area(hass, area_name)
 
+    async def create_home_assistant_areas_tool(
+        area_names: list[str],
+    ) -> list[dict[str, Any]]:
+        """Creates several new areas in Home Assistant at once.
+
+        Areas that already exist are not created again.
+
+        Args:
+            area_names: The names of the areas to create.
+
+        Returns:
+            A list with the 'name', 'status' ('created', 'exists', 'duplicate' or
+            'error') and 'id' or 'error_message' of each requested area.
+        """
+        return await async_create_areas(hass, area_names)
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
     return LlmAgent(
         name="AreaManager",
         model=AGENT_MODEL,
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         description=(
             "Manages and answers questions about Home Assistant areas. "
             "Can list existing areas, compare them with the rulebook, and identify discrepancies."
@@ -77,18 +140,21 @@ def async_create_agent(
             "You are an expert in Home Assistant areas and the user's rulebook. "
             "Your goal is to help the user align their Home Assistant areas with their rulebook. "
             "When asked about areas, or to check area configurations: "
-            "1. Use the 'get_areas_tool' tool to fetch current area information from Home Assistant. "
-            "2. Use the 'get_rulebook_areas_tool' tool to fetch area names mentioned in the rulebook. "
-            "3. Compare these two lists of areas. "
-            "4. Report any discrepancies to the user. Specifically, tell them: "
-            "   - Which areas are mentioned in the rulebook but NOT defined in Home Assistant. "
-            "   - Which areas are defined in Home Assistant but NOT mentioned in the rulebook. "
-            "5. For areas mentioned in the rulebook but not in Home Assistant, you can offer to create them using the 'create_home_assistant_area_tool_func' tool. Ask for confirmation before creating an area. "
+            "1. Use the 'get_area_alignment_report_tool' tool to get a comparison of the areas in the rulebook and in Home Assistant. Do not compare the areas yourself. "
+            "2. Report any discrepancies to the user. Specifically, tell them: "
+            "   - Which areas are mentioned in the rulebook but NOT defined in Home Assistant ('missing_in_home_assistant'). "
+            "   - Which areas are defined in Home Assistant but NOT mentioned in the rulebook ('missing_in_rulebook'). "
+            "   - Which areas have similar but not identical names ('likely_matches'), and ask the user to confirm they are the same area. "
+            "3. Use the 'get_areas_tool', 'get_area_changes_tool' and 'get_rulebook_areas_tool' tools only to answer other questions about the areas. "
+            "4. For areas mentioned in the rulebook but not in Home Assistant, you can offer to create them. Ask for confirmation before creating areas. To create more than one area, use the 'create_home_assistant_areas_tool' tool once with all of the confirmed area names, otherwise use the 'create_home_assistant_area_tool_func' tool. "
             "Present this information clearly. If there are no discrepancies, inform the user that the areas are aligned."
         ),
         tools=[
             get_areas_tool,
+            get_area_changes_tool,
             get_rulebook_areas_tool,
+            get_area_alignment_report_tool,
             create_home_assistant_area_tool_func,
+            create_home_assistant_areas_tool,
         ],
     )
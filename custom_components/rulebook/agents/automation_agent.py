@@ -0,0 +1,221 @@
+"""Agent for creating Home Assistant automations from the rulebook."""
+
+import logging
+from typing import Any
+
+from google.adk.agents import LlmAgent
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import yaml as yaml_util
+
+from custom_components.rulebook.data.automation import compile_rules, rule_id
+from custom_components.rulebook.interaction_layer import AutomationsTransaction
+from custom_components.rulebook.storage import async_read_rulebook_index
+from custom_components.rulebook.types import RulebookConfigEntry
+
+from .budget import async_get_prompt_stats
+from .const import AGENT_MODEL
+from .policy import INTERACTIVE_POLICY, generate_content_config
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def async_create_agent(
+    hass: HomeAssistant, config_entry: RulebookConfigEntry
+) -> LlmAgent:
+    """Create an Automation agent.
+
+    Args:
+        hass: The Home Assistant instance.
+        config_entry: The configuration entry for the rulebook.
+
+    Returns:
+        An LlmAgent instance for creating automations.
+    """
+
+    async def compile_rulebook_automations_tool() -> dict[str, Any]:
+        """Compiles the rulebook's smart home rules into automation configs.
+
+        Rules with a common shape, such as turning a light on at sunset, at a time
+        of day or when motion is detected, are compiled from a template.
+
+        Returns:
+            A dictionary with a 'compiled' list of the 'rule_name', 'template' and
+            'automation' config of each compiled rule, and a 'needs_authoring' list
+            of the rules that match no template with the 'rule_name',
+            'rulebook_id', 'rule_raw_text', 'core_logic_text', the 'reason' it was
+            not compiled and the candidate 'entities' for each entity mentioned in
+            the rule.
+        """
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "The rulebook has not been parsed yet.",
+            }
+        resolver = config_entry.runtime_data.entity_resolver
+        result = compile_rules(
+            index.rules,
+            lambda mention: [entity.entity_id for entity in resolver.resolve(mention)],
+        )
+        _LOGGER.debug(
+            "Compiled %d of %d rules into automations",
+            len(result.compiled),
+            len(index.rules),
+        )
+        return {
+            "compiled": [automation.as_dict() for automation in result.compiled],
+            "needs_authoring": [
+                {
+                    **uncompiled.as_dict(),
+                    "entities": {
+                        mention: [candidate.as_dict() for candidate in candidates]
+                        for mention, candidates in resolver.resolve_all(
+                            uncompiled.rule.entities_mentioned
+                        ).items()
+                    },
+                }
+                for uncompiled in result.uncompiled
+            ],
+        }
+
+    async def find_automations_tool(
+        mentions: list[str] | None = None, trigger_type: str | None = None
+    ) -> dict[str, Any]:
+        """Finds the Home Assistant automations that use entities or a trigger type.
+
+        Args:
+            mentions: Descriptions of devices or entities, e.g. 'living room lights'.
+            trigger_type: A type of trigger, e.g. 'sun', 'time' or 'state'.
+
+        Returns:
+            A dictionary with an 'automations' list with the 'entity_id', 'id',
+            'alias', 'trigger_types' and 'entities' of each automation that uses
+            an entity the mentions may refer to and has the trigger type.
+        """
+        automation_index = config_entry.runtime_data.automation_index
+        automations = None
+        if mentions:
+            resolved = config_entry.runtime_data.entity_resolver.resolve_all(mentions)
+            automations = automation_index.for_entities(
+                candidate.entity_id
+                for candidates in resolved.values()
+                for candidate in candidates
+            )
+        if trigger_type:
+            with_trigger_type = automation_index.with_trigger_type(trigger_type)
+            if automations is None:
+                automations = with_trigger_type
+            else:
+                entity_ids = {automation.entity_id for automation in with_trigger_type}
+                automations = [
+                    automation
+                    for automation in automations
+                    if automation.entity_id in entity_ids
+                ]
+        return {
+            "automations": [automation.as_dict() for automation in automations or []]
+        }
+
+    async def get_rulebook_automations_tool() -> dict[str, Any]:
+        """Fetches the Home Assistant automations created for the rulebook's rules.
+
+        Returns:
+            A dictionary with a 'rules' list with the 'rule_name', 'rulebook_id'
+            and the 'automation' created for each rule, or None, and a
+            'automations_without_rule' list of the automations created for rules
+            that are no longer in the rulebook.
+        """
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "The rulebook has not been parsed yet.",
+            }
+        automation_index = config_entry.runtime_data.automation_index
+        rules = []
+        for rule in index.rules:
+            automation = automation_index.for_rulebook_id(rulebook_id := rule_id(rule))
+            rules.append(
+                {
+                    "rule_name": rule.rule_name,
+                    "rulebook_id": rulebook_id,
+                    "automation": automation.as_dict() if automation else None,
+                }
+            )
+        rulebook_ids = {rule["rulebook_id"] for rule in rules}
+        return {
+            "rules": rules,
+            "automations_without_rule": [
+                automation.as_dict()
+                for automation in automation_index.rulebook_automations()
+                if automation.id not in rulebook_ids
+            ],
+        }
+
+    async def apply_automations_tool(
+        automations_yaml: str = "", delete_rulebook_ids: list[str] | None = None
+    ) -> dict[str, Any]:
+        """Adds, updates and deletes automations in rulebook_automations.yaml.
+
+        All changes are applied together and the automations are reloaded once.
+
+        Args:
+            automations_yaml: A YAML list of the automations to add or update, each
+                with the rulebook id of its rule as the 'id'.
+            delete_rulebook_ids: The rulebook ids of the automations to delete.
+
+        Returns:
+            A dictionary with the rulebook ids that were 'created', 'updated' and
+            'deleted', and whether the automations were 'reloaded'.
+        """
+        transaction = AutomationsTransaction(hass)
+        try:
+            automations = yaml_util.parse_yaml(automations_yaml) or []
+            if isinstance(automations, dict):
+                automations = [automations]
+            if not isinstance(automations, list):
+                raise HomeAssistantError("The automations must be a YAML list")
+            for automation in automations:
+                if not isinstance(automation, dict):
+                    raise HomeAssistantError("Each automation must be a mapping")
+                transaction.upsert(automation)
+            for rulebook_id in delete_rulebook_ids or []:
+                transaction.delete(rulebook_id)
+            return await transaction.async_commit()
+        except HomeAssistantError as err:
+            _LOGGER.error("Failed to apply automations: %s", err)
+            return {"status": "error", "error_message": str(err)}
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
+    return LlmAgent(
+        name="AutomationManager",
+        model=AGENT_MODEL,
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
+        description=(
+            "Creates Home Assistant automations for the smart home rules in the "
+            "rulebook."
+        ),
+        instruction=(
+            "You are an expert in Home Assistant automations and the user's rulebook. "
+            "Your goal is to help the user create automations for the smart home rules in their rulebook. "
+            "Use the 'find_automations_tool' tool to answer which existing automations use devices or a type of trigger, and the 'get_rulebook_automations_tool' tool to find which rules already have an automation. "
+            "When asked to create automations for the rulebook: "
+            "1. Use the 'compile_rulebook_automations_tool' tool to compile the rules. "
+            "2. The automations in the 'compiled' list are complete. Present them to the user as YAML without changing them. "
+            "3. Only for the rules in the 'needs_authoring' list, write the automation YAML yourself using the 'triggers', 'conditions' and 'actions' keys. "
+            "Use the 'rulebook_id' of the rule as the 'id' of its automation. "
+            "Use the candidate 'entities' for the entity ids, and ask the user which entity they mean when there is no good candidate. "
+            "4. Ask the user to review the automations before they are added to Home Assistant. "
+            "5. When the user confirms, use the 'apply_automations_tool' tool once with all of the confirmed automations, and any automations to delete, so that automations are reloaded only once. "
+            "Keep the 'id' of each automation, which links it to its rule."
+        ),
+        tools=[
+            compile_rulebook_automations_tool,
+            find_automations_tool,
+            get_rulebook_automations_tool,
+            apply_automations_tool,
+        ],
+    )
@@ -0,0 +1,213 @@
+"""Prompt size budget for the model calls made by the agents.
+
+Instructions that embed the rulebook or a diff of the rulebook grow with the
+size of the rulebook. Text is compacted before it is embedded, JSON is
+serialized without whitespace and content that does not fit in the budget is
+summarized. The prompt size of each model call is estimated before the call
+and the prompt token count reported by the model is recorded for each agent.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+from homeassistant.core import HomeAssistant
+from homeassistant.util.hass_dict import HassKey
+
+from custom_components.rulebook.const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rough number of characters per token, used to estimate the size of a prompt
+_CHARS_PER_TOKEN = 4
+
+# Prompts larger than this slow down the first token and risk the context limit
+DEFAULT_PROMPT_TOKEN_BUDGET = 32000
+
+# Length of the strings kept when JSON does not fit in the budget
+_SHORTENED_STRING_LENGTH = 200
+
+_TRAILING_WHITESPACE = re.compile(r"[ \t]+$", re.MULTILINE)
+_REPEATED_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a rough estimate of the number of tokens in the text."""
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def compact_text(text: str) -> str:
+    """Remove whitespace that does not change the meaning of the text.
+
+    Indentation at the start of a line is kept since it nests lists.
+    """
+    text = _TRAILING_WHITESPACE.sub("", text)
+    text = _REPEATED_SPACES.sub(" ", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def fit_json(value: dict[str, Any], max_tokens: int) -> str:
+    """Serialize the value as compact JSON that fits in the token budget.
+
+    When the JSON is too large, long strings are shortened. If it still does
+    not fit, the items at the end of each list are left out and the number of
+    items left out is reported under 'omitted'.
+    """
+    text = _dumps(value)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    value = _shorten_strings(value)
+    text = _dumps(value)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    fitted: dict[str, Any] = {}
+    omitted: dict[str, int] = {}
+    size = 0
+    for key, item in value.items():
+        if not isinstance(item, list):
+            fitted[key] = item
+            size += len(_dumps({key: item}))
+            continue
+        fitted[key] = []
+        for i, list_item in enumerate(item):
+            item_size = len(_dumps(list_item)) + 1
+            if size + item_size > max_chars:
+                omitted[key] = len(item) - i
+                break
+            fitted[key].append(list_item)
+            size += item_size
+    if omitted:
+        fitted["omitted"] = omitted
+    return _dumps(fitted)
+
+
+def _dumps(value: Any) -> str:
+    """Serialize the value as JSON without whitespace."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _shorten_strings(value: Any) -> Any:
+    """Return the value with long strings shortened."""
+    if isinstance(value, str) and len(value) > _SHORTENED_STRING_LENGTH:
+        return value[:_SHORTENED_STRING_LENGTH] + "…"
+    if isinstance(value, list):
+        return [_shorten_strings(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _shorten_strings(item) for key, item in value.items()}
+    return value
+
+
+@dataclass(kw_only=True)
+class _AgentPromptStats:
+    """Prompt sizes of the model calls of an agent."""
+
+    calls: int = 0
+    over_budget: int = 0
+    estimated_prompt_tokens: int = 0
+    max_estimated_prompt_tokens: int = 0
+    prompt_tokens: int | None = None
+    total_prompt_tokens: int = 0
+
+
+class PromptStats:
+    """Prompt sizes of the model calls made by each agent.
+
+    The callbacks are registered as the model callbacks of an LlmAgent.
+    """
+
+    def __init__(self, max_prompt_tokens: int = DEFAULT_PROMPT_TOKEN_BUDGET) -> None:
+        """Initialize the PromptStats."""
+        self._max_prompt_tokens = max_prompt_tokens
+        self._agents: dict[str, _AgentPromptStats] = {}
+
+    def before_model(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        """Estimate the size of the prompt before the model is called."""
+        agent_stats = self._agent_stats(callback_context.agent_name)
+        tokens = estimate_tokens(_request_text(llm_request))
+        agent_stats.calls += 1
+        agent_stats.estimated_prompt_tokens = tokens
+        agent_stats.max_estimated_prompt_tokens = max(
+            agent_stats.max_estimated_prompt_tokens, tokens
+        )
+        if tokens > self._max_prompt_tokens:
+            agent_stats.over_budget += 1
+            _LOGGER.warning(
+                "Prompt for %s is about %d tokens, over the budget of %d tokens",
+                callback_context.agent_name,
+                tokens,
+                self._max_prompt_tokens,
+            )
+        return None
+
+    def after_model(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        """Record the prompt token count reported by the model."""
+        usage = llm_response.usage_metadata
+        if usage is None or usage.prompt_token_count is None:
+            return None
+        agent_stats = self._agent_stats(callback_context.agent_name)
+        agent_stats.prompt_tokens = usage.prompt_token_count
+        agent_stats.total_prompt_tokens += usage.prompt_token_count
+        return None
+
+    def stats(self) -> dict[str, dict[str, int | None]]:
+        """Return the prompt sizes of each agent for diagnostics."""
+        return {
+            agent_name: {
+                "calls": agent_stats.calls,
+                "over_budget": agent_stats.over_budget,
+                "estimated_prompt_tokens": agent_stats.estimated_prompt_tokens,
+                "max_estimated_prompt_tokens": agent_stats.max_estimated_prompt_tokens,
+                "prompt_tokens": agent_stats.prompt_tokens,
+                "total_prompt_tokens": agent_stats.total_prompt_tokens,
+            }
+            for agent_name, agent_stats in sorted(self._agents.items())
+        }
+
+    def _agent_stats(self, agent_name: str) -> _AgentPromptStats:
+        """Return the stats of the agent."""
+        if (agent_stats := self._agents.get(agent_name)) is None:
+            agent_stats = self._agents[agent_name] = _AgentPromptStats()
+        return agent_stats
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    """Return the text of the instruction and contents sent to the model."""
+    texts: list[str] = []
+    contents = list(llm_request.contents)
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if isinstance(instruction, str):
+        texts.append(instruction)
+    elif isinstance(instruction, types.Content):
+        contents.insert(0, instruction)
+    texts.extend(
+        part.text for content in contents for part in content.parts or () if part.text
+    )
+    return "\n".join(texts)
+
+
+DATA_PROMPT_STATS: HassKey[dict[str, PromptStats]] = HassKey(f"{DOMAIN}_prompt_stats")
+
+
+def async_get_prompt_stats(hass: HomeAssistant, entry_id: str) -> PromptStats:
+    """Return the prompt stats of the agents of a config entry."""
+    prompt_stats = hass.data.setdefault(DATA_PROMPT_STATS, {})
+    if (entry_stats := prompt_stats.get(entry_id)) is None:
+        entry_stats = prompt_stats[entry_id] = PromptStats()
+    return entry_stats
+
+
+def async_remove_prompt_stats(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the prompt stats of a config entry that is unloaded."""
+    hass.data.get(DATA_PROMPT_STATS, {}).pop(entry_id, None)
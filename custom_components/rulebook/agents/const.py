@@ -2,4 +2,14 @@
 
 AGENT_MODEL = "gemini-3.0-pro"
 SUMMARIZE_MODEL = "gemini-3.0-flash-preview"
+RULE_PARSER_MODEL = SUMMARIZE_MODEL
 PARSED_RULEBOOK_KEY = "parsed_rulebook"
+
+# Requests per minute allowed for each model. models.yaml only lists the
+# gemini-2.5 models, so these assume the same quota as the matching 2.5 tier:
+# 75 for pro and 500 for flash.
+MODEL_RPM = {
+    AGENT_MODEL: 75,
+    SUMMARIZE_MODEL: 500,
+}
+DEFAULT_MODEL_RPM = 75
@@ -0,0 +1,122 @@
+"""Adaptive concurrency limit for concurrent model requests.
+
+The limit follows additive increase, multiplicative decrease (AIMD): it grows
+by one after a full window of healthy requests and is halved when the API
+reports rate limiting or an error, so concurrency settles near whatever quota
+the API key actually has.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from google.genai.errors import APIError
+
+from .const import DEFAULT_MODEL_RPM, MODEL_RPM
+
+_LOGGER = logging.getLogger(__name__)
+
+# Expected latency of a single request, used to convert requests per minute
+# into a number of concurrent requests.
+_EXPECTED_LATENCY_SECONDS = 6.0
+# Concurrency used before any requests have completed
+_INITIAL_LIMIT = 5
+_DECREASE_FACTOR = 0.5
+# Failures of requests already in flight when the limit is decreased are
+# caused by the same overload and do not decrease the limit again.
+_DECREASE_COOLDOWN_SECONDS = 5.0
+_RATE_LIMITED_CODE = 429
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limit the number of concurrent requests, adapting to the API quota."""
+
+    def __init__(
+        self,
+        max_limit: int,
+        initial_limit: int = _INITIAL_LIMIT,
+        latency_threshold: float = _EXPECTED_LATENCY_SECONDS * 2,
+    ) -> None:
+        """Initialize the AdaptiveConcurrencyLimiter."""
+        self._max_limit = max(1, max_limit)
+        self._limit = float(min(initial_limit, self._max_limit))
+        self._latency_threshold = latency_threshold
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+        self.successes = 0
+        self.slow_requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def for_model(cls, model: str) -> "AdaptiveConcurrencyLimiter":
+        """Create a limiter seeded from the requests per minute of the model."""
+        rpm = MODEL_RPM.get(model, DEFAULT_MODEL_RPM)
+        return cls(max_limit=int(rpm * _EXPECTED_LATENCY_SECONDS / 60))
+
+    @property
+    def limit(self) -> int:
+        """Return the current number of allowed concurrent requests."""
+        return int(self._limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[None]:
+        """Wait for a request slot and record the outcome of the request.
+
+        API errors and timeouts decrease the limit, while requests that
+        complete within the latency threshold increase it.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except APIError as err:
+            self._record_failure(rate_limited=err.code == _RATE_LIMITED_CODE)
+            raise
+        except TimeoutError:
+            self._record_failure(rate_limited=False)
+            raise
+        else:
+            self._record_success(time.monotonic() - start)
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _record_success(self, latency: float) -> None:
+        """Grow the limit by one for each full window of healthy requests."""
+        self.successes += 1
+        if latency > self._latency_threshold:
+            self.slow_requests += 1
+            return
+        self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+
+    def _record_failure(self, rate_limited: bool) -> None:
+        """Shrink the limit after a rate limit or error response."""
+        self.failures += 1
+        if rate_limited:
+            self.rate_limited += 1
+        now = time.monotonic()
+        if now - self._last_decrease < _DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        self._limit = max(1.0, self._limit * _DECREASE_FACTOR)
+        _LOGGER.debug("Decreased concurrency limit to %d", self.limit)
+
+    def stats(self) -> dict[str, Any]:
+        """Return limiter state for diagnostics."""
+        return {
+            "limit": self.limit,
+            "max_limit": self._max_limit,
+            "in_flight": self._in_flight,
+            "successes": self.successes,
+            "slow_requests": self.slow_requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+        }
@@ -6,15 +6,16 @@ from typing import Any
 from google.adk.agents import LlmAgent
 from homeassistant.core import HomeAssistant
 
-from custom_components.rulebook.data.home import ParsedHomeDetails
 from custom_components.rulebook.interaction_layer import (
     async_get_ha_location_config,
     async_set_ha_location_config,
 )
-from custom_components.rulebook.storage import async_read_parsed_rulebook
+from custom_components.rulebook.storage import async_read_rulebook_index
 from custom_components.rulebook.types import RulebookConfigEntry
 
+from .budget import async_get_prompt_stats
 from .const import SUMMARIZE_MODEL
+from .policy import INTERACTIVE_POLICY, generate_content_config
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -69,11 +70,9 @@ def async_create_agent(
     async def get_rulebook_location_details_tool() -> dict[str, Any] | None:
         """Retrieves the location details (latitude, longitude, location name, timezone, unit system) as parsed from the rulebook."""
         _LOGGER.debug("LocationAgent: Called get_rulebook_location_details_tool")
-        parsed_home_details: (
-            ParsedHomeDetails | None
-        ) = await async_read_parsed_rulebook(hass, config_entry.entry_id)
-        if parsed_home_details and parsed_home_details.location_details:
-            return parsed_home_details.location_details.model_dump(exclude_none=True)
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index and index.location_details:
+            return dict(index.location_details)
         _LOGGER.debug("LocationAgent: No rulebook location details found")
         return None
 
@@ -114,9 +113,13 @@ def async_create_agent(
             language=language,
         )
 
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
     return LlmAgent(
         name=_AGENT_NAME,
         model=SUMMARIZE_MODEL,
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         description=_AGENT_DESCRIPTION,
         instruction=_BASE_INSTRUCTIONS,
         tools=[
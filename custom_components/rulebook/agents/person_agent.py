@@ -1,21 +1,22 @@
 """Agent for managing Home Assistant persons."""
 
 import logging
+from typing import Any
 
 from google.adk.agents import LlmAgent
 from homeassistant.core import HomeAssistant
 
-from custom_components.rulebook.data.home import (
-    ParsedHomeDetails,
-)
+from custom_components.rulebook.data.reconcile import reconcile
 from custom_components.rulebook.interaction_layer import (
-    async_get_persons,
     async_guide_user_to_create_person,
+    async_guide_user_to_create_persons,
 )
-from custom_components.rulebook.storage import async_read_parsed_rulebook
+from custom_components.rulebook.storage import async_read_rulebook_index
 from custom_components.rulebook.types import RulebookConfigEntry
 
+from .budget import async_get_prompt_stats
 from .const import AGENT_MODEL
+from .policy import INTERACTIVE_POLICY, generate_content_config
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,14 +34,37 @@ def async_create_agent(
         An LlmAgent instance for managing persons.
     """
 
-    async def get_persons_tool() -> list[dict[str, str | None]]:
+    async def get_persons_tool() -> dict[str, Any]:
         """Fetches all defined persons in Home Assistant.
 
         Returns:
-            A list of dictionaries, where each dictionary represents a person
-            and contains their 'name' and 'id' (entity_id).
+            A dictionary with the 'version' of the persons and a 'persons' list,
+            where each item represents a person and contains their 'name' and
+            'id' (entity_id).
+        """
+        snapshot = config_entry.runtime_data.registry_snapshot
+        return {"version": snapshot.version, "persons": snapshot.persons()}
+
+    async def get_person_changes_tool(since_version: int) -> dict[str, Any]:
+        """Fetches the persons that changed in Home Assistant since a version.
+
+        Args:
+            since_version: The 'version' returned by an earlier call to get_persons_tool
+                or get_person_changes_tool.
+
+        Returns:
+            A dictionary with the current 'version' and the 'changed' persons
+            and 'removed' person ids under 'persons'. If 'full' is true, all
+            persons are listed as changed.
         """
-        return await async_get_persons(hass)
+        changes = config_entry.runtime_data.registry_snapshot.changes_since(
+            since_version
+        )
+        return {
+            "version": changes["version"],
+            "full": changes["full"],
+            "persons": changes["persons"],
+        }
 
     async def get_rulebook_persons_tool() -> list[str] | None:
         """Fetches person mentions from the parsed rulebook.
@@ -48,14 +72,32 @@ def async_create_agent(
         Returns:
             A list of person names mentioned in the rulebook, or None if not found.
         """
-        parsed_rulebook: ParsedHomeDetails | None = await async_read_parsed_rulebook(
-            hass, config_entry.entry_id
-        )
-        if parsed_rulebook and parsed_rulebook.key_people:
-            return parsed_rulebook.key_people
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index and index.people:
+            return list(index.people)
         _LOGGER.debug("No key people found in parsed rulebook or rulebook not found.")
         return None
 
+    async def get_person_alignment_report_tool() -> dict[str, Any]:
+        """Compares the people in the rulebook with the persons in Home Assistant.
+
+        Returns:
+            A report with the 'matched' persons, 'likely_matches' with similar but
+            not equal names, the people 'missing_in_home_assistant' that are only
+            mentioned in the rulebook and the persons 'missing_in_rulebook' that
+            are only defined in Home Assistant. 'aligned' is true if nothing
+            differs.
+        """
+        index = await async_read_rulebook_index(hass, config_entry.entry_id)
+        if index is None:
+            return {
+                "status": "error",
+                "error_message": "The rulebook has not been parsed yet.",
+            }
+        snapshot = config_entry.runtime_data.registry_snapshot
+        report = reconcile(index.people, snapshot.persons())
+        return {"version": snapshot.version, **report.as_dict()}
+
     async def create_person_guidance_tool_func(person_name: str) -> dict[str, str]:
         """Creates a persistent notification to guide the user to add a person.
 
@@ -68,9 +110,28 @@ def async_create_agent(
         _LOGGER.debug("Tool called to guide creation of person: %s", person_name)
         return await async_guide_user_to_create_person(hass, person_name)
 
+    async def create_persons_guidance_tool(person_names: list[str]) -> dict[str, Any]:
+        """Creates one persistent notification to guide the user to add persons.
+
+        People that already exist in Home Assistant or that are repeated are
+        skipped, and notifications already created for these people are replaced.
+
+        Args:
+            person_names: The names of the people to add to Home Assistant.
+
+        Returns:
+            A dictionary with the notification id and the status of each person.
+        """
+        _LOGGER.debug("Tool called to guide creation of persons: %s", person_names)
+        return await async_guide_user_to_create_persons(hass, person_names)
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
     return LlmAgent(
         name="PersonManager",
         model=AGENT_MODEL,
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         description=(
             "Manages and answers questions about Home Assistant persons. "
             "Can list existing persons, compare them with the rulebook, and identify discrepancies."
@@ -79,19 +140,22 @@ def async_create_agent(
             "You are an expert in Home Assistant persons and the user's rulebook. "
             "Your goal is to help the user align their Home Assistant persons with their rulebook. "
             "When asked about persons, or to check person configurations: "
-            "1. Use the 'get_persons_tool' tool to fetch current person information from Home Assistant. "
-            "2. Use the 'get_rulebook_persons_tool' tool to fetch person names mentioned in the rulebook. "
-            "3. Compare these two lists of persons. "
-            "4. Report any discrepancies to the user. Specifically, tell them: "
-            "   - Which persons are mentioned in the rulebook but NOT defined in Home Assistant. "
-            "   - Which persons are defined in Home Assistant but NOT mentioned in the rulebook. "
-            "5. For persons mentioned in the rulebook but not in Home Assistant, ask the user if they would like guidance on how to add them. If they confirm, use the 'create_person_guidance_tool_func' to create a notification. "
-            "6. For persons defined in Home Assistant but not in the rulebook, suggest adding them to the rulebook. "
+            "1. Use the 'get_person_alignment_report_tool' tool to get a comparison of the people in the rulebook and the persons in Home Assistant. Do not compare the persons yourself. "
+            "2. Report any discrepancies to the user. Specifically, tell them: "
+            "   - Which persons are mentioned in the rulebook but NOT defined in Home Assistant ('missing_in_home_assistant'). "
+            "   - Which persons are defined in Home Assistant but NOT mentioned in the rulebook ('missing_in_rulebook'). "
+            "   - Which persons have similar but not identical names ('likely_matches'), and ask the user to confirm they are the same person. "
+            "3. Use the 'get_persons_tool', 'get_person_changes_tool' and 'get_rulebook_persons_tool' tools only to answer other questions about the persons. "
+            "4. For persons mentioned in the rulebook but not in Home Assistant, ask the user if they would like guidance on how to add them. If they confirm, use the 'create_persons_guidance_tool' tool once with all of the missing persons to create a single notification. "
+            "5. For persons defined in Home Assistant but not in the rulebook, suggest adding them to the rulebook. "
             "Present this information clearly. If there are no discrepancies, inform the user that the persons are aligned."
         ),
         tools=[
             get_persons_tool,
+            get_person_changes_tool,
             get_rulebook_persons_tool,
+            get_person_alignment_report_tool,
             create_person_guidance_tool_func,  # Added tool
+            create_persons_guidance_tool,
         ],
     )
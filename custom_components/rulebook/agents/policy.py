@@ -0,0 +1,151 @@
+"""Timeout, retry and hedging policy for model calls made by the agents.
+
+Every agent bounds each model call with a deadline and retries transient
+errors with jittered exponential backoff. Idempotent parse calls may also be
+hedged: a duplicate run is started when the first run is slower than the
+recent p95 latency, and the first run to complete wins.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.genai import types
+
+_LOGGER = logging.getLogger(__name__)
+
+# Status codes that are safe to retry for a model call
+_RETRY_HTTP_STATUS_CODES = [408, 429, 500, 502, 503, 504]
+_RETRY_INITIAL_DELAY_SECONDS = 1.0
+_RETRY_MAX_DELAY_SECONDS = 8.0
+_RETRY_JITTER_SECONDS = 1.0
+
+# Number of recent latencies used to estimate the hedging threshold
+_LATENCY_WINDOW = 50
+_MIN_LATENCY_SAMPLES = 5
+_HEDGE_PERCENTILE = 0.95
+
+
+@dataclass(frozen=True, kw_only=True)
+class CallPolicy:
+    """Deadline and retry policy for the model calls of an agent."""
+
+    timeout_seconds: float
+    """Deadline for a single model call attempt."""
+
+    attempts: int
+    """Total number of attempts, including the first."""
+
+
+# Conversational agents that answer the user or call tools
+INTERACTIVE_POLICY = CallPolicy(timeout_seconds=30, attempts=2)
+# Parsing the full rulebook text in a single request
+RULEBOOK_PARSER_POLICY = CallPolicy(timeout_seconds=90, attempts=3)
+# Parsing individual smart home rules, which is idempotent and may be hedged
+RULE_PARSER_POLICY = CallPolicy(timeout_seconds=30, attempts=3)
+
+
+def generate_content_config(policy: CallPolicy) -> types.GenerateContentConfig:
+    """Return the model request config that applies the call policy."""
+    return types.GenerateContentConfig(
+        http_options=types.HttpOptions(
+            timeout=int(policy.timeout_seconds * 1000),
+            retry_options=types.HttpRetryOptions(
+                attempts=policy.attempts,
+                initial_delay=_RETRY_INITIAL_DELAY_SECONDS,
+                max_delay=_RETRY_MAX_DELAY_SECONDS,
+                exp_base=2,
+                jitter=_RETRY_JITTER_SECONDS,
+                http_status_codes=_RETRY_HTTP_STATUS_CODES,
+            ),
+        )
+    )
+
+
+def run_deadline_seconds(policy: CallPolicy) -> float:
+    """Return the deadline for a whole agent run including all retries."""
+    return policy.attempts * (policy.timeout_seconds + _RETRY_MAX_DELAY_SECONDS)
+
+
+class LatencyTracker:
+    """Tracks recent run latencies to decide when to hedge."""
+
+    def __init__(self) -> None:
+        """Initialize the LatencyTracker."""
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a completed run."""
+        self._latencies.append(latency)
+
+    def hedge_threshold(self) -> float | None:
+        """Return the latency after which to hedge, or None if unknown."""
+        if len(self._latencies) < _MIN_LATENCY_SAMPLES:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * _HEDGE_PERCENTILE))
+        return latencies[index]
+
+    def stats(self) -> dict[str, float | int | None]:
+        """Return latency and hedging counters for diagnostics."""
+        return {
+            "samples": len(self._latencies),
+            "hedge_threshold": self.hedge_threshold(),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+async def async_run_hedged(
+    ctx: InvocationContext,
+    agent_factory: Callable[[], BaseAgent],
+    latency_tracker: LatencyTracker,
+) -> list[Event]:
+    """Run an idempotent agent, starting a duplicate run if it is slow.
+
+    The events of each run are buffered and only the events of the first run
+    to complete are returned, so the duplicate can't produce conflicting state.
+    An error is only raised if every run fails.
+    """
+
+    async def collect(agent: BaseAgent) -> list[Event]:
+        return [event async for event in agent.run_async(ctx)]
+
+    start = time.monotonic()
+    primary = asyncio.create_task(collect(agent_factory()))
+    pending = {primary}
+    try:
+        if (hedge_after := latency_tracker.hedge_threshold()) is not None:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                _LOGGER.debug("Hedging run slower than %.1f seconds", hedge_after)
+                latency_tracker.hedged += 1
+                pending.add(asyncio.create_task(collect(agent_factory())))
+
+        errors: list[BaseException] = []
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if (error := task.exception()) is not None:
+                    errors.append(error)
+                    continue
+                latency_tracker.record(time.monotonic() - start)
+                if task is not primary:
+                    latency_tracker.hedge_wins += 1
+                return task.result()
+        raise errors[-1]
+    finally:
+        # Wait for the cancelled runs so no model call outlives the hedged run
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
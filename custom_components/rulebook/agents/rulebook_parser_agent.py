@@ -5,9 +5,11 @@ The goal of this is a workflow (series of agents/tools) that will do the followi
 1. Parse the user's rulebook text into a structured JSON format.
 2. Compare the parsed rulebook against existing ParsedHomeDetails in storage
    and determine if there is a "significant change" in the rulebook or if it is
-    "the same" as the existing details. We will allow the LLM to judge to avoid
-    updating the rulebook if it is not necessary e.g. the previous parser
-    proposes minitor changes that do not affect the overall structure or
+    "the same" as the existing details. A deterministic diff settles the cases
+    where nothing changed or where areas, people or rules were added or
+    removed. Only the remaining differences (e.g. rewording of existing rules)
+    are given to the LLM to judge, to avoid updating the rulebook if the
+    parser proposes minor changes that do not affect the overall structure or
     functionality of the home automation system.
 3. Persist the parsed rulebook in storage for future use by other workflows.
 
@@ -15,40 +17,87 @@ The goal of this is a workflow (series of agents/tools) that will do the followi
 
 import asyncio
 import logging
-from collections.abc import AsyncGenerator
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Callable
+from functools import partial
 from typing import Any, override
 
 from google.adk.agents import BaseAgent, LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.events.event import Event
 from google.adk.events.event_actions import EventActions
 from google.adk.tools import FunctionTool, ToolContext
 from google.genai import types
+from google.genai.errors import APIError
 from homeassistant.core import HomeAssistant
 
 from custom_components.rulebook.const import CONF_RULEBOOK
-from custom_components.rulebook.data.home import ParsedHomeDetails, ParsedSmartHomeRule
+from custom_components.rulebook.data.chunk import merge_home_details, split_rulebook
+from custom_components.rulebook.data.diff import diff_home_details, normalize_text
+from custom_components.rulebook.data.home import (
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+    ParsedSmartHomeRuleBatch,
+)
 from custom_components.rulebook.storage import (
     async_read_parsed_rulebook,
+    async_read_rule_parse_cache,
+    async_read_rulebook_hash,
     async_write_parsed_rulebook,
+    async_write_rule_parse_cache,
+    async_write_rulebook_hash,
+    rule_parse_cache_key,
+    rulebook_text_hash,
 )
 from custom_components.rulebook.types import RulebookConfigEntry
 
-from .const import AGENT_MODEL, SUMMARIZE_MODEL
+from .budget import async_get_prompt_stats, compact_text, fit_json
+from .const import AGENT_MODEL, RULE_PARSER_MODEL, SUMMARIZE_MODEL
+from .limiter import AdaptiveConcurrencyLimiter
+from .policy import (
+    INTERACTIVE_POLICY,
+    RULE_PARSER_POLICY,
+    RULEBOOK_PARSER_POLICY,
+    LatencyTracker,
+    async_run_hedged,
+    generate_content_config,
+    run_deadline_seconds,
+)
 from .smart_home_rule_parser_agent import (
     async_create_agent as async_create_smart_home_rule_parser_agent,
 )
+from .smart_home_rule_parser_agent import (
+    async_create_batch_agent as async_create_smart_home_rule_batch_parser_agent,
+)
+from .smart_home_rule_parser_agent import split_rule_batches
 
 _LOGGER = logging.getLogger(__name__)
 
-_MAX_CONCURRENT_RULE_PARSERS = 5
+# Limits on the rule snippets sent to the model in a single batch request
+_RULE_BATCH_TOKEN_BUDGET = 2000
+_MAX_RULES_PER_BATCH = 10
+
+# Rulebooks larger than this are split into sections that are parsed
+# concurrently, about 6000 tokens each
+_RULEBOOK_CHUNK_CHARS = 24000
+
+# Increment when the parser instructions change so the rulebook is parsed again
+_PARSER_PROMPT_VERSION = 1
+_PARSER = f"{AGENT_MODEL}:{RULE_PARSER_MODEL}:{_PARSER_PROMPT_VERSION}"
 
-_RULEBOOK_TEXT_KEY = "rulebook_text"
-_PARSED_RULEBOOK_KEY = "parsed_rulebook"
-_PREVIOUS_PARSED_RULEBOOK_JSON_KEY = "previous_parsed_rulebook_json"
-_PARSED_RULEBOOK_JSON_KEY = "parsed_rulebook_json"
-_RULE_TEXT_INPUT_KEY = "smart_home_rule_text_{rule_index}"
-_RULE_TEXT_OUTPUT_KEY = "parsed_smart_home_rule_{rule_index}"
+# Number of parsed rulebooks kept while they wait to be reviewed
+_MAX_PENDING_RULEBOOKS = 3
+
+# Session state only holds a reference to the parsed rulebook, which is kept
+# in a PendingRulebookStore, rather than a copy in every state delta event.
+# The store is in memory, so a reference persisted in the session state no
+# longer finds the parsed rulebook after a restart.
+_PARSED_RULEBOOK_REF_KEY = "parsed_rulebook_ref"
+# Temporary state is only available during the invocation and not persisted
+_RULEBOOK_DIFF_JSON_KEY = "temp:rulebook_diff_json"
+# Differences beyond this size are summarized in the reviewer instruction
+_RULEBOOK_DIFF_TOKEN_BUDGET = 8000
 
 
 _PARSER_INSTRUCTION = (
@@ -66,6 +115,7 @@ _PARSER_INSTRUCTION = (
     "You MUST respond with a single, comprehensive JSON object that strictly conforms to the 'ParsedHomeDetails' schema. "
     "The schema defines keys like 'raw_text', 'parsed_status', 'basic_info', 'location_details' (which includes 'address', 'city', 'state', 'country', 'timezone', 'latitude', 'longitude'), 'key_people', "
     "'floor_mentions', 'area_mentions', 'utility_provider_mentions', and 'raw_smart_home_rules_text'. "
+    "Set 'raw_text' to an empty string, since the rulebook text is filled in after parsing. "
     "Populate the 'location_details' field, ensuring to include 'latitude' and 'longitude' if they can be determined from the text. "
     "Populate the 'floor_mentions', 'area_mentions', and 'utility_provider_mentions' fields with lists of strings, where each string is a direct mention from the text. "
     "Populate the 'raw_smart_home_rules_text' field with a list of strings, where each string is the exact text of an individual smart home rule you extracted. "
@@ -75,32 +125,65 @@ _PARSER_INSTRUCTION = (
     "Do not call any tools. Your only output should be the JSON object."
     "\n\n"
     "The user's rulebook is as follows:\n\n"
-    "{rulebook_text}\n\n"
+)
+
+_PARSER_CHUNK_INSTRUCTION = (
+    "The rulebook is too large to parse at once, so you are only given one section of it, "
+    "preceded by the headings of the sections it is part of. "
+    "Only extract the details found in this section, and use empty lists or null for anything else."
+    "\n\n"
 )
 
 
 _REVIEWER_INSTRUCTION = (
     "You are an expert at reviewing parsed rulebooks. "
-    "Your primary task is to compare a newly parsed rulebook JSON with a previous version and decide if the changes are significant enough to warrant updating the stored version. "
-    "The rulebook JSON now includes a 'smart_home_rules' field, which contains a list of parsed individual smart home rules. Each rule in this list conforms to the 'ParsedSmartHomeRule' schema, primarily containing 'rule_raw_text', 'rule_name', 'entities_mentioned', and 'core_logic_text'. Pay close attention to changes in this list. "
+    "Your primary task is to review the differences between a newly parsed rulebook and the previously stored version and decide if the changes are significant enough to warrant updating the stored version. "
+    "You are only given the computed differences. Areas, people, floors, utility providers and smart home rules were not added or removed, so the differences are limited to rewording of existing smart home rules ('rule_name', 'entities_mentioned', 'core_logic_text') or free-form fields in 'basic_info' and 'location_details'. "
+    "Each difference lists the 'field' along with its 'previous' and 'current' value. "
     "If you determine the changes are significant, you MUST call the 'store_rulebook' tool to save the new version. "
-    "If the changes are minor or non-existent, you should NOT call the tool. "
+    "If the changes are minor, you should NOT call the tool. "
     "After making your decision, you MUST provide a concise explanation to the user about what you did and why. "
     "Be specific but brief in your explanation. For example, if you store it, mention 1-2 key areas of change. If you don't, explain why the changes were not considered significant."
-    "\\n\\n"
-    "The previous parsed rulebook JSON is:\\n\\n"
-    "{previous_parsed_rulebook_json}\\n\\n"
-    "The new parsed rulebook JSON is:\\n\\n"
-    "{parsed_rulebook_json}\\n\\n"
+    "\n\n"
+    "The differences between the previous and new parsed rulebook are listed below. "
+    "If some differences were left out to keep this short, 'omitted' has the number of differences left out for each field.\n\n"
+    "{temp:rulebook_diff_json}\n\n"
     "Follow these steps:"
-    "1. Analyze both JSON objects to identify differences. "
-    "2. Determine if these differences constitute a 'significant change'. A significant change includes modifications to structure, key information (like 'basic_info', 'location_details', 'key_people', 'floor_mentions', 'area_mentions', 'utility_provider_mentions', or the list of 'smart_home_rules' and their details), or overall content that would impact how the smart home operates or is understood. Minor formatting or rephrasing that doesn't alter meaning is not significant. Changes to 'smart_home_rules' (e.g., new rules, deleted rules, or modifications to a rule's 'rule_name', 'entities_mentioned', or 'core_logic_text') are generally considered significant. "
-    "3. If changes are significant: Call the 'store_rulebook' tool. Then, respond to the user, for example: 'I found significant updates in the rulebook, particularly regarding [specific area, e.g., new smart home rules for the kitchen and updated utility provider mentions]. I have now stored the latest version.' "
-    "4. If changes are NOT significant: Do NOT call the 'store_rulebook' tool. Then, respond to the user, for example: 'I reviewed the rulebook. The recent modifications appear to be minor (e.g., slight rephrasing in descriptions) and don\\\\\\'t substantially change its core details or smart home rules. The stored version remains unchanged.' "
+    "1. Analyze each difference. "
+    "2. Determine if these differences constitute a 'significant change'. A significant change alters meaning in a way that would impact how the smart home operates or is understood, such as a different trigger, condition, action or entity in a rule's 'core_logic_text' or 'entities_mentioned', or a different home name, language or address. Minor formatting or rephrasing that doesn't alter meaning is not significant. "
+    "3. If changes are significant: Call the 'store_rulebook' tool. Then, respond to the user, for example: 'I found significant updates in the rulebook, particularly regarding [specific area, e.g., the conditions of the kitchen light rule]. I have now stored the latest version.' "
+    "4. If changes are NOT significant: Do NOT call the 'store_rulebook' tool. Then, respond to the user, for example: 'I reviewed the rulebook. The recent modifications appear to be minor (e.g., slight rephrasing in rule names) and don't substantially change its core details or smart home rules. The stored version remains unchanged.' "
     "Your response to the user is crucial after your decision."
 )
 
 
+class PendingRulebookStore:
+    """Parsed rulebooks waiting to be reviewed, keyed by session and rulebook hash.
+
+    Only the most recent rulebooks are kept. The session state holds the
+    reference returned by `put` instead of a copy of the parsed rulebook.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the PendingRulebookStore."""
+        self._rulebooks: OrderedDict[str, ParsedHomeDetails] = OrderedDict()
+
+    def put(
+        self, session_id: str, rulebook_hash: str, parsed_rulebook: ParsedHomeDetails
+    ) -> str:
+        """Store a parsed rulebook until it is reviewed and return its reference."""
+        ref = f"{session_id}:{rulebook_hash}"
+        self._rulebooks[ref] = parsed_rulebook
+        self._rulebooks.move_to_end(ref)
+        while len(self._rulebooks) > _MAX_PENDING_RULEBOOKS:
+            self._rulebooks.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> ParsedHomeDetails | None:
+        """Return the parsed rulebook for the reference."""
+        return self._rulebooks.get(ref)
+
+
 class RulebookPipelineAgent(BaseAgent):
     """Agent that orchestrates the rulebook parsing and review process."""
 
@@ -108,6 +191,9 @@ class RulebookPipelineAgent(BaseAgent):
     config_entry: RulebookConfigEntry
     parser_agent: LlmAgent
     reviewer_agent: LlmAgent
+    rule_parser_limiter: AdaptiveConcurrencyLimiter
+    rule_parser_latency: LatencyTracker
+    pending_rulebooks: PendingRulebookStore
 
     # model_config allows setting Pydantic configurations if needed, e.g., arbitrary_types_allowed
     model_config = {"arbitrary_types_allowed": True}  # noqa: RUF012  # noqa: RUF012
@@ -118,7 +204,32 @@ class RulebookPipelineAgent(BaseAgent):
         _LOGGER.info(f"[{self.name}] Starting rulebook parsing workflow.")
 
         rulebook_text = self.config_entry.options[CONF_RULEBOOK]
-        ctx.session.state[_RULEBOOK_TEXT_KEY] = rulebook_text
+        rulebook_hash = rulebook_text_hash(rulebook_text, _PARSER)
+        if await self._async_is_unchanged(rulebook_hash):
+            _LOGGER.debug(
+                "[%s] Rulebook text is unchanged since the last parse", self.name
+            )
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                content=types.Content(
+                    parts=[
+                        types.Part(
+                            text="Your rulebook is unchanged since it was last reviewed, so there is nothing new to update."
+                        )
+                    ]
+                ),
+                partial=False,
+                turn_complete=True,
+            )
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                actions=EventActions(
+                    escalate=True,
+                ),
+            )
+            return
 
         yield Event(
             author=self.name,
@@ -130,29 +241,46 @@ class RulebookPipelineAgent(BaseAgent):
 
         # 1. Initial Rulebook Parsing (extracts raw rule snippets)
         _LOGGER.info(f"[{self.name}] Running RulebookParser for initial parsing...")
-        async for event in self.parser_agent.run_async(ctx):
-            debug_info = event.model_dump_json(indent=2, exclude_none=True)
-            _LOGGER.debug(
-                f"[{self.name}] Event from RulebookParser: {debug_info[:200]}..."
-            )
-            if event.actions.state_delta:
-                _LOGGER.info("State delta detected, yielding event.")
+        home_details: ParsedHomeDetails | None = None
+        chunks = split_rulebook(compact_text(rulebook_text), _RULEBOOK_CHUNK_CHARS)
+        if len(chunks) > 1:
+            home_details = await self._async_parse_chunks(ctx, chunks, rulebook_text)
+            if home_details is not None:
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    content=types.Content(
+                        parts=[types.Part(text=" OK, I have reviewed the rulebook.\n")]
+                    ),
+                    partial=True,
+                    turn_complete=False,
+                )
+        else:
+            async for event in self.parser_agent.run_async(ctx):
+                debug_info = event.model_dump_json(indent=2, exclude_none=True)
+                _LOGGER.debug(
+                    f"[{self.name}] Event from RulebookParser: {debug_info[:200]}..."
+                )
+                if (text := _final_response_text(event)) is None:
+                    continue
+                try:
+                    home_details = ParsedHomeDetails.model_validate_json(text)
+                except ValueError as err:
+                    _LOGGER.warning("[%s] Invalid parsed rulebook: %s", self.name, err)
+                    continue
+                # The model is not asked to repeat the whole rulebook in its response
+                home_details.raw_text = rulebook_text
                 yield Event(
                     author=event.author,
                     invocation_id=event.invocation_id,
                     content=types.Content(
                         parts=[types.Part(text=" OK, I have reviewed the rulebook.\n")]
                     ),
-                    partial=event.partial,
-                    turn_complete=event.turn_complete,
-                    # Make sure to set the state delta so the context is updated
-                    actions=EventActions(state_delta=event.actions.state_delta),
+                    partial=True,
+                    turn_complete=False,
                 )
 
-        if (
-            _PARSED_RULEBOOK_KEY not in ctx.session.state
-            or not ctx.session.state[_PARSED_RULEBOOK_KEY]
-        ):
+        if home_details is None:
             _LOGGER.error(
                 f"[{self.name}] Failed to generate initial rulebook details. Aborting workflow."
             )
@@ -171,20 +299,42 @@ class RulebookPipelineAgent(BaseAgent):
             )
             return
 
-        initial_rulebook_dict = ctx.session.state[_PARSED_RULEBOOK_KEY]
-        home_details = ParsedHomeDetails(**initial_rulebook_dict)
+        # The rules are filled in as they are parsed, and the reviewer finds the
+        # parsed rulebook by the reference in the session state.
+        ref = self.pending_rulebooks.put(ctx.session.id, rulebook_hash, home_details)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={_PARSED_RULEBOOK_REF_KEY: ref}),
+        )
         _LOGGER.info(
             f"[{self.name}] Initial parsing complete. Found {len(home_details.raw_smart_home_rules_text)} raw rule snippets."
         )
 
         # 2. Parse Individual Smart Home Rules Concurrently
+        all_rules_parsed = True
         if home_details.raw_smart_home_rules_text:
             _LOGGER.info(
                 f"[{self.name}] Preparing to parse {len(home_details.raw_smart_home_rules_text)} rule snippets concurrently..."
             )
 
-            subagents = []
-            for i, snippet in enumerate(home_details.raw_smart_home_rules_text):
+            # Rules with a snippet identical to a previous run are reused from
+            # the rule parse cache and are not sent to the model again.
+            rule_parse_cache = await async_read_rule_parse_cache(
+                self.hass, self.config_entry.entry_id
+            )
+            snippets = home_details.raw_smart_home_rules_text
+            cache_keys = [
+                rule_parse_cache_key(snippet, RULE_PARSER_MODEL) for snippet in snippets
+            ]
+            parsed_rules: dict[int, ParsedSmartHomeRule] = {}
+            for i, snippet in enumerate(snippets):
+                if (cached_rule := rule_parse_cache.get(cache_keys[i])) is not None:
+                    parsed_rules[i] = cached_rule.model_copy(
+                        update={"rule_raw_text": snippet}
+                    )
+                    continue
+
                 yield Event(
                     author=self.name,
                     invocation_id=ctx.invocation_id,
@@ -197,123 +347,155 @@ class RulebookPipelineAgent(BaseAgent):
                     turn_complete=False,
                 )
 
-                input_key = _RULE_TEXT_INPUT_KEY.format(rule_index=i)
-                output_key = _RULE_TEXT_OUTPUT_KEY.format(rule_index=i)
-                rule_parser_agent = async_create_smart_home_rule_parser_agent(
-                    self.hass,
-                    self.config_entry,
-                    input_key=input_key,
-                    output_key=output_key,
-                )
-                subagents.append(rule_parser_agent)
-
-                ctx.session.state[input_key] = snippet
-
-            semaphore = asyncio.Semaphore(_MAX_CONCURRENT_RULE_PARSERS)
-            event_queue = asyncio.Queue()
-
-            async def run_subagent(subagent) -> None:
-                async with semaphore:
-                    async for event in subagent.run_async(ctx):
-                        await event_queue.put(event)
-
-            # Start all subagents as background tasks
-            tasks = [asyncio.create_task(run_subagent(agent)) for agent in subagents]
-
-            # Enqueue a sentinel (None) when all tasks finish
-            async def wait_for_all() -> None:
-                await asyncio.gather(*tasks)
-                await event_queue.put(None)
-
-            asyncio.create_task(wait_for_all())
+            _LOGGER.debug(
+                "[%s] Reusing %d cached rules, parsing %d rules",
+                self.name,
+                len(parsed_rules),
+                len(snippets) - len(parsed_rules),
+            )
 
-            # Yield events from the queue to the caller
-            while True:
-                event = await event_queue.get()
-                if event is None:
+            # Rules are first parsed in batches to avoid repeating the parser
+            # instructions for every rule. Any rule missing from a batch
+            # response is then parsed on its own. A rule that was already
+            # parsed on its own in the first pass is not tried again.
+            retry = list(range(len(snippets)))
+            for batched in (True, False):
+                pending = [i for i in retry if i not in parsed_rules]
+                if not pending:
                     break
-
-                debug_info = event.model_dump_json(indent=2, exclude_none=True)
-                _LOGGER.debug(
-                    f"[{self.name}] Event from RulebookParser: {debug_info[:200]}..."
-                )
-                if event.actions.state_delta:
-                    _LOGGER.info("State delta detected, yielding event.")
-                    # No output content, just update the state
+                parsers = self._create_rule_parsers(snippets, pending, batched)
+                retry = [
+                    i for indexes, _ in parsers if len(indexes) > 1 for i in indexes
+                ]
+                async for completed_rules in self._async_run_rule_parsers(
+                    ctx, snippets, parsers
+                ):
+                    for rule_index, parsed_rule in completed_rules:
+                        parsed_rules[rule_index] = parsed_rule
+                        rule_parse_cache[cache_keys[rule_index]] = parsed_rule
+
+                    # Checkpoint the partial results so that an interrupted run
+                    # only needs to parse the rules that did not complete.
+                    await async_write_rule_parse_cache(
+                        self.hass, rule_parse_cache, self.config_entry.entry_id
+                    )
+                    home_details.smart_home_rules = [
+                        parsed_rules[i] for i in sorted(parsed_rules)
+                    ]
                     yield Event(
-                        author=event.author,
-                        invocation_id=event.invocation_id,
-                        partial=event.partial,
-                        turn_complete=event.turn_complete,
-                        # Make sure to set the state delta so the context is updated
-                        actions=EventActions(state_delta=event.actions.state_delta),
+                        author=self.name,
+                        invocation_id=ctx.invocation_id,
+                        content=types.Content(
+                            parts=[
+                                types.Part(
+                                    text=f'\nParsed rule "{rule.rule_name or rule.rule_raw_text[:50]}".'
+                                )
+                                for _, rule in completed_rules
+                            ]
+                        ),
+                        partial=True,
+                        turn_complete=False,
                     )
 
-            # Process the results of the parallel parsing
-            _LOGGER.info(
-                f"[{self.name}] Finished parsing individual smart home rules. Processing results..."
-            )
-            parsed_smart_home_rules = []
-            for i, snippet in enumerate(home_details.raw_smart_home_rules_text):
-                output_key = _RULE_TEXT_OUTPUT_KEY.format(rule_index=i)
-                parsed_rule_dict = ctx.session.state.get(output_key)
-                if not parsed_rule_dict:
+            for i in range(len(home_details.raw_smart_home_rules_text)):
+                if i not in parsed_rules:
                     _LOGGER.warning(
                         f"[{self.name}] No parsed rule found for snippet {i + 1}. This may indicate an issue with the parsing agent."
                     )
-                    continue
-                _LOGGER.debug(
-                    f"[{self.name}] Parsed rule snippet {i + 1}: {parsed_rule_dict}"
-                )
-                parsed_rule = ParsedSmartHomeRule(**parsed_rule_dict)
-                parsed_smart_home_rules.append(parsed_rule)
             _LOGGER.info(
-                f"[{self.name}] Successfully parsed {len(parsed_smart_home_rules)} smart home rules."
+                f"[{self.name}] Successfully parsed {len(parsed_rules)} smart home rules."
             )
-            home_details.smart_home_rules = parsed_smart_home_rules
-            # Update the main parsed rulebook in the context state with the fully parsed rules
-            ctx.session.state[_PARSED_RULEBOOK_KEY] = home_details.model_dump()
+            all_rules_parsed = len(parsed_rules) == len(snippets)
+
+            # Only keep entries for the current rules so the cache does not grow
+            current_rule_parse_cache = {
+                cache_keys[i]: rule for i, rule in parsed_rules.items()
+            }
+            if current_rule_parse_cache.keys() != rule_parse_cache.keys():
+                await async_write_rule_parse_cache(
+                    self.hass, current_rule_parse_cache, self.config_entry.entry_id
+                )
+
+            # A rule that failed to parse would look removed from the rulebook
+            # and be deleted without review, so the stored version of the rule
+            # is kept instead. The rule is parsed again on the next run.
+            if not all_rules_parsed:
+                parsed_rules.update(
+                    await self._async_stored_rules(snippets, parsed_rules)
+                )
+            home_details.smart_home_rules = [
+                parsed_rules[i] for i in sorted(parsed_rules)
+            ]
         else:
             _LOGGER.info(
                 f"[{self.name}] No raw smart home rule snippets found to parse."
             )
 
         # 3. Rulebook Review
-        _LOGGER.info(f"[{self.name}] Running RulebookReviewer...")
         current_parsed_rulebook = await async_read_parsed_rulebook(
             self.hass, self.config_entry.entry_id
         )
-        current_parsed_rulebook_json = (
-            current_parsed_rulebook.model_dump_json(indent=2)
-            if current_parsed_rulebook
-            else "{}"
-        )
-        ctx.session.state[_PREVIOUS_PARSED_RULEBOOK_JSON_KEY] = (
-            current_parsed_rulebook_json
-        )
-        ctx.session.state[_PARSED_RULEBOOK_JSON_KEY] = home_details.model_dump_json(
-            indent=2
-        )
-        yield Event(
-            author=self.name,
-            invocation_id=ctx.invocation_id,
-            content=types.Content(
-                parts=[
-                    types.Part(
-                        text="\nNow I will have a look at your previous rulebook and see if there are any significant updates.\n"
-                    )
-                ]
-            ),
-            partial=True,
-            turn_complete=False,
-        )
+        rulebook_diff = diff_home_details(current_parsed_rulebook, home_details)
+        if rulebook_diff.is_empty or rulebook_diff.is_structural:
+            # The outcome is clear without asking the reviewer model
+            if rulebook_diff.is_empty:
+                _LOGGER.debug("[%s] Parsed rulebook is unchanged", self.name)
+                message = "\nI reviewed your rulebook and found no changes compared to the stored version, so it remains unchanged."
+            else:
+                _LOGGER.debug(
+                    "[%s] Storing rulebook with structural changes: %s",
+                    self.name,
+                    rulebook_diff.describe(),
+                )
+                await _async_store_rulebook(self.hass, self.config_entry, home_details)
+                message = f"\nI found significant updates in the rulebook ({'; '.join(rulebook_diff.describe())}). I have now stored the latest version."
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                content=types.Content(parts=[types.Part(text=message)]),
+                partial=True,
+                turn_complete=False,
+            )
+        else:
+            _LOGGER.info(f"[{self.name}] Running RulebookReviewer...")
+            ctx.session.state[_RULEBOOK_DIFF_JSON_KEY] = fit_json(
+                rulebook_diff.as_dict(), _RULEBOOK_DIFF_TOKEN_BUDGET
+            )
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                content=types.Content(
+                    parts=[
+                        types.Part(
+                            text="\nNow I will have a look at your previous rulebook and see if there are any significant updates.\n"
+                        )
+                    ]
+                ),
+                partial=True,
+                turn_complete=False,
+            )
 
-        # Use the reviewer_agent instance attribute assigned during init
-        async for event in self.reviewer_agent.run_async(ctx):
-            _LOGGER.debug(
-                f"[{self.name}] Event from RulebookReviewer: {event.model_dump_json(indent=2, exclude_none=True)}"
+            # Use the reviewer_agent instance attribute assigned during init
+            async for event in self.reviewer_agent.run_async(ctx):
+                _LOGGER.debug(
+                    f"[{self.name}] Event from RulebookReviewer: {event.model_dump_json(indent=2, exclude_none=True)}"
+                )
+                yield event
+
+        # The rulebook text is only skipped next time when the stored rulebook is
+        # exactly what was parsed from it. Rules that failed to parse, or changes
+        # the reviewer did not store, are parsed again on the next run.
+        stored_rulebook = await async_read_parsed_rulebook(
+            self.hass, self.config_entry.entry_id
+        )
+        if (
+            all_rules_parsed
+            and stored_rulebook is not None
+            and diff_home_details(stored_rulebook, home_details).is_empty
+        ):
+            await async_write_rulebook_hash(
+                self.hass, rulebook_hash, self.config_entry.entry_id
             )
-            yield event
 
         _LOGGER.info(f"[{self.name}] Workflow finished.")
         yield Event(
@@ -324,55 +506,325 @@ class RulebookPipelineAgent(BaseAgent):
             ),
         )
 
+    async def _async_parse_chunks(
+        self, ctx: InvocationContext, chunks: list[str], rulebook_text: str
+    ) -> ParsedHomeDetails | None:
+        """Parse the sections of a large rulebook concurrently and merge them.
+
+        The parsing time depends on the largest chunk rather than the whole
+        rulebook. Nothing is returned unless every chunk is parsed, since a
+        missing chunk would look like its areas, people and rules were removed.
+        """
+        _LOGGER.debug("[%s] Parsing the rulebook in %d chunks", self.name, len(chunks))
+
+        async def parse_chunk(chunk: str) -> ParsedHomeDetails | None:
+            agent = _create_parser_agent(self.hass, self.config_entry, chunk)
+            parsed: ParsedHomeDetails | None = None
+            try:
+                async for event in agent.run_async(ctx):
+                    if (text := _final_response_text(event)) is not None:
+                        parsed = ParsedHomeDetails.model_validate_json(text)
+            except (APIError, ValueError) as err:
+                _LOGGER.warning("[%s] Failed to parse a chunk: %s", self.name, err)
+            return parsed
+
+        parts = await asyncio.gather(*(parse_chunk(chunk) for chunk in chunks))
+        if any(part is None for part in parts):
+            return None
+        return merge_home_details(
+            [part for part in parts if part is not None], rulebook_text
+        )
+
+    def _create_rule_parsers(
+        self, snippets: list[str], pending: list[int], batched: bool
+    ) -> list[tuple[list[int], Callable[[], BaseAgent]]]:
+        """Create factories for the rule parser agents of the pending snippets.
+
+        Returns the indexes of the rule snippets parsed by each agent along
+        with the agent factory.
+        """
+        if batched:
+            batches = [
+                [pending[i] for i in batch]
+                for batch in split_rule_batches(
+                    [snippets[i] for i in pending],
+                    token_budget=_RULE_BATCH_TOKEN_BUDGET,
+                    max_batch_size=_MAX_RULES_PER_BATCH,
+                )
+            ]
+        else:
+            batches = [[i] for i in pending]
+
+        parsers: list[tuple[list[int], Callable[[], BaseAgent]]] = []
+        for batch in batches:
+            if len(batch) == 1:
+                agent_factory = partial(
+                    async_create_smart_home_rule_parser_agent,
+                    self.hass,
+                    self.config_entry,
+                    rule_text=snippets[batch[0]],
+                )
+            else:
+                agent_factory = partial(
+                    async_create_smart_home_rule_batch_parser_agent,
+                    self.hass,
+                    self.config_entry,
+                    rule_texts=[snippets[i] for i in batch],
+                )
+            parsers.append((batch, agent_factory))
+
+        _LOGGER.debug(
+            "[%s] Parsing %d rules with %d requests",
+            self.name,
+            len(pending),
+            len(parsers),
+        )
+        return parsers
+
+    async def _async_run_rule_parsers(
+        self,
+        ctx: InvocationContext,
+        snippets: list[str],
+        parsers: list[tuple[list[int], Callable[[], BaseAgent]]],
+    ) -> AsyncGenerator[list[tuple[int, ParsedSmartHomeRule]]]:
+        """Run the rule parsers concurrently, yielding rules as they are parsed.
+
+        Rules are yielded as soon as each parser completes rather than waiting
+        for the slowest parser. Parsing is idempotent, so a parser that is
+        slower than usual is hedged with a duplicate run. The parsers are
+        cancelled if the caller stops consuming the rules early.
+        """
+        result_queue: asyncio.Queue[list[tuple[int, ParsedSmartHomeRule]] | None] = (
+            asyncio.Queue()
+        )
+
+        async def run_subagent(
+            indexes: list[int], agent_factory: Callable[[], BaseAgent]
+        ) -> None:
+            try:
+                async with (
+                    self.rule_parser_limiter.slot(),
+                    asyncio.timeout(run_deadline_seconds(RULE_PARSER_POLICY)),
+                ):
+                    events = await async_run_hedged(
+                        ctx, agent_factory, self.rule_parser_latency
+                    )
+                for event in events:
+                    debug_info = event.model_dump_json(indent=2, exclude_none=True)
+                    _LOGGER.debug(
+                        f"[{self.name}] Event from RuleParser: {debug_info[:200]}..."
+                    )
+                    if (text := _final_response_text(event)) is not None and (
+                        completed_rules := _match_parsed_rules(snippets, indexes, text)
+                    ):
+                        await result_queue.put(completed_rules)
+            except (TimeoutError, APIError, ValueError) as err:
+                # The rules are left out of this run and are retried
+                # since they are missing from the cache.
+                _LOGGER.warning(
+                    "[%s] Failed to parse smart home rules: %s", self.name, err
+                )
+
+        # Start all subagents as background tasks
+        tasks = [
+            asyncio.create_task(run_subagent(indexes, agent_factory))
+            for indexes, agent_factory in parsers
+        ]
+
+        # Enqueue a sentinel (None) when all tasks finish, even if one of them
+        # raised an unexpected error, so the rules that completed are still used
+        async def wait_for_all() -> None:
+            try:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        _LOGGER.error(
+                            "[%s] Unexpected error parsing smart home rules",
+                            self.name,
+                            exc_info=result,
+                        )
+            finally:
+                result_queue.put_nowait(None)
+
+        waiter = asyncio.create_task(wait_for_all())
+        try:
+            while (completed_rules := await result_queue.get()) is not None:
+                yield completed_rules
+        finally:
+            for task in (*tasks, waiter):
+                task.cancel()
+            await asyncio.gather(*tasks, waiter, return_exceptions=True)
+
+    async def _async_stored_rules(
+        self, snippets: list[str], parsed_rules: dict[int, ParsedSmartHomeRule]
+    ) -> dict[int, ParsedSmartHomeRule]:
+        """Return the stored rules for the snippets that were not parsed."""
+        stored_rulebook = await async_read_parsed_rulebook(
+            self.hass, self.config_entry.entry_id
+        )
+        if stored_rulebook is None:
+            return {}
+        stored_rules = {
+            normalize_text(rule.rule_raw_text): rule
+            for rule in stored_rulebook.smart_home_rules
+        }
+        return {
+            i: rule
+            for i, snippet in enumerate(snippets)
+            if i not in parsed_rules
+            and (rule := stored_rules.get(normalize_text(snippet))) is not None
+        }
+
+    async def _async_is_unchanged(self, rulebook_hash: str) -> bool:
+        """Return True if the stored rulebook was parsed from the same text."""
+        entry_id = self.config_entry.entry_id
+        if await async_read_rulebook_hash(self.hass, entry_id) != rulebook_hash:
+            return False
+        return await async_read_parsed_rulebook(self.hass, entry_id) is not None
+
+
+async def _async_store_rulebook(
+    hass: HomeAssistant,
+    config_entry: RulebookConfigEntry,
+    parsed_rulebook: ParsedHomeDetails,
+) -> None:
+    """Store the parsed rulebook and record it in the rulebook history."""
+    await async_write_parsed_rulebook(hass, parsed_rulebook, config_entry.entry_id)
+    version = await config_entry.runtime_data.history.async_append(parsed_rulebook)
+    _LOGGER.debug("Stored parsed rulebook version %d", version)
+
+
+def _final_response_text(event: Event) -> str | None:
+    """Return the text of a final response event, such as a JSON output."""
+    if event.partial or not event.is_final_response() or not event.content:
+        return None
+    text = "".join(
+        part.text
+        for part in event.content.parts or ()
+        if part.text and not part.thought
+    )
+    return text or None
+
+
+def _match_parsed_rules(
+    snippets: list[str], indexes: list[int], text: str
+) -> list[tuple[int, ParsedSmartHomeRule]]:
+    """Match the output of a rule parser to the rule snippets it was given.
+
+    Rules in a batch response are matched by their raw text since the model
+    may reorder or drop rules. Rules that can't be matched are left for a
+    parser of their own.
+    """
+    if len(indexes) == 1:
+        rule = ParsedSmartHomeRule.model_validate_json(text)
+        rule_index = indexes[0]
+        rule = rule.model_copy(update={"rule_raw_text": snippets[rule_index]})
+        return [(rule_index, rule)]
+
+    indexes_by_text = {normalize_text(snippets[i]): i for i in indexes}
+    matched: list[tuple[int, ParsedSmartHomeRule]] = []
+    for rule in ParsedSmartHomeRuleBatch.model_validate_json(text).rules:
+        rule_index = indexes_by_text.pop(normalize_text(rule.rule_raw_text), None)
+        if rule_index is None:
+            _LOGGER.debug("Ignoring unmatched rule in batch: %s", rule.rule_raw_text)
+            continue
+        matched.append(
+            (
+                rule_index,
+                rule.model_copy(update={"rule_raw_text": snippets[rule_index]}),
+            )
+        )
+    return matched
+
 
 class RulebookStorageTool:
     """Tool for reading and writing the parsed rulebook to storage."""
 
-    def __init__(self, hass: HomeAssistant, config_entry: RulebookConfigEntry) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: RulebookConfigEntry,
+        pending_rulebooks: PendingRulebookStore,
+    ) -> None:
         """Initialize the RulebookStorageTool with the Home Assistant instance."""
         self.hass = hass
         self.config_entry = config_entry
+        self.pending_rulebooks = pending_rulebooks
 
     async def store_rulebook(self, tool_context: ToolContext) -> dict[str, Any]:
         """Tool for storing the parsed rulebook for this session in storage.
 
-        The parsed rulebook from the session is automatically injected into the
-        tool context by nother agent. Invoking this tool will store the most
+        The parsed rulebook for the session is referenced from the tool context
+        state by another agent. Invoking this tool will store the most
         recent parsed rulebook in storage.
 
         Returns:
         - A message indicating the result of the storage operation.
         """
-        rulebook_dict = tool_context.state[_PARSED_RULEBOOK_KEY]
-        home_details = ParsedHomeDetails(**rulebook_dict)
-
-        await async_write_parsed_rulebook(
-            self.hass, home_details, self.config_entry.entry_id
-        )
+        if not (ref := tool_context.state.get(_PARSED_RULEBOOK_REF_KEY)):
+            return {
+                "success": False,
+                "message": "No parsed rulebook is waiting to be stored.",
+            }
+        if not (home_details := self.pending_rulebooks.get(ref)):
+            # The pending rulebook was dropped, such as after a restart
+            tool_context.state[_PARSED_RULEBOOK_REF_KEY] = None
+            return {
+                "success": False,
+                "message": "The parsed rulebook is no longer available. Ask the user to parse the rulebook again.",
+            }
+
+        await _async_store_rulebook(self.hass, self.config_entry, home_details)
         return {
             "success": True,
             "message": "Parsed rulebook written successfully.",
         }
 
 
-def async_create_agent(
-    hass: HomeAssistant, config_entry: RulebookConfigEntry
-) -> BaseAgent:
-    """Create and return an instance of the RulebookParserAgent."""
-    parser_agent = LlmAgent(
+def _create_parser_agent(
+    hass: HomeAssistant,
+    config_entry: RulebookConfigEntry,
+    rulebook_chunk: str | None = None,
+) -> LlmAgent:
+    """Create the agent that parses the rulebook, or a chunk of a large rulebook."""
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
+
+    def parser_instruction(_: ReadonlyContext) -> str:
+        """Return the parser instruction with the current rulebook text."""
+        if rulebook_chunk is not None:
+            return _PARSER_INSTRUCTION + _PARSER_CHUNK_INSTRUCTION + rulebook_chunk
+        rulebook_text = compact_text(config_entry.options[CONF_RULEBOOK])
+        return _PARSER_INSTRUCTION + rulebook_text + "\n\n"
+
+    return LlmAgent(
         name="RulebookParserAgent",
         model=AGENT_MODEL,
         description="Parses user rulebooks into a structured JSON format representing ParsedHomeDetails.",
-        instruction=_PARSER_INSTRUCTION,
+        instruction=parser_instruction,
+        generate_content_config=generate_content_config(RULEBOOK_PARSER_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         output_schema=ParsedHomeDetails,
-        output_key=_PARSED_RULEBOOK_KEY,
     )
-    tools = RulebookStorageTool(hass, config_entry)
+
+
+def async_create_agent(
+    hass: HomeAssistant, config_entry: RulebookConfigEntry
+) -> BaseAgent:
+    """Create and return an instance of the RulebookParserAgent."""
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
+    parser_agent = _create_parser_agent(hass, config_entry)
+    pending_rulebooks = PendingRulebookStore()
+    tools = RulebookStorageTool(hass, config_entry, pending_rulebooks)
     reviewer_agent = LlmAgent(
         name="RulebookReviewerAgent",
         model=SUMMARIZE_MODEL,
         description="Reviews the parsed rulebook for significant changes and decides if it should be persisted.",
         instruction=_REVIEWER_INSTRUCTION,
+        generate_content_config=generate_content_config(INTERACTIVE_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         disallow_transfer_to_peers=True,
         tools=[
             FunctionTool(func=tools.store_rulebook),
@@ -385,5 +837,8 @@ def async_create_agent(
         config_entry=config_entry,
         parser_agent=parser_agent,
         reviewer_agent=reviewer_agent,
+        rule_parser_limiter=AdaptiveConcurrencyLimiter.for_model(RULE_PARSER_MODEL),
+        rule_parser_latency=LatencyTracker(),
+        pending_rulebooks=pending_rulebooks,
     )
     return pipeline_agent
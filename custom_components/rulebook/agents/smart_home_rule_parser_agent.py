@@ -1,18 +1,24 @@
 """Agent for parsing individual smart home rules."""
 
+import json
 import logging
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
 from homeassistant.core import HomeAssistant
 
-from custom_components.rulebook.data.home import ParsedSmartHomeRule
+from custom_components.rulebook.data.home import (
+    ParsedSmartHomeRule,
+    ParsedSmartHomeRuleBatch,
+)
 from custom_components.rulebook.types import RulebookConfigEntry
 
-from .const import SUMMARIZE_MODEL
+from .budget import async_get_prompt_stats, estimate_tokens
+from .const import RULE_PARSER_MODEL
+from .policy import RULE_PARSER_POLICY, generate_content_config
 
 _LOGGER = logging.getLogger(__name__)
 
-
 _RULE_PARSER_INSTRUCTION = (
     "You are an expert at parsing individual smart home rules from text snippets. "
     "Your task is to analyze the provided text snippet for a single smart home rule and extract its core components. "
@@ -39,34 +45,136 @@ _RULE_PARSER_INSTRUCTION = (
     "The user's smart home rule text snippet is as follows:\n\n"
 )
 
+_RULE_BATCH_PARSER_INSTRUCTION = (
+    "You are an expert at parsing individual smart home rules from text snippets. "
+    "Your task is to analyze each of the provided text snippets, where each snippet describes a single smart home rule, and extract its core components. "
+    "The snippets are provided as a JSON list of strings. "
+    "You MUST respond with a single JSON object that strictly conforms to the 'ParsedSmartHomeRuleBatch' schema, which has a single 'rules' field. "
+    "The 'rules' field is a list containing exactly one 'ParsedSmartHomeRule' object for each input snippet, in the same order as the input. "
+    "Each 'ParsedSmartHomeRule' object includes the following fields: "
+    "  - 'rule_raw_text': The original text snippet you are parsing, copied exactly. This MUST be included in each rule. "
+    "  - 'rule_name': A concise, descriptive name for the rule (e.g., 'Turn on Porch Light at Sunset'). If not obvious, generate a suitable one. This can be null if not clearly determinable. "
+    "  - 'entities_mentioned': A list of all unique Home Assistant entity IDs or descriptive names of devices, locations, or people mentioned in the rule (e.g., ['light.porch_light', 'sun.sun', 'binary_sensor.front_door_motion', 'Mom']). Extract these as accurately as possible. "
+    "  - 'core_logic_text': The essential part of the rule that describes its primary trigger, conditions, and actions, in a condensed natural language form. This text will be used by another agent for more detailed parsing. (e.g., 'If motion at front door after sunset, turn on porch light for 5 minutes.'). This can be null if the core logic is not clear. "
+    "Parse each snippet independently and do not merge or split snippets. "
+    "Do not call any tools. Your only output should be the JSON object. "
+    "Here is an example: "
+    "Input rule text snippets: '[\"When the front door motion sensor detects movement after sunset, turn on the porch light for 5 minutes and send a notification to John.\"]' "
+    "Expected JSON output: "
+    "'''\n"
+    "{\n"
+    '  "rules": [\n'
+    "    {\n"
+    '      "rule_raw_text": "When the front door motion sensor detects movement after sunset, turn on the porch light for 5 minutes and send a notification to John.",\n'
+    '      "rule_name": "Front Door Motion Light & Notify",\n'
+    '      "entities_mentioned": ["front door motion sensor", "sunset", "porch light", "John"],\n'
+    '      "core_logic_text": "If motion at front door after sunset, turn on porch light for 5 minutes and send notification to John."\n'
+    "    }\n"
+    "  ]\n"
+    "}\n"
+    "'''\n"
+    "The user's smart home rule text snippets are as follows:\n\n"
+)
+
+
+def split_rule_batches(
+    snippets: list[str], token_budget: int, max_batch_size: int
+) -> list[list[int]]:
+    """Split rule snippets into batches that fit within a token budget.
+
+    Snippets keep their order and a snippet that exceeds the budget on its
+    own is placed in a batch by itself.
+
+    Returns:
+        list[list[int]]: The indexes of the snippets in each batch.
+    """
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    batch_tokens = 0
+    for index, snippet in enumerate(snippets):
+        tokens = estimate_tokens(snippet)
+        if batch and (
+            batch_tokens + tokens > token_budget or len(batch) >= max_batch_size
+        ):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
 
 def async_create_agent(
     hass: HomeAssistant,
     config_entry: RulebookConfigEntry,
-    input_key: str,
-    output_key: str,
+    rule_text: str,
 ) -> LlmAgent:
     """Create and return an instance of the SmartHomeRuleParserAgent.
 
     This agent is responsible for parsing individual smart home rules from text snippets.
     It may be invoked multiple times in parallel to handle different rules simultaneously.
-    This agent is dynamically created and as a result has a dynamic input and output
-    key with details about the specific rule to parse.
+    This agent is dynamically created for the specific rule to parse. The rule text is
+    only added to the instruction when the model is called rather than being stored in
+    the session state, and the parsed rule is the JSON text of the final response.
 
     Args:
         hass (HomeAssistant): The Home Assistant instance.
         config_entry (RulebookConfigEntry): The configuration entry for the rulebook.
-        input_key (str): The key in the input data where the rule text snippet is located.
-        output_key (str): The key in the output data where the parsed rule will be stored.
+        rule_text (str): The smart home rule text snippet to parse.
     Returns:
         LlmAgent: An instance of the SmartHomeRuleParserAgent configured to parse smart home rules.
     """
+
+    def instruction(_: ReadonlyContext) -> str:
+        return _RULE_PARSER_INSTRUCTION + rule_text + "\n\n"
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
     return LlmAgent(
         name="SmartHomeRuleParserAgent",
-        model=SUMMARIZE_MODEL,
+        model=RULE_PARSER_MODEL,
         description="Parses a single smart home rule text snippet into a structured ParsedSmartHomeRule JSON format.",
-        instruction=_RULE_PARSER_INSTRUCTION + "{" + input_key + "}\n\n",
+        instruction=instruction,
+        generate_content_config=generate_content_config(RULE_PARSER_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
         disallow_transfer_to_peers=True,
         output_schema=ParsedSmartHomeRule,
-        output_key=output_key,
+    )
+
+
+def async_create_batch_agent(
+    hass: HomeAssistant,
+    config_entry: RulebookConfigEntry,
+    rule_texts: list[str],
+) -> LlmAgent:
+    """Create and return an instance of the SmartHomeRuleBatchParserAgent.
+
+    This agent parses several smart home rule text snippets in a single request,
+    so the instructions are only sent once for the whole batch. The snippets are
+    sent as a JSON list.
+
+    Args:
+        hass (HomeAssistant): The Home Assistant instance.
+        config_entry (RulebookConfigEntry): The configuration entry for the rulebook.
+        rule_texts (list[str]): The smart home rule text snippets to parse.
+    Returns:
+        LlmAgent: An instance of the SmartHomeRuleBatchParserAgent.
+    """
+
+    def instruction(_: ReadonlyContext) -> str:
+        return _RULE_BATCH_PARSER_INSTRUCTION + json.dumps(rule_texts) + "\n\n"
+
+    prompt_stats = async_get_prompt_stats(hass, config_entry.entry_id)
+    return LlmAgent(
+        name="SmartHomeRuleBatchParserAgent",
+        model=RULE_PARSER_MODEL,
+        description="Parses a batch of smart home rule text snippets into a structured ParsedSmartHomeRuleBatch JSON format.",
+        instruction=instruction,
+        generate_content_config=generate_content_config(RULE_PARSER_POLICY),
+        before_model_callback=prompt_stats.before_model,
+        after_model_callback=prompt_stats.after_model,
+        disallow_transfer_to_peers=True,
+        output_schema=ParsedSmartHomeRuleBatch,
     )
@@ -0,0 +1,207 @@
+"""Index of the automations loaded in Home Assistant.
+
+Comparing the rulebook with the existing automations asks which automations
+use an entity, which automation was created for a rule and which automations
+have a type of trigger. The index answers these with dictionary lookups. It is
+built from the automations loaded by the automation component and is updated
+for only the automations whose config changed when automations are reloaded.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.automation import (
+    DATA_COMPONENT,
+    EVENT_AUTOMATION_RELOADED,
+)
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.start import async_at_started
+
+from .data.automation import RULE_ID_PREFIX
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class IndexedAutomation:
+    """An automation loaded in Home Assistant."""
+
+    entity_id: str
+    id: str | None
+    """The id of the automation config, which is the rulebook id of a rule."""
+
+    alias: str
+    trigger_types: frozenset[str]
+    entities: frozenset[str]
+    """Entities referenced by the triggers, conditions and actions."""
+
+    config: dict[str, Any]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the automation as a dictionary for a tool response."""
+        return {
+            "entity_id": self.entity_id,
+            "id": self.id,
+            "alias": self.alias,
+            "trigger_types": sorted(self.trigger_types),
+            "entities": sorted(self.entities),
+        }
+
+
+class AutomationIndex:
+    """Index of the loaded automations by entity, rulebook id and trigger type."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the AutomationIndex."""
+        self._hass = hass
+        self._automations: dict[str, IndexedAutomation] = {}
+        self._by_entity: dict[str, set[str]] = {}
+        self._by_rulebook_id: dict[str, str] = {}
+        self._by_trigger_type: dict[str, set[str]] = {}
+        self.updates = 0
+
+    @callback
+    def async_start(self) -> Callable[[], None]:
+        """Index the automations once started and subscribe to reloads.
+
+        Returns a callback that unsubscribes from the reloads.
+        """
+        unsubs = [
+            async_at_started(self._hass, self._async_started),
+            self._hass.bus.async_listen(
+                EVENT_AUTOMATION_RELOADED, self._async_automation_reloaded
+            ),
+        ]
+
+        @callback
+        def async_stop() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return async_stop
+
+    def for_entity(self, entity_id: str) -> list[IndexedAutomation]:
+        """Return the automations that reference the entity."""
+        return self._lookup(self._by_entity.get(entity_id, ()))
+
+    def for_entities(self, entity_ids: Iterable[str]) -> list[IndexedAutomation]:
+        """Return the automations that reference any of the entities."""
+        automation_ids: set[str] = set()
+        for entity_id in entity_ids:
+            automation_ids.update(self._by_entity.get(entity_id, ()))
+        return self._lookup(automation_ids)
+
+    def for_rulebook_id(self, rulebook_id: str) -> IndexedAutomation | None:
+        """Return the automation created for the rule with the rulebook id."""
+        if (entity_id := self._by_rulebook_id.get(rulebook_id)) is None:
+            return None
+        return self._automations[entity_id]
+
+    def rulebook_automations(self) -> list[IndexedAutomation]:
+        """Return the automations that were created for a rule."""
+        return self._lookup(self._by_rulebook_id.values())
+
+    def with_trigger_type(self, trigger_type: str) -> list[IndexedAutomation]:
+        """Return the automations with a trigger of the type, such as 'sun'."""
+        return self._lookup(self._by_trigger_type.get(trigger_type, ()))
+
+    def stats(self) -> dict[str, int]:
+        """Return index counters for diagnostics."""
+        return {
+            "automations": len(self._automations),
+            "rulebook_automations": len(self._by_rulebook_id),
+            "entities": len(self._by_entity),
+            "updates": self.updates,
+        }
+
+    def _lookup(self, entity_ids: Iterable[str]) -> list[IndexedAutomation]:
+        """Return the automations with the entity ids, in a stable order."""
+        return [self._automations[entity_id] for entity_id in sorted(entity_ids)]
+
+    @callback
+    def _async_started(self, hass: HomeAssistant) -> None:
+        """Index the automations loaded during startup."""
+        self._async_refresh()
+
+    @callback
+    def _async_automation_reloaded(self, event: Event) -> None:
+        """Update the automations that changed when automations are reloaded."""
+        self._async_refresh()
+
+    @callback
+    def _async_refresh(self) -> None:
+        """Update the index for automations that were added, changed or removed."""
+        if (component := self._hass.data.get(DATA_COMPONENT)) is None:
+            return
+        loaded: dict[str, IndexedAutomation] = {}
+        for entity in component.entities:
+            config = dict(entity.raw_config or {})
+            indexed = self._automations.get(entity.entity_id)
+            if indexed is not None and indexed.config == config:
+                loaded[entity.entity_id] = indexed
+                continue
+            loaded[entity.entity_id] = IndexedAutomation(
+                entity_id=entity.entity_id,
+                id=entity.unique_id,
+                alias=config.get("alias") or entity.name or entity.entity_id,
+                trigger_types=frozenset(_trigger_types(config)),
+                entities=frozenset(entity.referenced_entities),
+                config=config,
+            )
+
+        for entity_id, indexed in list(self._automations.items()):
+            if loaded.get(entity_id) is not indexed:
+                self._async_remove(indexed)
+        for entity_id, indexed in loaded.items():
+            if entity_id not in self._automations:
+                self._async_add(indexed)
+        _LOGGER.debug("Indexed %d automations", len(self._automations))
+
+    @callback
+    def _async_add(self, indexed: IndexedAutomation) -> None:
+        """Add the automation to the index."""
+        self._automations[indexed.entity_id] = indexed
+        for entity_id in indexed.entities:
+            self._by_entity.setdefault(entity_id, set()).add(indexed.entity_id)
+        for trigger_type in indexed.trigger_types:
+            self._by_trigger_type.setdefault(trigger_type, set()).add(indexed.entity_id)
+        if indexed.id is not None and indexed.id.startswith(RULE_ID_PREFIX):
+            self._by_rulebook_id[indexed.id] = indexed.entity_id
+        self.updates += 1
+
+    @callback
+    def _async_remove(self, indexed: IndexedAutomation) -> None:
+        """Remove the automation from the index."""
+        del self._automations[indexed.entity_id]
+        for index, keys in (
+            (self._by_entity, indexed.entities),
+            (self._by_trigger_type, indexed.trigger_types),
+        ):
+            for key in keys:
+                entity_ids = index[key]
+                entity_ids.discard(indexed.entity_id)
+                if not entity_ids:
+                    del index[key]
+        if (
+            indexed.id is not None
+            and self._by_rulebook_id.get(indexed.id) == indexed.entity_id
+        ):
+            del self._by_rulebook_id[indexed.id]
+
+
+def _trigger_types(config: dict[str, Any]) -> set[str]:
+    """Return the types of the triggers in an automation config."""
+    triggers = config.get("triggers", config.get("trigger", []))
+    if not isinstance(triggers, list):
+        triggers = [triggers]
+    trigger_types = set()
+    for trigger in triggers:
+        if not isinstance(trigger, dict):
+            continue
+        # Automations written before 2024.10 use 'platform' for the trigger type
+        trigger_type = trigger.get("trigger", trigger.get("platform"))
+        if isinstance(trigger_type, str):
+            trigger_types.add(trigger_type)
+    return trigger_types
@@ -12,3 +12,10 @@ TIMEOUT_MILLIS = 10000
 
 STORAGE_DIR = "rulebook"
 PARSED_RULEBOOK_FILENAME = "parsed_rulebook.json"
+RULEBOOK_HASH_FILENAME = "rulebook_text.sha256"
+RULE_PARSE_CACHE_FILENAME = "rule_parse_cache.json"
+SESSIONS_DB_FILENAME = "sessions.db"
+HISTORY_FILENAME = "rulebook_history.jsonl"
+
+# Automations created from the rulebook, included from configuration.yaml
+AUTOMATIONS_FILENAME = "rulebook_automations.yaml"
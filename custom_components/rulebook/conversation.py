@@ -7,7 +7,6 @@ from typing import Literal
 from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.events.event import Event
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from google.genai.errors import APIError
 from homeassistant.components import conversation
@@ -24,6 +23,7 @@ from .types import RulebookConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 _ERROR_GETTING_RESPONSE = "Sorry, I had a problem getting a response from the Agent."
+_RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
 
 
 async def async_setup_entry(
@@ -102,7 +102,16 @@ class RulebookConversationEntity(
             model="Rulebook Agent",
             entry_type=dr.DeviceEntryType.SERVICE,
         )
-        self._session_service = InMemorySessionService()
+        # The runner is reused for every turn since the agent tree only changes
+        # when the config entry is reloaded, which creates a new entity. The
+        # session for a new conversation, or one that was evicted, is created
+        # on its first turn.
+        self._runner = Runner(
+            agent=self._agent,
+            app_name=RULEBOOK,
+            session_service=entry.runtime_data.session_service,
+            auto_create_session=True,
+        )
 
     @property
     def supported_languages(self) -> list[str] | Literal["*"]:
@@ -120,6 +129,7 @@ class RulebookConversationEntity(
     async def async_will_remove_from_hass(self) -> None:
         """When entity will be removed from Home Assistant."""
         conversation.async_unset_agent(self.hass, self.entry)
+        await self._runner.close()
         await super().async_will_remove_from_hass()
 
     async def _async_handle_message(
@@ -164,37 +174,6 @@ class RulebookConversationEntity(
     ) -> None:
         """Generate an answer for the chat log."""
         user_id = context.user_id or "unknown_user"
-        session = await self._session_service.get_session(
-            app_name=RULEBOOK,
-            user_id=user_id,
-            session_id=chat_log.conversation_id,
-        )
-        if not session:
-            session = await self._session_service.create_session(
-                app_name=RULEBOOK,
-                user_id=user_id,
-                session_id=chat_log.conversation_id,
-            )
-
-        _LOGGER.info("--- Examining Session Properties ---")
-        _LOGGER.info(f"ID (`id`):                {session.id}")
-        _LOGGER.info(f"Application Name (`app_name`): {session.app_name}")
-        _LOGGER.info(f"User ID (`user_id`):         {session.user_id}")
-        _LOGGER.info(
-            f"State (`state`):           {session.state}"
-        )  # Note: Only shows initial state here
-        _LOGGER.info(f"Events (`events`):         {session.events}")  # Initially empty
-        _LOGGER.info(
-            f"Last Update (`last_update_time`): {session.last_update_time:.2f}"
-        )
-        _LOGGER.info("---------------------------------")
-
-        runner = Runner(
-            agent=self._agent,
-            app_name=RULEBOOK,
-            session_service=self._session_service,
-        )
-
         last_content = chat_log.content[-1]
         if not isinstance(last_content, conversation.UserContent):
             raise ValueError(  # noqa: TRY004
@@ -205,12 +184,11 @@ class RulebookConversationEntity(
             role="user", parts=[types.Part(text=last_content.content or "")]
         )
 
-        run_config = RunConfig(streaming_mode=StreamingMode.SSE)
-        event_stream = runner.run_async(
+        event_stream = self._runner.run_async(
             session_id=chat_log.conversation_id,
             new_message=content,
             user_id=user_id,
-            run_config=run_config,
+            run_config=_RUN_CONFIG,
         )
 
         async for chunk in chat_log.async_add_delta_content_stream(
@@ -0,0 +1,296 @@
+"""Compile smart home rules into Home Assistant automations.
+
+Many rules have a common shape, such as turning a light on at sunset, at a
+time of day or when motion is detected in an area. Each template is a set of
+patterns for the whole rule text with parameters for the entities, times and
+offsets. A rule that matches a template is compiled into an automation config
+without a model call, and only the rules that match no template are left for
+the LLM to write.
+
+A pattern must match the entire rule text, so a rule with an extra condition
+such as "only on weekdays" is never compiled into an automation that ignores
+the condition.
+"""
+
+import hashlib
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from .diff import normalize_text
+from .home import ParsedSmartHomeRule
+
+# Prefix of the id of an automation created for a rule
+RULE_ID_PREFIX = "rulebook_"
+
+# Returns the ids of the entities a mention may refer to, best first
+Resolve = Callable[[str], Iterable[str]]
+
+# Domains of the entities that a rule can turn on and off
+_SWITCH_DOMAINS = ("light", "switch", "fan", "input_boolean")
+_MOTION_DOMAINS = ("binary_sensor",)
+
+# A name of an entity or area, which does not contain the words of a pattern
+_NAME = (
+    r"(?:(?!\b(?:and|at|when|whenever|if|then|turn|switch|after|before|every|each|"
+    r"daily)\b)[\w'’ -])+?"
+)
+_ACTIONS = (
+    rf"(?:turn|switch) (?P<state>on|off) (?P<target>{_NAME})",
+    rf"(?:turn|switch) (?P<target>{_NAME}) (?P<state>on|off)",
+)
+_SUN = (
+    r"(?:(?P<offset>\d+) (?P<unit>minutes?|hours?) (?P<relation>before|after)|at) "
+    r"(?P<event>sunset|sunrise)"
+)
+_TIME = (
+    r"(?:(?:every|each) (?:day|night|morning|evening) |daily )?"
+    r"at (?P<hour>\d{1,2})(?::(?P<minute>\d{2}))? ?(?:(?P<meridiem>[ap])\.?m\.?)?"
+)
+_MOTION = (
+    r"(?:when|whenever|if) (?:motion is detected|there is motion|someone is detected) "
+    rf"(?:in|on|at) (?P<area>{_NAME})"
+)
+_MOTION_OFF = (
+    r"(?:,? and(?: then)?|,) turn (?:it|them|(?:the )?lights?) off after "
+    r"(?P<delay>\d+) (?P<delay_unit>seconds?|minutes?)"
+    r"(?: (?:of no|without|with no) motion)?"
+)
+
+
+class _TemplateError(Exception):
+    """The rule matches a template but cannot be compiled."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class CompiledAutomation:
+    """A smart home rule compiled into an automation config."""
+
+    rule: ParsedSmartHomeRule
+    template: str
+    config: dict[str, Any]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the automation as a dictionary for a tool response."""
+        return {
+            "rule_name": self.rule.rule_name,
+            "template": self.template,
+            "automation": self.config,
+        }
+
+
+@dataclass(frozen=True, kw_only=True)
+class UncompiledRule:
+    """A smart home rule that needs to be written by the LLM."""
+
+    rule: ParsedSmartHomeRule
+    reason: str
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the rule as a dictionary for a tool response."""
+        return {
+            "rule_name": self.rule.rule_name,
+            "rulebook_id": rule_id(self.rule),
+            "rule_raw_text": self.rule.rule_raw_text,
+            "core_logic_text": self.rule.core_logic_text,
+            "reason": self.reason,
+        }
+
+
+@dataclass(frozen=True, kw_only=True)
+class CompilationResult:
+    """The automations compiled from the smart home rules."""
+
+    compiled: tuple[CompiledAutomation, ...] = ()
+    uncompiled: tuple[UncompiledRule, ...] = ()
+
+
+@dataclass(frozen=True, kw_only=True)
+class _Template:
+    """Patterns for a shape of rule and a function that builds its automation."""
+
+    name: str
+    patterns: tuple[re.Pattern[str], ...]
+    build: Callable[[dict[str, Any], Resolve], dict[str, Any]]
+
+
+def rule_id(rule: ParsedSmartHomeRule) -> str:
+    """Return a stable id that links an automation to its rule."""
+    digest = hashlib.sha256(normalize_text(rule.rule_raw_text).encode()).hexdigest()
+    return f"{RULE_ID_PREFIX}{digest[:16]}"
+
+
+def compile_rule(
+    rule: ParsedSmartHomeRule, resolve: Resolve
+) -> CompiledAutomation | UncompiledRule:
+    """Compile a smart home rule with the first template that matches it."""
+    texts = [
+        _normalize_text(text)
+        for text in (rule.core_logic_text, rule.rule_raw_text)
+        if text
+    ]
+    reason = "The rule does not match any automation template."
+    for template in _TEMPLATES:
+        for pattern in template.patterns:
+            for text in texts:
+                if (match := pattern.fullmatch(text)) is None:
+                    continue
+                try:
+                    config = template.build(match.groupdict(), resolve)
+                except _TemplateError as err:
+                    reason = str(err)
+                    continue
+                return CompiledAutomation(
+                    rule=rule,
+                    template=template.name,
+                    config={
+                        "id": rule_id(rule),
+                        "alias": rule.rule_name or rule.rule_raw_text,
+                        "description": rule.rule_raw_text,
+                        **config,
+                    },
+                )
+    return UncompiledRule(rule=rule, reason=reason)
+
+
+def compile_rules(
+    rules: Iterable[ParsedSmartHomeRule], resolve: Resolve
+) -> CompilationResult:
+    """Compile the smart home rules that match an automation template."""
+    compiled: list[CompiledAutomation] = []
+    uncompiled: list[UncompiledRule] = []
+    for rule in rules:
+        result = compile_rule(rule, resolve)
+        if isinstance(result, CompiledAutomation):
+            compiled.append(result)
+        else:
+            uncompiled.append(result)
+    return CompilationResult(compiled=tuple(compiled), uncompiled=tuple(uncompiled))
+
+
+def _normalize_text(text: str) -> str:
+    """Normalize case, whitespace and the final punctuation of a rule."""
+    return normalize_text(text).rstrip(".!;")
+
+
+def _resolve_entity(resolve: Resolve, mention: str, domains: tuple[str, ...]) -> str:
+    """Return the best entity for the mention in one of the domains."""
+    for entity_id in resolve(mention):
+        if entity_id.split(".", 1)[0] in domains:
+            return entity_id
+    raise _TemplateError(f"No {'/'.join(domains)} entity found for '{mention}'.")
+
+
+def _switch_action(entity_id: str, state: str) -> dict[str, Any]:
+    """Return an action that turns the entity on or off."""
+    domain = entity_id.split(".", 1)[0]
+    return {"action": f"{domain}.turn_{state}", "target": {"entity_id": entity_id}}
+
+
+def _duration(value: int, unit: str) -> dict[str, int]:
+    """Return a duration in the automation config format."""
+    return {unit if unit.endswith("s") else f"{unit}s": value}
+
+
+def _build_sun(params: dict[str, Any], resolve: Resolve) -> dict[str, Any]:
+    """Build an automation that turns an entity on or off at sunset or sunrise."""
+    entity_id = _resolve_entity(resolve, params["target"], _SWITCH_DOMAINS)
+    trigger: dict[str, Any] = {"trigger": "sun", "event": params["event"]}
+    if params["offset"]:
+        minutes = int(params["offset"]) * (60 if params["unit"][0] == "h" else 1)
+        sign = "-" if params["relation"] == "before" else ""
+        trigger["offset"] = f"{sign}{minutes // 60:02d}:{minutes % 60:02d}:00"
+    return {
+        "triggers": [trigger],
+        "actions": [_switch_action(entity_id, params["state"])],
+        "mode": "single",
+    }
+
+
+def _build_time(params: dict[str, Any], resolve: Resolve) -> dict[str, Any]:
+    """Build an automation that turns an entity on or off at a time of day."""
+    hour = int(params["hour"])
+    minute = int(params["minute"] or 0)
+    if meridiem := params["meridiem"]:
+        if not 1 <= hour <= 12:
+            raise _TemplateError(f"Invalid time of day in the rule: {hour}{meridiem}m.")
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    elif params["minute"] is None or 1 <= hour <= 12:
+        # A time such as 7:30 could be in the morning or the evening, so only
+        # a 24-hour time that can't be read as 12-hour is accepted without it
+        raise _TemplateError("The time of day in the rule does not specify am or pm.")
+    if hour > 23 or minute > 59:
+        raise _TemplateError(f"Invalid time of day in the rule: {hour}:{minute:02d}.")
+    entity_id = _resolve_entity(resolve, params["target"], _SWITCH_DOMAINS)
+    return {
+        "triggers": [{"trigger": "time", "at": f"{hour:02d}:{minute:02d}:00"}],
+        "actions": [_switch_action(entity_id, params["state"])],
+        "mode": "single",
+    }
+
+
+def _build_motion_light(params: dict[str, Any], resolve: Resolve) -> dict[str, Any]:
+    """Build an automation that turns an entity on when motion is detected.
+
+    When the rule has a delay, the entity is turned off after there has been no
+    motion for the delay, which restarts if motion is detected again.
+    """
+    if params["state"] != "on":
+        raise _TemplateError("Only turning an entity on for motion is supported.")
+    motion_id = _resolve_entity(resolve, f"{params['area']} motion", _MOTION_DOMAINS)
+    entity_id = _resolve_entity(resolve, params["target"], _SWITCH_DOMAINS)
+    actions = [_switch_action(entity_id, "on")]
+    if params["delay"]:
+        actions.extend(
+            [
+                {
+                    "wait_for_trigger": [
+                        {
+                            "trigger": "state",
+                            "entity_id": motion_id,
+                            "from": "on",
+                            "to": "off",
+                        }
+                    ]
+                },
+                {"delay": _duration(int(params["delay"]), params["delay_unit"])},
+                _switch_action(entity_id, "off"),
+            ]
+        )
+    return {
+        "triggers": [{"trigger": "state", "entity_id": motion_id, "to": "on"}],
+        "actions": actions,
+        "mode": "restart" if params["delay"] else "single",
+    }
+
+
+def _patterns(*patterns: str) -> tuple[re.Pattern[str], ...]:
+    """Compile the patterns of a template for each form of the action."""
+    return tuple(
+        re.compile(pattern.replace("{action}", action))
+        for pattern in patterns
+        for action in _ACTIONS
+    )
+
+
+_TEMPLATES = (
+    _Template(
+        name="sun",
+        patterns=_patterns(f"{{action}} {_SUN}", f"{_SUN},? {{action}}"),
+        build=_build_sun,
+    ),
+    _Template(
+        name="time_of_day",
+        patterns=_patterns(f"{{action}} {_TIME}", f"{_TIME},? {{action}}"),
+        build=_build_time,
+    ),
+    _Template(
+        name="motion_light",
+        patterns=_patterns(
+            f"{_MOTION},? {{action}}(?:{_MOTION_OFF})?",
+            f"{{action}} {_MOTION}(?:{_MOTION_OFF})?",
+        ),
+        build=_build_motion_light,
+    ),
+)
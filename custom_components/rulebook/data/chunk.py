@@ -0,0 +1,231 @@
+"""Split a large rulebook into chunks and merge the details parsed from them.
+
+A rulebook is written as a Markdown document where each heading starts a
+section, such as the basic info of the home or its smart home rules. Whole
+sections are packed into chunks that are parsed independently. A section that
+is larger than a chunk is split between its paragraphs. Each chunk starts with
+the headings of the sections it is part of, so the parser knows the context.
+
+The details parsed from each chunk are merged in the order of the chunks, so
+the result does not depend on which chunk finished parsing first.
+"""
+
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from .diff import normalize_text
+from .home import (
+    BasicInfo,
+    LocationDetails,
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+from .reconcile import normalize_name
+
+COMPLETED_SUCCESSFULLY = "completed_successfully"
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+\S")
+_FENCE = re.compile(r"^[ \t]*(```|~~~)")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass(frozen=True, kw_only=True)
+class _Block:
+    """A section, or part of a section, of the rulebook."""
+
+    context: tuple[str, ...]
+    """Headings of the sections that contain the block."""
+
+    heading: str | None
+    text: str
+
+
+def split_rulebook(text: str, max_chars: int) -> list[str]:
+    """Split the rulebook into chunks of whole sections of up to max_chars.
+
+    A rulebook that fits in a single chunk is returned unchanged. A single
+    line that is longer than max_chars is not split.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks: list[str] = []
+    parts: list[str] = []
+    headings: set[str] = set()
+    size = 0
+    for block in _blocks(text, max_chars):
+        context = [heading for heading in block.context if heading not in headings]
+        block_size = sum(len(part) + 2 for part in (*context, block.text))
+        if parts and size + block_size > max_chars:
+            chunks.append("\n\n".join(parts))
+            parts = []
+            headings = set()
+            context = list(block.context)
+            block_size = sum(len(part) + 2 for part in (*context, block.text))
+        parts.extend([*context, block.text])
+        headings.update(context)
+        if block.heading is not None:
+            headings.add(block.heading)
+        size += block_size
+    if parts:
+        chunks.append("\n\n".join(parts))
+    return chunks
+
+
+def _blocks(text: str, max_chars: int) -> Iterable[_Block]:
+    """Return the sections of the rulebook, splitting sections over max_chars."""
+    stack: list[tuple[int, str]] = []
+    context: tuple[str, ...] = ()
+    heading: str | None = None
+    lines: list[str] = []
+
+    def section_blocks() -> Iterable[_Block]:
+        section = "\n".join(lines).strip()
+        if not section:
+            return
+        context_size = sum(len(part) + 2 for part in context)
+        if context_size + len(section) <= max_chars:
+            yield _Block(context=context, heading=heading, text=section)
+            return
+        # Continuations of the section are preceded by the section heading
+        continuation_context = (*context, heading) if heading else context
+        budget = max_chars - context_size - (len(heading) + 2 if heading else 0)
+        paragraphs = [
+            piece
+            for paragraph in _PARAGRAPH_BREAK.split(section)
+            for piece in _pack(paragraph.split("\n"), budget, "\n")
+        ]
+        for i, piece in enumerate(_pack(paragraphs, budget, "\n\n")):
+            yield _Block(
+                context=context if i == 0 else continuation_context,
+                heading=heading if i == 0 else None,
+                text=piece,
+            )
+
+    fence: str | None = None
+    for line in text.splitlines():
+        # Lines starting with '#' inside a fenced code block are not headings
+        if (fence_match := _FENCE.match(line)) is not None:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+        if fence is not None or (match := _HEADING.match(line)) is None:
+            lines.append(line)
+            continue
+        yield from section_blocks()
+        level = len(match.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        context = tuple(stack_heading for _, stack_heading in stack)
+        heading = line.strip()
+        stack.append((level, heading))
+        lines = [heading]
+    yield from section_blocks()
+
+
+def _pack(items: list[str], max_chars: int, separator: str) -> list[str]:
+    """Join consecutive items while they fit in max_chars."""
+    packed: list[str] = []
+    current: list[str] = []
+    size = 0
+    for item in items:
+        if current and size + len(separator) + len(item) > max_chars:
+            packed.append(separator.join(current))
+            current = []
+            size = 0
+        size += len(item) + (len(separator) if current else 0)
+        current.append(item)
+    if current:
+        packed.append(separator.join(current))
+    return packed
+
+
+def merge_home_details(
+    parts: list[ParsedHomeDetails], raw_text: str
+) -> ParsedHomeDetails:
+    """Merge the details parsed from each chunk of the rulebook.
+
+    Names of people, floors, areas and utility providers and smart home rules
+    that appear in more than one chunk are only kept once. Other details are
+    taken from the first chunk that has them.
+    """
+    return ParsedHomeDetails(
+        raw_text=raw_text,
+        parsed_status=next(
+            (
+                part.parsed_status
+                for part in parts
+                if part.parsed_status != COMPLETED_SUCCESSFULLY
+            ),
+            COMPLETED_SUCCESSFULLY,
+        ),
+        error_message="; ".join(
+            part.error_message for part in parts if part.error_message
+        )
+        or None,
+        basic_info=_merge_model(BasicInfo, [part.basic_info for part in parts]),
+        location_details=_merge_model(
+            LocationDetails, [part.location_details for part in parts]
+        ),
+        key_people=_unique(
+            [name for part in parts for name in part.key_people], normalize_name
+        ),
+        floor_mentions=_unique(
+            [name for part in parts for name in part.floor_mentions], normalize_name
+        ),
+        area_mentions=_unique(
+            [name for part in parts for name in part.area_mentions], normalize_name
+        ),
+        utility_provider_mentions=_unique(
+            [name for part in parts for name in part.utility_provider_mentions],
+            normalize_name,
+        ),
+        raw_smart_home_rules_text=_unique(
+            [text for part in parts for text in part.raw_smart_home_rules_text],
+            normalize_text,
+        ),
+        smart_home_rules=_unique_rules(
+            [rule for part in parts for rule in part.smart_home_rules]
+        ),
+    )
+
+
+def _unique(values: list[str], key: Callable[[str], str]) -> list[str]:
+    """Return the values in order, without values with the same key."""
+    unique: dict[str, str] = {}
+    for value in values:
+        unique.setdefault(key(value), value)
+    return list(unique.values())
+
+
+def _unique_rules(rules: list[ParsedSmartHomeRule]) -> list[ParsedSmartHomeRule]:
+    """Return the rules in order, without rules with the same text."""
+    unique: dict[str, ParsedSmartHomeRule] = {}
+    for rule in rules:
+        unique.setdefault(normalize_text(rule.rule_raw_text), rule)
+    return list(unique.values())
+
+
+def _merge_model[ModelT: BaseModel](
+    model: type[ModelT], values: list[ModelT | None]
+) -> ModelT | None:
+    """Merge the models, taking each field from the first model that has it."""
+    if not (models := [value for value in values if value is not None]):
+        return None
+    return model(
+        **{
+            field: next(
+                (
+                    getattr(value, field)
+                    for value in models
+                    if getattr(value, field) is not None
+                ),
+                None,
+            )
+            for field in model.model_fields
+        }
+    )
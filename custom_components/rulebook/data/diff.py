@@ -0,0 +1,289 @@
+"""Structural diff between two parsed rulebooks.
+
+The diff is used to decide whether a newly parsed rulebook differs from the
+stored one without asking a model to compare two full JSON documents. Set
+valued fields are compared after normalizing case and whitespace, rules are
+matched by their raw text, and coordinates are compared within a tolerance.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+from .home import (
+    BasicInfo,
+    LocationDetails,
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+
+# Roughly 100 meters, well below the precision a model can infer from an address
+LOCATION_TOLERANCE_DEGREES = 0.001
+
+_SET_FIELDS = (
+    "key_people",
+    "floor_mentions",
+    "area_mentions",
+    "utility_provider_mentions",
+)
+_COORDINATE_FIELDS = ("latitude", "longitude")
+# Location fields where any change alters how the home operates
+_STRUCTURAL_LOCATION_FIELDS = (*_COORDINATE_FIELDS, "timezone")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for comparison by ignoring case and whitespace.
+
+    This is also how rules are matched by their raw text everywhere else, such
+    as the rule parse cache and the ids of the automations created for rules.
+    """
+    return " ".join(text.split()).casefold()
+
+
+@dataclass(frozen=True, kw_only=True)
+class SetChange:
+    """Values added to or removed from a list valued field."""
+
+    added: tuple[str, ...] = ()
+    removed: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        """Return True if anything was added or removed."""
+        return bool(self.added or self.removed)
+
+
+@dataclass(frozen=True, kw_only=True)
+class FieldChange:
+    """A change to a single scalar field."""
+
+    field: str
+    previous: Any
+    current: Any
+
+
+@dataclass(frozen=True, kw_only=True)
+class RuleChange:
+    """Field changes to a rule that exists in both rulebooks."""
+
+    rule_raw_text: str
+    changes: tuple[FieldChange, ...]
+
+
+@dataclass(frozen=True, kw_only=True)
+class HomeDetailsDiff:
+    """Differences between a previous and a current parsed rulebook."""
+
+    is_initial: bool = False
+    set_changes: dict[str, SetChange]
+    rules: SetChange
+    changed_rules: tuple[RuleChange, ...] = ()
+    basic_info: tuple[FieldChange, ...] = ()
+    location_details: tuple[FieldChange, ...] = ()
+
+    @property
+    def is_empty(self) -> bool:
+        """Return True if the rulebooks are equivalent."""
+        return not (
+            self.is_initial
+            or any(self.set_changes.values())
+            or self.rules
+            or self.changed_rules
+            or self.basic_info
+            or self.location_details
+        )
+
+    @property
+    def is_structural(self) -> bool:
+        """Return True if the change is significant without further judgement.
+
+        Structural changes add or remove people, floors, areas, providers or
+        rules, or move the home. Rewording within existing rules or free-form
+        text fields is not structural and needs a judgement call.
+        """
+        return (
+            self.is_initial
+            or any(self.set_changes.values())
+            or bool(self.rules)
+            or any(
+                change.field in _STRUCTURAL_LOCATION_FIELDS
+                for change in self.location_details
+            )
+        )
+
+    def describe(self) -> list[str]:
+        """Return short human readable descriptions of the changes."""
+        if self.is_initial:
+            return ["no previous rulebook was stored"]
+        descriptions = []
+        for field, change in self.set_changes.items():
+            label = field.removesuffix("_mentions").replace("_", " ")
+            if change.added:
+                descriptions.append(f"{label} added: {', '.join(change.added)}")
+            if change.removed:
+                descriptions.append(f"{label} removed: {', '.join(change.removed)}")
+        if self.rules.added:
+            descriptions.append(f"{len(self.rules.added)} smart home rules added")
+        if self.rules.removed:
+            descriptions.append(f"{len(self.rules.removed)} smart home rules removed")
+        if self.changed_rules:
+            descriptions.append(f"{len(self.changed_rules)} smart home rules reworded")
+        descriptions.extend(f"{change.field} changed" for change in self.basic_info)
+        descriptions.extend(
+            f"location {change.field} changed" for change in self.location_details
+        )
+        return descriptions
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a compact dictionary of the non-empty changes."""
+        result: dict[str, Any] = {}
+        if self.is_initial:
+            result["is_initial"] = True
+        for field, change in self.set_changes.items():
+            if change:
+                result[field] = _set_change_dict(change)
+        if self.rules:
+            result["smart_home_rules"] = _set_change_dict(self.rules)
+        if self.changed_rules:
+            result["changed_smart_home_rules"] = [
+                {
+                    "rule_raw_text": rule.rule_raw_text,
+                    "changes": [_field_change_dict(c) for c in rule.changes],
+                }
+                for rule in self.changed_rules
+            ]
+        if self.basic_info:
+            result["basic_info"] = [_field_change_dict(c) for c in self.basic_info]
+        if self.location_details:
+            result["location_details"] = [
+                _field_change_dict(c) for c in self.location_details
+            ]
+        return result
+
+
+def _set_change_dict(change: SetChange) -> dict[str, list[str]]:
+    """Return a dictionary for a set change, omitting empty sides."""
+    result = {}
+    if change.added:
+        result["added"] = list(change.added)
+    if change.removed:
+        result["removed"] = list(change.removed)
+    return result
+
+
+def _field_change_dict(change: FieldChange) -> dict[str, Any]:
+    """Return a dictionary for a field change."""
+    return {
+        "field": change.field,
+        "previous": change.previous,
+        "current": change.current,
+    }
+
+
+def _dump(model: BaseModel | None) -> dict[str, Any]:
+    """Return the fields of an optional model as a dictionary."""
+    return model.model_dump() if model is not None else {}
+
+
+def _diff_sets(previous: list[str], current: list[str]) -> SetChange:
+    """Compare two lists of text mentions, ignoring order, case and whitespace."""
+    previous_by_key = {normalize_text(value): value for value in previous}
+    current_by_key = {normalize_text(value): value for value in current}
+    return SetChange(
+        added=tuple(
+            value for key, value in current_by_key.items() if key not in previous_by_key
+        ),
+        removed=tuple(
+            value for key, value in previous_by_key.items() if key not in current_by_key
+        ),
+    )
+
+
+def _values_equal(field: str, previous: Any, current: Any) -> bool:
+    """Return True if two field values are equivalent."""
+    if previous is None or current is None:
+        return previous is current
+    if field in _COORDINATE_FIELDS:
+        return abs(float(previous) - float(current)) <= LOCATION_TOLERANCE_DEGREES
+    if isinstance(previous, str) and isinstance(current, str):
+        return normalize_text(previous) == normalize_text(current)
+    if isinstance(previous, list) and isinstance(current, list):
+        return not _diff_sets(previous, current)
+    return bool(previous == current)
+
+
+def _diff_fields(
+    previous: dict[str, Any], current: dict[str, Any], fields: list[str]
+) -> tuple[FieldChange, ...]:
+    """Compare the named fields of two dictionaries."""
+    return tuple(
+        FieldChange(
+            field=field, previous=previous.get(field), current=current.get(field)
+        )
+        for field in fields
+        if not _values_equal(field, previous.get(field), current.get(field))
+    )
+
+
+def _diff_rules(
+    previous: list[ParsedSmartHomeRule], current: list[ParsedSmartHomeRule]
+) -> tuple[SetChange, tuple[RuleChange, ...]]:
+    """Compare rules, matching them by their normalized raw text."""
+    previous_by_key = {normalize_text(rule.rule_raw_text): rule for rule in previous}
+    current_by_key = {normalize_text(rule.rule_raw_text): rule for rule in current}
+    rule_fields = [
+        field for field in ParsedSmartHomeRule.model_fields if field != "rule_raw_text"
+    ]
+    changed_rules = []
+    for key, current_rule in current_by_key.items():
+        if (previous_rule := previous_by_key.get(key)) is None:
+            continue
+        if changes := _diff_fields(
+            previous_rule.model_dump(), current_rule.model_dump(), rule_fields
+        ):
+            changed_rules.append(
+                RuleChange(rule_raw_text=current_rule.rule_raw_text, changes=changes)
+            )
+    rules = SetChange(
+        added=tuple(
+            rule.rule_raw_text
+            for key, rule in current_by_key.items()
+            if key not in previous_by_key
+        ),
+        removed=tuple(
+            rule.rule_raw_text
+            for key, rule in previous_by_key.items()
+            if key not in current_by_key
+        ),
+    )
+    return rules, tuple(changed_rules)
+
+
+def diff_home_details(
+    previous: ParsedHomeDetails | None, current: ParsedHomeDetails
+) -> HomeDetailsDiff:
+    """Compute the differences between the previous and current rulebook."""
+    if previous is None:
+        return HomeDetailsDiff(is_initial=True, set_changes={}, rules=SetChange())
+
+    rules, changed_rules = _diff_rules(
+        previous.smart_home_rules, current.smart_home_rules
+    )
+    return HomeDetailsDiff(
+        set_changes={
+            field: _diff_sets(getattr(previous, field), getattr(current, field))
+            for field in _SET_FIELDS
+        },
+        rules=rules,
+        changed_rules=changed_rules,
+        basic_info=_diff_fields(
+            _dump(previous.basic_info),
+            _dump(current.basic_info),
+            list(BasicInfo.model_fields),
+        ),
+        location_details=_diff_fields(
+            _dump(previous.location_details),
+            _dump(current.location_details),
+            list(LocationDetails.model_fields),
+        ),
+    )
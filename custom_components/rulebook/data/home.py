@@ -137,3 +137,14 @@ class ParsedHomeDetails(BaseModel):
         default_factory=list,
         description="List of parsed individual smart home rules.",
     )
+
+
+class ParsedSmartHomeRuleBatch(BaseModel):
+    """Data model for a batch of smart home rules parsed in a single request."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    rules: list[ParsedSmartHomeRule] = Field(
+        default_factory=list,
+        description="List of parsed smart home rules, one for each input rule text snippet in the same order.",
+    )
@@ -0,0 +1,82 @@
+"""Compiled, read-only index of a parsed rulebook.
+
+A ParsedHomeDetails model is validated again each time it is read from
+storage. The index is built once for each parsed rulebook and shared by all
+agents. It holds the same details in tuples, with names that only differ by
+case, punctuation or articles listed once, the same way they are matched with
+Home Assistant areas, persons and entities.
+"""
+
+import sys
+from collections.abc import Iterable
+from typing import Any
+
+from .home import ParsedHomeDetails, ParsedSmartHomeRule
+from .reconcile import normalize_name
+
+
+def _unique(values: Iterable[str]) -> tuple[str, ...]:
+    """Return the values in order as interned strings, without repeated names."""
+    unique: dict[str, str] = {}
+    for value in values:
+        unique.setdefault(normalize_name(value), sys.intern(value))
+    return tuple(unique.values())
+
+
+class RulebookIndex:
+    """Immutable index over the details of a parsed rulebook."""
+
+    __slots__ = (
+        "areas",
+        "floors",
+        "location_details",
+        "mentions",
+        "people",
+        "rules",
+        "utility_providers",
+    )
+
+    areas: tuple[str, ...]
+    floors: tuple[str, ...]
+    people: tuple[str, ...]
+    utility_providers: tuple[str, ...]
+    rules: tuple[ParsedSmartHomeRule, ...]
+    mentions: tuple[str, ...]
+    """Entities, devices and people mentioned by the smart home rules."""
+
+    location_details: dict[str, Any] | None
+
+    def __init__(self, parsed_rulebook: ParsedHomeDetails) -> None:
+        """Compile the index for the parsed rulebook."""
+        set_attr = object.__setattr__
+        set_attr(self, "areas", _unique(parsed_rulebook.area_mentions))
+        set_attr(self, "floors", _unique(parsed_rulebook.floor_mentions))
+        set_attr(self, "people", _unique(parsed_rulebook.key_people))
+        set_attr(
+            self,
+            "utility_providers",
+            _unique(parsed_rulebook.utility_provider_mentions),
+        )
+        set_attr(self, "rules", tuple(parsed_rulebook.smart_home_rules))
+        set_attr(
+            self,
+            "mentions",
+            _unique(
+                mention for rule in self.rules for mention in rule.entities_mentioned
+            ),
+        )
+        set_attr(
+            self,
+            "location_details",
+            parsed_rulebook.location_details.model_dump(exclude_none=True)
+            if parsed_rulebook.location_details
+            else None,
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Prevent modifying the index, since it is shared by all agents."""
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        """Prevent modifying the index, since it is shared by all agents."""
+        raise AttributeError(f"{type(self).__name__} is read-only")
@@ -0,0 +1,153 @@
+"""Reconcile names mentioned in the rulebook with Home Assistant items.
+
+The rulebook mentions areas and people in free-form text, while Home
+Assistant has registry entries with a name, an id and optional aliases. Names
+are compared after normalizing case and punctuation, and names that are not
+equal are matched by token and character similarity. Matches are assigned
+greedily from the highest score so the result is deterministic.
+"""
+
+import difflib
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+# Minimum similarity for two different names to be reported as a match
+DEFAULT_THRESHOLD = 0.65
+
+_APOSTROPHES = re.compile(r"['’]")
+_NON_WORD = re.compile(r"[\W_]+")
+# Words that do not distinguish names, such as "the kitchen" and "kitchen"
+_STOP_WORDS = frozenset({"a", "an", "the", "my", "our"})
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a name by ignoring case, punctuation, whitespace and articles."""
+    text = _NON_WORD.sub(" ", _APOSTROPHES.sub("", name.casefold()))
+    return " ".join(word for word in text.split() if word not in _STOP_WORDS)
+
+
+def name_similarity(name: str, other: str) -> float:
+    """Return the similarity of two normalized names between 0 and 1.
+
+    The score is the larger of the token overlap, which matches names that
+    differ by an extra word, and the character similarity, which matches
+    names that differ by a typo or a plural.
+    """
+    if name == other:
+        return 1.0
+    tokens = set(name.split())
+    other_tokens = set(other.split())
+    if not tokens or not other_tokens:
+        return 0.0
+    token_score = 2 * len(tokens & other_tokens) / (len(tokens) + len(other_tokens))
+    char_score = difflib.SequenceMatcher(None, name, other, autojunk=False).ratio()
+    return max(token_score, char_score)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Match:
+    """A rulebook name matched to a Home Assistant item."""
+
+    rulebook_name: str
+    item: dict[str, Any]
+    score: float
+    exact: bool
+
+
+@dataclass(frozen=True, kw_only=True)
+class ReconciliationReport:
+    """Differences between the rulebook names and the Home Assistant items."""
+
+    matched: tuple[Match, ...] = ()
+    missing: tuple[str, ...] = ()
+    """Names in the rulebook without a Home Assistant item."""
+
+    extra: tuple[dict[str, Any], ...] = ()
+    """Home Assistant items that are not mentioned in the rulebook."""
+
+    @property
+    def is_aligned(self) -> bool:
+        """Return True if every name matches exactly and nothing is missing."""
+        return (
+            not self.missing
+            and not self.extra
+            and all(match.exact for match in self.matched)
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the report as a dictionary for a tool response."""
+        return {
+            "aligned": self.is_aligned,
+            "matched": [
+                {"rulebook_name": match.rulebook_name, **match.item}
+                for match in self.matched
+                if match.exact
+            ],
+            "likely_matches": [
+                {
+                    "rulebook_name": match.rulebook_name,
+                    **match.item,
+                    "score": round(match.score, 2),
+                }
+                for match in self.matched
+                if not match.exact
+            ],
+            "missing_in_home_assistant": list(self.missing),
+            "missing_in_rulebook": list(self.extra),
+        }
+
+
+def reconcile(
+    rulebook_names: Iterable[str],
+    items: Iterable[dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> ReconciliationReport:
+    """Match rulebook names to Home Assistant items.
+
+    Each item has a 'name' and may have a list of 'aliases'. An item matches
+    exactly when its name or an alias is equal to the rulebook name after
+    normalization. Each name and item is matched at most once.
+    """
+    # Names that only differ by case or punctuation are the same name
+    names_by_normalized: dict[str, str] = {}
+    for name in rulebook_names:
+        names_by_normalized.setdefault(normalize_name(name), name)
+    names = list(names_by_normalized.values())
+    normalized_names = list(names_by_normalized)
+    items = list(items)
+    item_names = [
+        {normalize_name(name) for name in (item["name"], *item.get("aliases", ()))}
+        for item in items
+    ]
+
+    candidates: list[tuple[float, int, int]] = []
+    for name_index, name in enumerate(normalized_names):
+        for item_index, normalized_item_names in enumerate(item_names):
+            score = max(
+                name_similarity(name, item_name) for item_name in normalized_item_names
+            )
+            if score >= threshold:
+                candidates.append((score, name_index, item_index))
+    # Highest score first, then in the order of the rulebook and the items
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+
+    matches: dict[int, Match] = {}
+    matched_items: set[int] = set()
+    for score, name_index, item_index in candidates:
+        if name_index in matches or item_index in matched_items:
+            continue
+        matches[name_index] = Match(
+            rulebook_name=names[name_index],
+            item=items[item_index],
+            score=score,
+            exact=score == 1.0,
+        )
+        matched_items.add(item_index)
+
+    return ReconciliationReport(
+        matched=tuple(matches[i] for i in sorted(matches)),
+        missing=tuple(name for i, name in enumerate(names) if i not in matches),
+        extra=tuple(item for i, item in enumerate(items) if i not in matched_items),
+    )
@@ -0,0 +1,29 @@
+"""Diagnostics support for the Rulebook integration."""
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .agents.budget import async_get_prompt_stats
+from .agents.rulebook_parser_agent import RulebookPipelineAgent
+from .storage import async_get_parsed_rulebook_cache
+from .types import RulebookConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: RulebookConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    diagnostics: dict[str, Any] = {
+        "parsed_rulebook_cache": async_get_parsed_rulebook_cache(hass).stats(),
+        "sessions": entry.runtime_data.session_service.stats(),
+        "history": entry.runtime_data.history.stats(),
+        "entity_resolver": entry.runtime_data.entity_resolver.stats(),
+        "automation_index": entry.runtime_data.automation_index.stats(),
+        "prompt_tokens": async_get_prompt_stats(hass, entry.entry_id).stats(),
+    }
+    pipeline_agent = entry.runtime_data.agent.find_agent("RulebookPipelineAgent")
+    if isinstance(pipeline_agent, RulebookPipelineAgent):
+        diagnostics["rule_parser_limiter"] = pipeline_agent.rule_parser_limiter.stats()
+        diagnostics["rule_parser_latency"] = pipeline_agent.rule_parser_latency.stats()
+    return diagnostics
@@ -0,0 +1,289 @@
+"""Resolve entity mentions in the rulebook to Home Assistant entity ids.
+
+Smart home rules mention devices in free-form text such as "porch light". The
+resolver keeps an inverted index from normalized tokens to entities, built
+from the entity name and aliases, the area of the entity or its device and the
+entity domain. A mention is resolved by looking up its tokens and ranking the
+entities by the weighted tokens they match. The index is updated for only the
+affected entities when the registries or entity names change.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import (
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    callback,
+)
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+
+from .data.reconcile import normalize_name
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 5
+
+# Weight of a mention token matched by each part of an entity
+_NAME_WEIGHT = 1.0
+_AREA_WEIGHT = 0.75
+_DOMAIN_WEIGHT = 0.5
+# Candidates are returned when the weighted share of the words of the mention
+# they match is at least this score
+_MIN_SCORE = 0.6
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class ResolvedEntity:
+    """An entity that a mention may refer to."""
+
+    entity_id: str
+    name: str
+    area: str | None
+    score: float
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the entity as a dictionary for a tool response."""
+        return {
+            "entity_id": self.entity_id,
+            "name": self.name,
+            "area": self.area,
+            "score": round(self.score, 2),
+        }
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class _IndexedEntity:
+    """The searchable text of an entity."""
+
+    entity_id: str
+    name: str
+    area_id: str | None
+    area: str | None
+    names: frozenset[str]
+    """Normalized name and aliases, matched exactly."""
+
+    tokens: dict[str, float]
+    """Weight of each token of the name, aliases, area and domain."""
+
+
+class EntityResolver:
+    """Inverted token index of the Home Assistant entities."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the EntityResolver."""
+        self._hass = hass
+        self._entities: dict[str, _IndexedEntity] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._names: dict[str, set[str]] = {}
+        self.updates = 0
+
+    @callback
+    def async_start(self) -> Callable[[], None]:
+        """Index all entities and subscribe to changes of the registries.
+
+        Returns a callback that unsubscribes from the changes.
+        """
+        entity_ids = set(self._hass.states.async_entity_ids())
+        entity_ids.update(er.async_get(self._hass).entities)
+        for entity_id in entity_ids:
+            self._async_index(entity_id)
+        unsubs = [
+            self._hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_registry_updated
+            ),
+            self._hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_registry_updated
+            ),
+            self._hass.bus.async_listen(
+                ar.EVENT_AREA_REGISTRY_UPDATED, self._async_area_registry_updated
+            ),
+            self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_state_changed,
+                event_filter=_is_name_changed,
+            ),
+        ]
+
+        @callback
+        def async_stop() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return async_stop
+
+    def resolve(self, mention: str, limit: int = DEFAULT_LIMIT) -> list[ResolvedEntity]:
+        """Return the entities the mention most likely refers to, best first."""
+        normalized = normalize_name(mention)
+        if not (tokens := set(normalized.split())):
+            return []
+        exact = self._names.get(normalized, set())
+        scores: dict[str, float] = {}
+        for token in tokens:
+            for entity_id in self._postings.get(token, ()):
+                scores[entity_id] = (
+                    scores.get(entity_id, 0.0)
+                    + (self._entities[entity_id].tokens[token])
+                )
+        # Only an exact name or alias match has the maximum score
+        ranked = [
+            (1.0 if entity_id in exact else min(score / len(tokens), 0.99), entity_id)
+            for entity_id, score in scores.items()
+        ]
+        ranked.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        return [
+            ResolvedEntity(
+                entity_id=entity_id,
+                name=self._entities[entity_id].name,
+                area=self._entities[entity_id].area,
+                score=score,
+            )
+            for score, entity_id in ranked[:limit]
+            if score >= _MIN_SCORE
+        ]
+
+    def resolve_all(
+        self, mentions: Iterable[str], limit: int = DEFAULT_LIMIT
+    ) -> dict[str, list[ResolvedEntity]]:
+        """Resolve many mentions, resolving each distinct mention only once."""
+        resolved: dict[str, list[ResolvedEntity]] = {}
+        by_normalized: dict[str, list[ResolvedEntity]] = {}
+        for mention in mentions:
+            normalized = normalize_name(mention)
+            if (candidates := by_normalized.get(normalized)) is None:
+                candidates = by_normalized[normalized] = self.resolve(mention, limit)
+            resolved[mention] = candidates
+        return resolved
+
+    def stats(self) -> dict[str, int]:
+        """Return index counters for diagnostics."""
+        return {
+            "entities": len(self._entities),
+            "tokens": len(self._postings),
+            "updates": self.updates,
+        }
+
+    @callback
+    def _async_index(self, entity_id: str) -> None:
+        """Add or replace the entity in the index, or remove it if it is gone."""
+        self._async_remove(entity_id)
+        state = self._hass.states.get(entity_id)
+        entry = er.async_get(self._hass).async_get(entity_id)
+        if state is None and entry is None:
+            return
+        if entry is not None and entry.disabled:
+            return
+
+        aliases: set[str] = set()
+        area_id: str | None = None
+        if entry is not None:
+            aliases = {alias for alias in entry.aliases if isinstance(alias, str)}
+            area_id = entry.area_id
+            if area_id is None and entry.device_id is not None:
+                device = dr.async_get(self._hass).async_get(entry.device_id)
+                area_id = device.area_id if device else None
+        name = (
+            state.name
+            if state is not None
+            else (entry.name or entry.original_name or entity_id.split(".", 1)[1])
+        )
+        area = ar.async_get(self._hass).async_get_area(area_id) if area_id else None
+
+        names = frozenset(normalize_name(text) for text in (name, *aliases))
+        tokens: dict[str, float] = {entity_id.split(".", 1)[0]: _DOMAIN_WEIGHT}
+        if area is not None:
+            for text in (area.name, *area.aliases):
+                for token in normalize_name(text).split():
+                    tokens[token] = _AREA_WEIGHT
+        for text in names:
+            for token in text.split():
+                tokens[token] = _NAME_WEIGHT
+
+        indexed = self._entities[entity_id] = _IndexedEntity(
+            entity_id=entity_id,
+            name=name,
+            area_id=area_id,
+            area=area.name if area else None,
+            names=names,
+            tokens=tokens,
+        )
+        for token in indexed.tokens:
+            self._postings.setdefault(token, set()).add(entity_id)
+        for text in indexed.names:
+            self._names.setdefault(text, set()).add(entity_id)
+
+    @callback
+    def _async_remove(self, entity_id: str) -> None:
+        """Remove the entity from the index."""
+        if (indexed := self._entities.pop(entity_id, None)) is None:
+            return
+        for index, keys in (
+            (self._postings, indexed.tokens),
+            (self._names, indexed.names),
+        ):
+            for key in keys:
+                entity_ids = index[key]
+                entity_ids.discard(entity_id)
+                if not entity_ids:
+                    del index[key]
+
+    @callback
+    def _async_reindex(self, entity_ids: Iterable[str]) -> None:
+        """Update the index for the entities."""
+        for entity_id in entity_ids:
+            self._async_index(entity_id)
+            self.updates += 1
+
+    @callback
+    def _async_entity_registry_updated(
+        self, event: Event[er.EventEntityRegistryUpdatedData]
+    ) -> None:
+        """Update the entity that changed in the entity registry."""
+        entity_ids = [event.data["entity_id"]]
+        if old_entity_id := event.data.get("old_entity_id"):
+            entity_ids.append(old_entity_id)
+        self._async_reindex(entity_ids)
+
+    @callback
+    def _async_device_registry_updated(
+        self, event: Event[dr.EventDeviceRegistryUpdatedData]
+    ) -> None:
+        """Update the entities of a device that may have moved to another area."""
+        entries = er.async_entries_for_device(
+            er.async_get(self._hass), event.data["device_id"]
+        )
+        self._async_reindex([entry.entity_id for entry in entries])
+
+    @callback
+    def _async_area_registry_updated(
+        self, event: Event[ar.EventAreaRegistryUpdatedData]
+    ) -> None:
+        """Update the entities in an area that was renamed or removed."""
+        area_id = event.data.get("area_id")
+        self._async_reindex(
+            [
+                indexed.entity_id
+                for indexed in self._entities.values()
+                if indexed.area_id is not None
+                and (area_id is None or indexed.area_id == area_id)
+            ]
+        )
+
+    @callback
+    def _async_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Update an entity that was added, removed or renamed."""
+        self._async_reindex([event.data["entity_id"]])
+
+
+@callback
+def _is_name_changed(event_data: EventStateChangedData) -> bool:
+    """Return True if the state change adds, removes or renames an entity."""
+    old_state = event_data["old_state"]
+    new_state = event_data["new_state"]
+    return old_state is None or new_state is None or old_state.name != new_state.name
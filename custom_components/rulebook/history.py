@@ -0,0 +1,345 @@
+"""Append-only history of the parsed rulebooks of a config entry.
+
+Each version is appended to a JSON lines file as either a keyframe holding
+the full parsed rulebook or a delta against the previous version. List fields
+such as the smart home rules are stored as runs copied from the previous
+version plus the new items, so rewording a single rule only stores that rule.
+The rulebook text is stored the same way as a list of lines.
+A keyframe is written at a fixed interval to bound the number of deltas
+applied when reconstructing an earlier version. Only the most recent versions
+are retained.
+"""
+
+import asyncio
+import difflib
+import json
+import logging
+from typing import Any
+
+from aiofiles import open as aio_open
+from aiofiles.os import makedirs as aio_makedirs
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import HISTORY_FILENAME, STORAGE_DIR
+from .data.home import ParsedHomeDetails
+from .storage import async_write_file_atomic
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_VERSIONS = 50
+DEFAULT_KEYFRAME_INTERVAL = 10
+
+# Operations of a list delta: copy a slice of the previous list or add items
+_COPY = "="
+_ADD = "+"
+
+# Text fields that are stored as a delta of their lines
+_TEXT_FIELDS = ("raw_text",)
+
+
+def _diff_list(previous: list[Any], current: list[Any]) -> list[list[Any]]:
+    """Return the operations that build the current list from the previous one."""
+    matcher = difflib.SequenceMatcher(
+        None,
+        [json.dumps(item, sort_keys=True) for item in previous],
+        [json.dumps(item, sort_keys=True) for item in current],
+        autojunk=False,
+    )
+    ops: list[list[Any]] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([_COPY, i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append([_ADD, current[j1:j2]])
+    return ops
+
+
+def _apply_list(previous: list[Any], ops: list[list[Any]]) -> list[Any]:
+    """Build a list from the previous list and the delta operations."""
+    result: list[Any] = []
+    for op in ops:
+        if op[0] == _COPY:
+            result.extend(previous[op[1] : op[2]])
+        else:
+            result.extend(op[1])
+    return result
+
+
+def diff_versions(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Return the delta between two dumped parsed rulebooks."""
+    fields: dict[str, Any] = {}
+    lists: dict[str, list[list[Any]]] = {}
+    lines: dict[str, list[list[Any]]] = {}
+    for key in previous.keys() | current.keys():
+        previous_value = previous.get(key)
+        current_value = current.get(key)
+        if previous_value == current_value:
+            continue
+        if isinstance(previous_value, list) and isinstance(current_value, list):
+            lists[key] = _diff_list(previous_value, current_value)
+        elif (
+            key in _TEXT_FIELDS
+            and isinstance(previous_value, str)
+            and isinstance(current_value, str)
+        ):
+            lines[key] = _diff_list(
+                previous_value.splitlines(keepends=True),
+                current_value.splitlines(keepends=True),
+            )
+        else:
+            fields[key] = current_value
+    delta: dict[str, Any] = {}
+    if fields:
+        delta["fields"] = fields
+    if lists:
+        delta["lists"] = lists
+    if lines:
+        delta["lines"] = lines
+    return delta
+
+
+def apply_delta(previous: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Return the dumped parsed rulebook after applying the delta."""
+    current = {**previous, **delta.get("fields", {})}
+    for key, ops in delta.get("lists", {}).items():
+        current[key] = _apply_list(previous.get(key) or [], ops)
+    for key, ops in delta.get("lines", {}).items():
+        previous_lines = (previous.get(key) or "").splitlines(keepends=True)
+        current[key] = "".join(_apply_list(previous_lines, ops))
+    return current
+
+
+def _dump_record(record: dict[str, Any]) -> str:
+    """Return the history record as a line of compact JSON."""
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _is_next_record(records: list[dict[str, Any]], record: Any) -> bool:
+    """Return True if the record is valid and follows the records."""
+    if (
+        not isinstance(record, dict)
+        or not isinstance(record.get("version"), int)
+        or not isinstance(record.get("created"), str)
+    ):
+        return False
+    if not records:
+        # The history must start with a keyframe to be reconstructed
+        return isinstance(record.get("keyframe"), dict)
+    if record["version"] != records[-1]["version"] + 1:
+        return False
+    return isinstance(record.get("keyframe"), dict) or isinstance(
+        record.get("delta"), dict
+    )
+
+
+def _reconstruct(records: list[dict[str, Any]], position: int) -> dict[str, Any]:
+    """Apply deltas from the nearest earlier keyframe up to the position."""
+    start = position
+    while "keyframe" not in records[start]:
+        start -= 1
+    value: dict[str, Any] = records[start]["keyframe"]
+    for record in records[start + 1 : position + 1]:
+        value = apply_delta(value, record["delta"])
+    return value
+
+
+class RulebookHistory:
+    """History of the parsed rulebooks stored for a config entry.
+
+    The records are loaded once and kept in memory in their compact form,
+    along with the latest version so it can be returned without applying any
+    deltas. New versions are appended to the end of the file.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry_id: str,
+        max_versions: int = DEFAULT_MAX_VERSIONS,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ) -> None:
+        """Initialize the RulebookHistory."""
+        self._storage_path = hass.config.path(STORAGE_DIR, config_entry_id)
+        self._file_path = hass.config.path(
+            STORAGE_DIR, config_entry_id, HISTORY_FILENAME
+        )
+        self._max_versions = max_versions
+        self._keyframe_interval = keyframe_interval
+        self._records: list[dict[str, Any]] = []
+        self._latest: dict[str, Any] | None = None
+        self._latest_rulebook: ParsedHomeDetails | None = None
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load the history records from storage."""
+        async with self._lock:
+            await self._async_load()
+
+    async def _async_load(self) -> None:
+        """Load the history records unless they were already loaded."""
+        if self._loaded:
+            return
+        try:
+            async with aio_open(self._file_path, "r") as f:
+                lines = (await f.read()).splitlines()
+        except FileNotFoundError:
+            lines = []
+        except OSError as err:
+            _LOGGER.error(
+                "Error reading rulebook history from %s: %s", self._file_path, err
+            )
+            raise HomeAssistantError(
+                f"Could not read rulebook history from {self._file_path}: {err}"
+            ) from err
+
+        records: list[dict[str, Any]] = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            # A write interrupted by a restart leaves a truncated last line. Each
+            # delta applies to the version before it, so no record after an
+            # invalid or missing version can be reconstructed.
+            if not _is_next_record(records, record):
+                _LOGGER.warning(
+                    "Dropping %d invalid rulebook history records in %s",
+                    len(lines) - len(records),
+                    self._file_path,
+                )
+                break
+            records.append(record)
+        self._records = records
+        if records:
+            self._latest = _reconstruct(records, len(records) - 1)
+        self._loaded = True
+
+        if len(records) != len(lines):
+            # Rewrite the valid records so new records are appended after them
+            try:
+                await self._async_write_all(records)
+            except OSError as err:
+                _LOGGER.warning(
+                    "Error rewriting rulebook history %s: %s", self._file_path, err
+                )
+
+    @property
+    def latest_version(self) -> int | None:
+        """Return the number of the latest version."""
+        return self._records[-1]["version"] if self._records else None
+
+    async def async_latest(self) -> ParsedHomeDetails | None:
+        """Return the latest version of the parsed rulebook."""
+        async with self._lock:
+            await self._async_load()
+            if self._latest_rulebook is None and self._latest is not None:
+                self._latest_rulebook = ParsedHomeDetails.model_validate(self._latest)
+            return self._latest_rulebook
+
+    async def async_get(self, version: int) -> ParsedHomeDetails | None:
+        """Return a version of the parsed rulebook, or None if not retained."""
+        async with self._lock:
+            await self._async_load()
+            if (position := self._position(version)) is None:
+                return None
+            return ParsedHomeDetails.model_validate(
+                _reconstruct(self._records, position)
+            )
+
+    async def async_versions(self) -> list[dict[str, Any]]:
+        """Return the number and creation time of the retained versions."""
+        async with self._lock:
+            await self._async_load()
+            return [
+                {"version": record["version"], "created": record["created"]}
+                for record in self._records
+            ]
+
+    async def async_append(self, parsed_rulebook: ParsedHomeDetails) -> int:
+        """Append a version of the parsed rulebook and return its number.
+
+        The latest version number is returned without adding a version when
+        the parsed rulebook is unchanged.
+        """
+        current = parsed_rulebook.model_dump(mode="json")
+        async with self._lock:
+            await self._async_load()
+            version = 1
+            record: dict[str, Any] = {"keyframe": current}
+            if self._latest is not None:
+                if not (delta := diff_versions(self._latest, current)):
+                    return self._records[-1]["version"]
+                version = self._records[-1]["version"] + 1
+                # Periodic keyframes bound the deltas applied to reconstruct a
+                # version, and a delta is only used if it is smaller.
+                is_keyframe_due = (version - 1) % self._keyframe_interval == 0
+                if not is_keyframe_due and len(json.dumps(delta)) < len(
+                    json.dumps(current)
+                ):
+                    record = {"delta": delta}
+            record = {
+                "version": version,
+                "created": dt_util.utcnow().isoformat(),
+                **record,
+            }
+
+            # The records in memory are only updated once the record is written,
+            # so the next delta is never against a version missing from the file.
+            records = [*self._records, record]
+            try:
+                if len(records) > self._max_versions:
+                    records = self._compact(records)
+                    await self._async_write_all(records)
+                else:
+                    await aio_makedirs(self._storage_path, exist_ok=True)
+                    async with aio_open(self._file_path, "a") as f:
+                        await f.write(_dump_record(record))
+            except OSError as err:
+                _LOGGER.error(
+                    "Error writing rulebook history to %s: %s", self._file_path, err
+                )
+                raise HomeAssistantError(
+                    f"Could not write rulebook history to {self._file_path}: {err}"
+                ) from err
+            self._records = records
+            self._latest = current
+            self._latest_rulebook = None
+            return version
+
+    def _compact(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return the records without the oldest versions over the retention limit."""
+        drop = len(records) - self._max_versions
+        first = records[drop]
+        if "delta" in first:
+            first = {
+                "version": first["version"],
+                "created": first["created"],
+                "keyframe": _reconstruct(records, drop),
+            }
+        return [first, *records[drop + 1 :]]
+
+    async def _async_write_all(self, records: list[dict[str, Any]]) -> None:
+        """Replace the history file with the records."""
+        await async_write_file_atomic(
+            self._file_path, "".join(_dump_record(record) for record in records)
+        )
+
+    def _position(self, version: int) -> int | None:
+        """Return the position of the version in the records."""
+        if not self._records:
+            return None
+        position = version - self._records[0]["version"]
+        if 0 <= position < len(self._records):
+            return position
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """Return history counters for diagnostics."""
+        return {
+            "versions": len(self._records),
+            "latest_version": self.latest_version,
+            "keyframes": sum("keyframe" in record for record in self._records),
+        }
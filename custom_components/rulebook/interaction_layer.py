@@ -1,50 +1,220 @@
 """Module for interacting with the Home Assistant instance."""
 
+import asyncio
 import logging
+from collections import deque
+from collections.abc import Callable
 from typing import Any
 
+from homeassistant.components import persistent_notification
 from homeassistant.const import (
     CONF_UNIT_SYSTEM_IMPERIAL,
     CONF_UNIT_SYSTEM_METRIC,
+    EVENT_STATE_CHANGED,
+    SERVICE_RELOAD,
+)
+from homeassistant.core import (
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    State,
+    callback,
 )
-from homeassistant.core import HomeAssistant, State
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import area_registry as ar
 from homeassistant.util import unit_system
+from homeassistant.util import yaml as yaml_util
+from homeassistant.util.hass_dict import HassKey
+
+from .const import AUTOMATIONS_FILENAME, DOMAIN
+from .data.reconcile import normalize_name
+from .storage import async_write_file_atomic
 
 _LOGGER = logging.getLogger(__name__)
 
+AREAS = "areas"
+PERSONS = "persons"
+PERSON_DOMAIN = "person"
+AUTOMATION_DOMAIN = "automation"
 
-async def async_get_areas(hass: HomeAssistant) -> list[dict[str, Any]]:
-    """Fetch all defined areas from the Area Registry.
+# Number of changes kept to answer what changed since an earlier version
+_MAX_CHANGES = 500
 
-    Args:
-        hass: The Home Assistant instance.
+ADD_PERSONS_NOTIFICATION_ID = "rulebook_add_persons"
 
-    Returns:
-        A list of dictionaries, where each dictionary represents an area
-        and contains its 'name' and 'id'.
+# People listed in the add persons notification, keyed by normalized name
+DATA_PENDING_PERSONS: HassKey[dict[str, str]] = HassKey(f"{DOMAIN}_pending_persons")
+
+
+class RegistrySnapshot:
+    """Incrementally maintained view of the Home Assistant areas and persons.
+
+    The view is updated from area registry events and person state changes
+    instead of being rebuilt on every tool call. Each change increments the
+    version, so a caller that remembers the version of its last read only
+    needs the changes since that version.
     """
-    area_reg = ar.async_get(hass)
-    areas = [{"name": area.name, "id": area.id} for area in area_reg.async_list_areas()]
-    _LOGGER.debug("Fetched %s areas: %s", len(areas), areas)
-    return areas
 
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the RegistrySnapshot."""
+        self._hass = hass
+        self._items: dict[str, dict[str, dict[str, Any]]] = {AREAS: {}, PERSONS: {}}
+        self._lists: dict[str, list[dict[str, Any]] | None] = {
+            AREAS: None,
+            PERSONS: None,
+        }
+        self._changes: deque[tuple[int, str, str]] = deque(maxlen=_MAX_CHANGES)
+        # Changes up to this version were dropped from the change log
+        self._truncated_version = 0
+        self.version = 0
 
-async def async_get_persons(hass: HomeAssistant) -> list[dict[str, Any]]:
-    """Fetch all defined persons from Home Assistant.
+    @callback
+    def async_start(self) -> Callable[[], None]:
+        """Load the current areas and persons and subscribe to their changes.
 
-    Args:
-        hass: The Home Assistant instance.
+        Returns a callback that unsubscribes from the changes.
+        """
+        self._async_reload(AREAS, self._async_current_areas())
+        self._async_reload(PERSONS, self._async_current_persons())
+        unsubs = [
+            self._hass.bus.async_listen(
+                ar.EVENT_AREA_REGISTRY_UPDATED, self._async_area_registry_updated
+            ),
+            self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_person_state_changed,
+                event_filter=_is_person_state_changed,
+            ),
+        ]
 
-    Returns:
-        A list of dictionaries, where each dictionary represents a person
-        and contains their 'name' and 'id' (entity_id).
-    """
-    person_states: list[State] = hass.states.async_all("person")
-    persons = [{"name": state.name, "id": state.entity_id} for state in person_states]
-    _LOGGER.debug("Fetched %s persons: %s", len(persons), persons)
-    return persons
+        @callback
+        def async_stop() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return async_stop
+
+    def areas(self) -> list[dict[str, Any]]:
+        """Return the areas with their 'name', 'id' and 'aliases'."""
+        return self._list(AREAS)
+
+    def persons(self) -> list[dict[str, Any]]:
+        """Return the persons with their 'name' and 'id' (entity_id)."""
+        return self._list(PERSONS)
+
+    def changes_since(self, version: int) -> dict[str, Any]:
+        """Return the areas and persons that changed after the version.
+
+        Each kind lists the current value of the changed items and the ids of
+        removed items. If the changes since the version are no longer known,
+        all items are returned as changed with 'full' set to True.
+        """
+        if version < self._truncated_version:
+            return {
+                "version": self.version,
+                "full": True,
+                AREAS: {"changed": self.areas(), "removed": []},
+                PERSONS: {"changed": self.persons(), "removed": []},
+            }
+        recent_changes: list[tuple[str, str]] = []
+        for change_version, kind, key in reversed(self._changes):
+            if change_version <= version:
+                break
+            recent_changes.append((kind, key))
+        changed_keys: dict[str, dict[str, None]] = {AREAS: {}, PERSONS: {}}
+        for kind, key in reversed(recent_changes):
+            changed_keys[kind][key] = None
+        result: dict[str, Any] = {"version": self.version, "full": False}
+        for kind, keys in changed_keys.items():
+            items = self._items[kind]
+            result[kind] = {
+                "changed": [items[key] for key in keys if key in items],
+                "removed": [key for key in keys if key not in items],
+            }
+        return result
+
+    def _list(self, kind: str) -> list[dict[str, Any]]:
+        """Return the items of a kind, reusing the list until an item changes."""
+        if (items := self._lists[kind]) is None:
+            items = self._lists[kind] = list(self._items[kind].values())
+        return items
+
+    @callback
+    def _async_set(self, kind: str, key: str, value: dict[str, Any] | None) -> None:
+        """Update a single item, recording a change if it differs."""
+        items = self._items[kind]
+        if items.get(key) == value:
+            return
+        if value is None:
+            del items[key]
+        else:
+            items[key] = value
+        self._lists[kind] = None
+        self.version += 1
+        if len(self._changes) == self._changes.maxlen:
+            self._truncated_version = self._changes[0][0]
+        self._changes.append((self.version, kind, key))
+
+    @callback
+    def _async_reload(self, kind: str, current: dict[str, dict[str, Any]]) -> None:
+        """Replace all items of a kind, recording only the differences."""
+        for key in self._items[kind].keys() - current.keys():
+            self._async_set(kind, key, None)
+        for key, value in current.items():
+            self._async_set(kind, key, value)
+
+    @callback
+    def _async_current_areas(self) -> dict[str, dict[str, Any]]:
+        """Return all areas from the area registry."""
+        return {
+            area.id: _area(area) for area in ar.async_get(self._hass).async_list_areas()
+        }
+
+    @callback
+    def _async_current_persons(self) -> dict[str, dict[str, Any]]:
+        """Return all persons from the state machine."""
+        return {
+            state.entity_id: _person(state)
+            for state in self._hass.states.async_all(PERSON_DOMAIN)
+        }
+
+    @callback
+    def _async_area_registry_updated(
+        self, event: Event[ar.EventAreaRegistryUpdatedData]
+    ) -> None:
+        """Update the area that changed in the area registry."""
+        if (area_id := event.data.get("area_id")) is None:
+            # Changes without an area, such as reordering, reload all areas
+            self._async_reload(AREAS, self._async_current_areas())
+            return
+        area = ar.async_get(self._hass).async_get_area(area_id)
+        self._async_set(AREAS, area_id, _area(area) if area else None)
+
+    @callback
+    def _async_person_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Update the person whose state was added, renamed or removed."""
+        new_state = event.data["new_state"]
+        self._async_set(
+            PERSONS,
+            event.data["entity_id"],
+            _person(new_state) if new_state is not None else None,
+        )
+
+
+@callback
+def _is_person_state_changed(event_data: EventStateChangedData) -> bool:
+    """Return True if the state change is for a person entity."""
+    return event_data["entity_id"].startswith(f"{PERSON_DOMAIN}.")
+
+
+def _area(area: ar.AreaEntry) -> dict[str, Any]:
+    """Return the name, id and aliases of an area."""
+    return {"name": area.name, "id": area.id, "aliases": sorted(area.aliases)}
+
+
+def _person(state: State) -> dict[str, Any]:
+    """Return the name and id of a person state."""
+    return {"name": state.name, "id": state.entity_id}
 
 
 async def async_guide_user_to_create_person(
@@ -67,7 +237,7 @@ async def async_guide_user_to_create_person(
     )
     # Create a unique notification ID to prevent duplicates if called multiple times
     # for the same person before the user acts on it.
-    notification_id = f"rulebook_add_person_{person_name.lower().replace(' ', '_')}"
+    notification_id = _person_notification_id(person_name)
 
     await hass.services.async_call(
         "persistent_notification",
@@ -85,6 +255,82 @@ async def async_guide_user_to_create_person(
     return {"status": "success", "person_name": person_name}
 
 
+async def async_guide_user_to_create_persons(
+    hass: HomeAssistant, person_names: list[str]
+) -> dict[str, Any]:
+    """Create one notification to guide the user to add several persons.
+
+    People that are already defined in Home Assistant or repeated in the request
+    are left out. The notification lists the people from earlier calls that
+    have not been added yet along with the new ones, and replaces the
+    notifications created for any of the people individually. It is dismissed
+    once every person in it has been added.
+
+    Args:
+        hass: The Home Assistant instance.
+        person_names: The names of the people to guide adding.
+
+    Returns:
+        A dictionary with the 'notification_id', or None if every person
+        already exists, and a 'persons' list with the 'person_name' and a
+        'status' of 'notified', 'exists' or 'duplicate' for each person.
+    """
+    existing = {
+        normalize_name(state.name) for state in hass.states.async_all(PERSON_DOMAIN)
+    }
+    # People from earlier calls stay in the notification until they are added
+    pending = hass.data.setdefault(DATA_PENDING_PERSONS, {})
+    for normalized in pending.keys() & existing:
+        del pending[normalized]
+    missing: dict[str, str] = {}
+    persons: list[dict[str, str]] = []
+    for person_name in person_names:
+        normalized = normalize_name(person_name)
+        if normalized in existing:
+            status = "exists"
+        elif normalized in missing:
+            status = "duplicate"
+        else:
+            status = "notified"
+            missing[normalized] = person_name
+            pending.setdefault(normalized, person_name)
+        persons.append({"person_name": person_name, "status": status})
+
+    if not pending:
+        persistent_notification.async_dismiss(hass, ADD_PERSONS_NOTIFICATION_ID)
+        return {"status": "success", "notification_id": None, "persons": persons}
+
+    people = "\n".join(f"- {person_name}" for person_name in pending.values())
+    persistent_notification.async_create(
+        hass,
+        (
+            "The rulebook mentions these people who are not yet defined in Home "
+            f"Assistant:\n\n{people}\n\nTo add them, please go to Settings > "
+            "People, and click on 'Add Person' for each of them."
+        ),
+        title="Add People from the Rulebook",
+        notification_id=ADD_PERSONS_NOTIFICATION_ID,
+    )
+    for person_name in missing.values():
+        persistent_notification.async_dismiss(
+            hass, _person_notification_id(person_name)
+        )
+    _LOGGER.info(
+        "Created persistent notification to guide adding persons: %s",
+        ", ".join(pending.values()),
+    )
+    return {
+        "status": "success",
+        "notification_id": ADD_PERSONS_NOTIFICATION_ID,
+        "persons": persons,
+    }
+
+
+def _person_notification_id(person_name: str) -> str:
+    """Return the notification id used to guide adding a single person."""
+    return f"rulebook_add_person_{person_name.lower().replace(' ', '_')}"
+
+
 async def async_create_area(
     hass: HomeAssistant, area_name: str
 ) -> dict[str, str | None] | None:
@@ -114,6 +360,62 @@ async def async_create_area(
     return {"name": area_entry.name, "id": area_entry.id}
 
 
+async def async_create_areas(
+    hass: HomeAssistant, area_names: list[str]
+) -> list[dict[str, Any]]:
+    """Create all missing areas in Home Assistant in a single pass.
+
+    Names that match an existing area or one of its aliases, ignoring case and
+    punctuation, are not created again, nor are names repeated in the request.
+    The area registry saves once for all the areas created.
+
+    Args:
+        hass: The Home Assistant instance.
+        area_names: The names of the areas to create.
+
+    Returns:
+        A list with a dictionary for each requested name containing its
+        'name', a 'status' of 'created', 'exists', 'duplicate' or 'error', and
+        the 'id' of the new or existing area or an 'error_message'.
+    """
+    area_reg = ar.async_get(hass)
+    existing: dict[str, ar.AreaEntry] = {}
+    for area in area_reg.async_list_areas():
+        for name in (area.name, *area.aliases):
+            existing.setdefault(normalize_name(name), area)
+
+    results: list[dict[str, Any]] = []
+    requested: set[str] = set()
+    for area_name in area_names:
+        normalized = normalize_name(area_name)
+        if (area := existing.get(normalized)) is not None:
+            status = "duplicate" if normalized in requested else "exists"
+            results.append({"name": area_name, "status": status, "id": area.id})
+            continue
+        requested.add(normalized)
+        try:
+            area = area_reg.async_create(area_name)
+        except ValueError as err:
+            _LOGGER.error("Failed to create area: '%s': %s", area_name, err)
+            results.append(
+                {
+                    "name": area_name,
+                    "status": "error",
+                    "error_message": f"Failed to create area: '{area_name}': {err}",
+                }
+            )
+            continue
+        existing[normalized] = area
+        results.append({"name": area.name, "status": "created", "id": area.id})
+
+    _LOGGER.info(
+        "Created %d of %d requested areas",
+        sum(result["status"] == "created" for result in results),
+        len(area_names),
+    )
+    return results
+
+
 async def async_get_ha_location_config(hass: HomeAssistant) -> dict[str, Any]:
     """Fetch Home Assistant's core location configuration.
 
@@ -211,3 +513,110 @@ async def async_set_ha_location_config(
             "Unexpected error updating Home Assistant location configuration: %s", e
         )
         return {"status": "error", "message": f"Unexpected error: {e!s}"}
+
+
+class AutomationsTransaction:
+    """Changes to the rulebook automations file that are applied together.
+
+    Automations are keyed by their rulebook id, which is the 'id' of the
+    automation. Upserts and deletes are staged and then applied with a single
+    atomic write of the file and a single reload of the automations. The file
+    is not written and automations are not reloaded when nothing changed.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the AutomationsTransaction."""
+        self._hass = hass
+        self._upserts: dict[str, dict[str, Any]] = {}
+        self._deletes: set[str] = set()
+
+    def upsert(self, automation: dict[str, Any]) -> None:
+        """Stage adding an automation or replacing the one with the same id."""
+        if not isinstance(rulebook_id := automation.get("id"), str) or not rulebook_id:
+            raise HomeAssistantError("The automation does not have a rulebook id")
+        self._deletes.discard(rulebook_id)
+        self._upserts[rulebook_id] = automation
+
+    def delete(self, rulebook_id: str) -> None:
+        """Stage removing the automation with the rulebook id."""
+        self._upserts.pop(rulebook_id, None)
+        self._deletes.add(rulebook_id)
+
+    async def async_commit(self) -> dict[str, Any]:
+        """Apply the staged changes to the file and reload the automations.
+
+        Returns:
+            A dictionary with the rulebook ids that were 'created', 'updated'
+            and 'deleted', and whether the file was 'changed' and the
+            automations 'reloaded'.
+        """
+        file_path = self._hass.config.path(AUTOMATIONS_FILENAME)
+        async with _async_get_automations_lock(self._hass):
+            content = await self._hass.async_add_executor_job(
+                _read_automations_file, file_path
+            )
+            automations = yaml_util.parse_yaml(content) if content else None
+            if automations is None:
+                automations = []
+            if not isinstance(automations, list):
+                raise HomeAssistantError(f"{AUTOMATIONS_FILENAME} is not a list")
+
+            result: dict[str, Any] = {"created": [], "updated": [], "deleted": []}
+            upserts = dict(self._upserts)
+            new_automations = []
+            for automation in automations:
+                rulebook_id = (
+                    automation.get("id") if isinstance(automation, dict) else None
+                )
+                if rulebook_id in self._deletes:
+                    result["deleted"].append(rulebook_id)
+                    continue
+                if (upsert := upserts.pop(rulebook_id, None)) is not None:
+                    if upsert != automation:
+                        result["updated"].append(rulebook_id)
+                    automation = upsert
+                new_automations.append(automation)
+            new_automations.extend(upserts.values())
+            result["created"].extend(upserts)
+
+            new_content = yaml_util.dump(new_automations) if new_automations else ""
+            result["changed"] = new_content != content and any(
+                result[key] for key in ("created", "updated", "deleted")
+            )
+            result["reloaded"] = False
+            if result["changed"]:
+                await async_write_file_atomic(file_path, new_content)
+                if self._hass.services.has_service(AUTOMATION_DOMAIN, SERVICE_RELOAD):
+                    await self._hass.services.async_call(
+                        AUTOMATION_DOMAIN, SERVICE_RELOAD, blocking=True
+                    )
+                    result["reloaded"] = True
+
+        self._upserts.clear()
+        self._deletes.clear()
+        _LOGGER.info(
+            "Applied rulebook automations: %d created, %d updated, %d deleted",
+            len(result["created"]),
+            len(result["updated"]),
+            len(result["deleted"]),
+        )
+        return {"status": "success", **result}
+
+
+DATA_AUTOMATIONS_LOCK: HassKey[asyncio.Lock] = HassKey(f"{DOMAIN}_automations_lock")
+
+
+def _async_get_automations_lock(hass: HomeAssistant) -> asyncio.Lock:
+    """Return the lock that serializes changes to the automations file."""
+    if (lock := hass.data.get(DATA_AUTOMATIONS_LOCK)) is None:
+        lock = hass.data[DATA_AUTOMATIONS_LOCK] = asyncio.Lock()
+    return lock
+
+
+def _read_automations_file(file_path: str) -> str:
+    """Read the automations file, which is empty if it does not exist."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
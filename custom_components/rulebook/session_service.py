@@ -0,0 +1,186 @@
+"""Session service for the Rulebook conversation agent."""
+
+import json
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, override
+
+from google.adk.events.event import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 50
+DEFAULT_IDLE_TTL = timedelta(hours=1)
+DEFAULT_MAX_EVENTS = 200
+
+type _SessionKey = tuple[str, str, str]
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """In-memory session service with bounded memory use.
+
+    Sessions that have not been used within the idle TTL are evicted, and the
+    least recently used sessions are evicted once there are more than the
+    maximum number of sessions. Only the most recent events of a session are
+    kept, while its state is kept in full.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_ttl: timedelta = DEFAULT_IDLE_TTL,
+        max_events: int = DEFAULT_MAX_EVENTS,
+    ) -> None:
+        """Initialize the BoundedInMemorySessionService."""
+        super().__init__()
+        self._max_sessions = max_sessions
+        self._idle_ttl = idle_ttl
+        self._max_events = max_events
+        # Last access time of each session, least recently used first
+        self._last_access: OrderedDict[_SessionKey, datetime] = OrderedDict()
+        # Approximate sizes in bytes, updated as sessions and events are added
+        # so the footprint does not require serializing every session again
+        self._session_bytes: dict[_SessionKey, int] = {}
+        self._event_bytes: dict[_SessionKey, deque[int]] = {}
+        self._footprint = 0
+        self.evicted = 0
+
+    @override
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        """Create a session, evicting idle or least recently used sessions."""
+        self._evict_idle()
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._touch(key)
+        self._track_size(key, session)
+        while len(self._last_access) > self._max_sessions:
+            self._evict(next(iter(self._last_access)))
+        return session
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        """Get a session unless it has been evicted."""
+        self._evict_idle()
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None:
+            self._touch((app_name, user_id, session_id))
+        return session
+
+    @override
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        """Delete a session."""
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        key = (app_name, user_id, session_id)
+        self._last_access.pop(key, None)
+        self._forget_size(key)
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """Append an event, dropping the oldest events over the limit."""
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        if event.partial or key not in self._last_access:
+            return event
+        self._touch(key)
+        event_bytes = self._event_bytes[key]
+        event_bytes.append(size := len(event.model_dump_json(exclude_none=True)))
+        self._session_bytes[key] += size
+        self._footprint += size
+        storage_session = self.sessions[session.app_name][session.user_id][session.id]
+        if (dropped := len(storage_session.events) - self._max_events) > 0:
+            del storage_session.events[:dropped]
+            for _ in range(dropped):
+                size = event_bytes.popleft()
+                self._session_bytes[key] -= size
+                self._footprint -= size
+        return event
+
+    def _track_size(self, key: _SessionKey, session: Session) -> None:
+        """Start tracking the size of a session that is added to memory."""
+        self._forget_size(key)
+        event_bytes = deque(
+            len(event.model_dump_json(exclude_none=True)) for event in session.events
+        )
+        size = len(json.dumps(session.state, default=str)) + sum(event_bytes)
+        self._session_bytes[key] = size
+        self._event_bytes[key] = event_bytes
+        self._footprint += size
+
+    def _forget_size(self, key: _SessionKey) -> None:
+        """Remove the size of a session that is no longer stored."""
+        self._footprint -= self._session_bytes.pop(key, 0)
+        self._event_bytes.pop(key, None)
+
+    def _touch(self, key: _SessionKey) -> None:
+        """Mark the session as most recently used."""
+        self._last_access[key] = dt_util.utcnow()
+        self._last_access.move_to_end(key)
+
+    def _evict_idle(self) -> None:
+        """Evict sessions that have not been used within the idle TTL."""
+        expired = dt_util.utcnow() - self._idle_ttl
+        while self._last_access:
+            key, last_access = next(iter(self._last_access.items()))
+            if last_access > expired:
+                break
+            self._evict(key)
+
+    def _evict(self, key: _SessionKey) -> None:
+        """Remove a session from memory."""
+        app_name, user_id, session_id = key
+        _LOGGER.debug("Evicting session %s for user %s", session_id, user_id)
+        self._last_access.pop(key, None)
+        self._forget_size(key)
+        user_sessions = self.sessions.get(app_name, {}).get(user_id, {})
+        user_sessions.pop(session_id, None)
+        if not user_sessions:
+            self.sessions.get(app_name, {}).pop(user_id, None)
+        self.evicted += 1
+
+    def memory_footprint(self) -> int:
+        """Return the approximate size in bytes of the stored sessions.
+
+        The size is the serialized size of the initial state of each session
+        and of the events it keeps.
+        """
+        return self._footprint
+
+    def stats(self) -> dict[str, int]:
+        """Return session counters for diagnostics."""
+        return {
+            "sessions": len(self._last_access),
+            "events": sum(
+                len(session.events)
+                for user_sessions in self.sessions.values()
+                for sessions in user_sessions.values()
+                for session in sessions.values()
+            ),
+            "evicted": self.evicted,
+            "memory_footprint_bytes": self.memory_footprint(),
+        }
@@ -0,0 +1,472 @@
+"""Session service that persists conversation sessions in SQLite.
+
+Sessions are served from the bounded in-memory session service and written
+to a SQLite database in the background, so conversations and their state
+survive a restart of Home Assistant. Sessions that are evicted from memory
+are loaded again from the database on their next use.
+
+Events are written in batches. Large state values, such as the parsed
+rulebook, are stored once by content hash and referenced from the session
+state and event rows instead of being repeated in every row.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any, override
+
+from google.adk.events.event import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+
+from .session_service import BoundedInMemorySessionService
+
+_LOGGER = logging.getLogger(__name__)
+
+# State values with a JSON encoding larger than this are stored as blobs
+_BLOB_THRESHOLD = 1024
+_BLOB_REF = "__blob__"
+_BLOB_REF_RE = re.compile(rf'"{_BLOB_REF}": "([0-9a-f]{{64}})"')
+_FLUSH_DELAY_SECONDS = 1.0
+_FLUSH_BATCH_SIZE = 50
+# Sessions not updated within this time are deleted from the database
+_RETENTION = timedelta(days=7)
+# Key for the app state in the scoped state table
+_APP_SCOPE = ""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session
+    ON events (app_name, user_id, session_id, id);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scoped_state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+type _SessionKey = tuple[str, str, str]
+
+
+def _encode_values(values: dict[str, Any], blobs: dict[str, str]) -> dict[str, Any]:
+    """Replace large values with references to blobs keyed by content hash."""
+    result: dict[str, Any] = {}
+    for key, value in values.items():
+        encoded = json.dumps(value, default=str)
+        if len(encoded) <= _BLOB_THRESHOLD:
+            result[key] = value
+            continue
+        digest = hashlib.sha256(encoded.encode()).hexdigest()
+        blobs[digest] = encoded
+        result[key] = {_BLOB_REF: digest}
+    return result
+
+
+def _decode_values(
+    values: dict[str, Any], read_blob: Callable[[str], str | None]
+) -> dict[str, Any]:
+    """Replace blob references with the values they refer to."""
+    result: dict[str, Any] = {}
+    for key, value in values.items():
+        if isinstance(value, dict) and set(value) == {_BLOB_REF}:
+            if (encoded := read_blob(value[_BLOB_REF])) is None:
+                _LOGGER.warning("Missing stored value for state key %s", key)
+                continue
+            value = json.loads(encoded)
+        result[key] = value
+    return result
+
+
+class SqliteSessionService(BoundedInMemorySessionService):
+    """Bounded in-memory session service persisted to a SQLite database."""
+
+    def __init__(self, hass: HomeAssistant, db_path: str, **kwargs: Any) -> None:
+        """Initialize the SqliteSessionService."""
+        super().__init__(**kwargs)
+        self._hass = hass
+        self._db_path = db_path
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = asyncio.Lock()
+        self._pending_events: list[tuple[_SessionKey, dict[str, Any]]] = []
+        self._pending_sessions: dict[_SessionKey, tuple[dict[str, Any], float]] = {}
+        self._pending_scoped_state: dict[tuple[str, str], dict[str, Any]] = {}
+        self._flush_unsub: CALLBACK_TYPE | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Return the database connection."""
+        if self._conn is None:
+            raise HomeAssistantError(f"Session database {self._db_path} is not open")
+        return self._conn
+
+    async def async_setup(self) -> None:
+        """Open the database, removing sessions past the retention period."""
+        async with self._db_lock:
+            scoped_state = await self._hass.async_add_executor_job(self._setup)
+        for (app_name, user_id), state in scoped_state.items():
+            if user_id == _APP_SCOPE:
+                self.app_state[app_name] = state
+            else:
+                self.user_state.setdefault(app_name, {})[user_id] = state
+
+    async def async_close(self) -> None:
+        """Write pending changes and close the database."""
+        await self.flush()
+        async with self._db_lock:
+            if self._conn is not None:
+                await self._hass.async_add_executor_job(self._conn.close)
+                self._conn = None
+
+    @override
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        """Create a session and schedule writing it to the database."""
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._queue_session((app_name, user_id, session.id))
+        self._queue_scoped_state(app_name, user_id)
+        self._async_schedule_flush()
+        return session
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        """Get a session, loading it from the database if it is not in memory."""
+        # Idle sessions are evicted first so that they are loaded again below
+        self._evict_idle()
+        if session_id not in self.sessions.get(app_name, {}).get(user_id, {}):
+            await self._async_load_session((app_name, user_id, session_id))
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    @override
+    async def list_sessions(
+        self, *, app_name: str, user_id: str | None = None
+    ) -> ListSessionsResponse:
+        """List the sessions stored in the database, without events or state."""
+        await self.flush()
+        async with self._db_lock:
+            rows = await self._hass.async_add_executor_job(
+                self._list_sessions, app_name, user_id
+            )
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    id=session_id,
+                    app_name=app_name,
+                    user_id=session_user_id,
+                    last_update_time=last_update_time,
+                )
+                for session_user_id, session_id, last_update_time in rows
+            ]
+        )
+
+    @override
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        """Delete a session from memory and from the database."""
+        await super().delete_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        await self.flush()
+        async with self._db_lock:
+            await self._hass.async_add_executor_job(
+                self._delete_session, (app_name, user_id, session_id)
+            )
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """Append an event and schedule writing it to the database."""
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        if event.partial or session.id not in self.sessions.get(
+            session.app_name, {}
+        ).get(session.user_id, {}):
+            return event
+        self._pending_events.append(
+            (key, event.model_dump(mode="json", exclude_none=True))
+        )
+        self._queue_session(key)
+        if event.actions and event.actions.state_delta:
+            self._queue_scoped_state(session.app_name, session.user_id)
+        if len(self._pending_events) >= _FLUSH_BATCH_SIZE:
+            await self.flush()
+        else:
+            self._async_schedule_flush()
+        return event
+
+    @override
+    async def flush(self) -> None:
+        """Write all pending sessions and events to the database."""
+        if self._flush_unsub is not None:
+            self._flush_unsub()
+            self._flush_unsub = None
+        if not (
+            self._pending_events or self._pending_sessions or self._pending_scoped_state
+        ):
+            return
+
+        blobs: dict[str, str] = {}
+        sessions = [
+            (*key, json.dumps(_encode_values(state, blobs)), last_update_time)
+            for key, (state, last_update_time) in self._pending_sessions.items()
+        ]
+        events = []
+        for key, event_data in self._pending_events:
+            if state_delta := event_data.get("actions", {}).get("state_delta"):
+                event_data["actions"]["state_delta"] = _encode_values(
+                    state_delta, blobs
+                )
+            events.append((*key, json.dumps(event_data)))
+        scoped_state = [
+            (app_name, user_id, json.dumps(_encode_values(state, blobs)))
+            for (app_name, user_id), state in self._pending_scoped_state.items()
+        ]
+        self._pending_events = []
+        self._pending_sessions = {}
+        self._pending_scoped_state = {}
+
+        async with self._db_lock:
+            await self._hass.async_add_executor_job(
+                self._write, sessions, events, scoped_state, blobs
+            )
+
+    def _queue_session(self, key: _SessionKey) -> None:
+        """Queue writing the current state of a session."""
+        app_name, user_id, session_id = key
+        storage_session = self.sessions[app_name][user_id][session_id]
+        self._pending_sessions[key] = (
+            dict(storage_session.state),
+            storage_session.last_update_time,
+        )
+
+    def _queue_scoped_state(self, app_name: str, user_id: str) -> None:
+        """Queue writing the app and user state."""
+        self._pending_scoped_state[(app_name, _APP_SCOPE)] = dict(
+            self.app_state.get(app_name, {})
+        )
+        self._pending_scoped_state[(app_name, user_id)] = dict(
+            self.user_state.get(app_name, {}).get(user_id, {})
+        )
+
+    def _async_schedule_flush(self) -> None:
+        """Schedule a flush so that the events of a turn are written together."""
+        if self._flush_unsub is not None:
+            return
+
+        async def _async_flush(_: datetime) -> None:
+            self._flush_unsub = None
+            await self.flush()
+
+        self._flush_unsub = async_call_later(
+            self._hass, _FLUSH_DELAY_SECONDS, _async_flush
+        )
+
+    async def _async_load_session(self, key: _SessionKey) -> None:
+        """Load a session from the database into memory if it exists."""
+        # Pending writes may belong to the session if it was evicted recently
+        await self.flush()
+        async with self._db_lock:
+            session = await self._hass.async_add_executor_job(self._read_session, key)
+        if session is None:
+            return
+        _LOGGER.debug("Loaded session %s from the database", session.id)
+        self.sessions.setdefault(session.app_name, {}).setdefault(session.user_id, {})[
+            session.id
+        ] = session
+        self._touch(key)
+        self._track_size(key, session)
+        while len(self._last_access) > self._max_sessions:
+            self._evict(next(iter(self._last_access)))
+
+    def _setup(self) -> dict[tuple[str, str], dict[str, Any]]:
+        """Open the database and purge expired data, in the executor."""
+        self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.executescript(_SCHEMA)
+            self._purge(time.time() - _RETENTION.total_seconds())
+        return {
+            (app_name, user_id): _decode_values(json.loads(state), self._read_blob)
+            for app_name, user_id, state in self._db.execute(
+                "SELECT app_name, user_id, state FROM scoped_state"
+            )
+        }
+
+    def _purge(self, expired: float) -> None:
+        """Delete expired sessions and blobs that are no longer referenced."""
+        self._db.execute(
+            "DELETE FROM events WHERE (app_name, user_id, session_id) IN ("
+            "SELECT app_name, user_id, session_id FROM sessions "
+            "WHERE last_update_time < ?)",
+            (expired,),
+        )
+        self._db.execute("DELETE FROM sessions WHERE last_update_time < ?", (expired,))
+        referenced: set[str] = set()
+        for query in (
+            "SELECT state FROM sessions",
+            "SELECT event FROM events",
+            "SELECT state FROM scoped_state",
+        ):
+            for (value,) in self._db.execute(query):
+                referenced.update(_BLOB_REF_RE.findall(value))
+        unreferenced = [
+            (digest,)
+            for (digest,) in self._db.execute("SELECT hash FROM blobs")
+            if digest not in referenced
+        ]
+        self._db.executemany("DELETE FROM blobs WHERE hash = ?", unreferenced)
+
+    def _write(
+        self,
+        sessions: list[tuple[str, str, str, str, float]],
+        events: list[tuple[str, str, str, str]],
+        scoped_state: list[tuple[str, str, str]],
+        blobs: dict[str, str],
+    ) -> None:
+        """Write a batch of changes in a single transaction, in the executor."""
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, value) VALUES (?, ?)",
+                blobs.items(),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions "
+                "(app_name, user_id, session_id, state, last_update_time) "
+                "VALUES (?, ?, ?, ?, ?)",
+                sessions,
+            )
+            self._db.executemany(
+                "INSERT INTO events (app_name, user_id, session_id, event) "
+                "VALUES (?, ?, ?, ?)",
+                events,
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scoped_state (app_name, user_id, state) "
+                "VALUES (?, ?, ?)",
+                scoped_state,
+            )
+            # Only the most recent events of a session are kept, as in memory
+            self._db.executemany(
+                "DELETE FROM events WHERE app_name = ? AND user_id = ? "
+                "AND session_id = ? AND id NOT IN (SELECT id FROM events "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? "
+                "ORDER BY id DESC LIMIT ?)",
+                [(*key, *key, self._max_events) for key in {e[:3] for e in events}],
+            )
+
+    def _read_blob(self, digest: str) -> str | None:
+        """Read a blob by its content hash, in the executor."""
+        row = self._db.execute(
+            "SELECT value FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _read_session(self, key: _SessionKey) -> Session | None:
+        """Read a session and its most recent events, in the executor."""
+        row = self._db.execute(
+            "SELECT state, last_update_time FROM sessions "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        state, last_update_time = row
+        events = []
+        for (event,) in self._db.execute(
+            "SELECT event FROM (SELECT id, event FROM events "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ? "
+            "ORDER BY id DESC LIMIT ?) ORDER BY id",
+            (*key, self._max_events),
+        ):
+            event_data = json.loads(event)
+            if state_delta := event_data.get("actions", {}).get("state_delta"):
+                event_data["actions"]["state_delta"] = _decode_values(
+                    state_delta, self._read_blob
+                )
+            events.append(Event.model_validate(event_data))
+        app_name, user_id, session_id = key
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=_decode_values(json.loads(state), self._read_blob),
+            events=events,
+            last_update_time=last_update_time,
+        )
+
+    def _list_sessions(
+        self, app_name: str, user_id: str | None
+    ) -> list[tuple[str, str, float]]:
+        """List the stored sessions of the app, in the executor."""
+        if user_id is None:
+            return self._db.execute(
+                "SELECT user_id, session_id, last_update_time FROM sessions "
+                "WHERE app_name = ?",
+                (app_name,),
+            ).fetchall()
+        return self._db.execute(
+            "SELECT user_id, session_id, last_update_time FROM sessions "
+            "WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ).fetchall()
+
+    def _delete_session(self, key: _SessionKey) -> None:
+        """Delete a session and its events, in the executor."""
+        with self._db:
+            self._db.execute(
+                "DELETE FROM events "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            )
+            self._db.execute(
+                "DELETE FROM sessions "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            )
@@ -1,29 +1,146 @@
 """Handles storage of the parsed rulebook."""
 
+import contextlib
+import hashlib
 import json
 import logging
+import os
+from dataclasses import dataclass
+from enum import StrEnum
 from typing import Any
 
 from aiofiles import open as aio_open
+from aiofiles import os as aio_os
 from aiofiles.os import makedirs as aio_makedirs
-from aiofiles.os import path as aio_path
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.hass_dict import HassKey
 
-from .const import PARSED_RULEBOOK_FILENAME, STORAGE_DIR
-from .data.home import ParsedHomeDetails
+from .const import (
+    DOMAIN,
+    PARSED_RULEBOOK_FILENAME,
+    RULE_PARSE_CACHE_FILENAME,
+    RULEBOOK_HASH_FILENAME,
+    STORAGE_DIR,
+)
+from .data.diff import normalize_text
+from .data.home import ParsedHomeDetails, ParsedSmartHomeRule
+from .data.index import RulebookIndex
 
 _LOGGER = logging.getLogger(__name__)
 
+# Version of the parsed rulebook file, stored in a header line before the
+# rulebook so the version can be read without parsing the whole file.
+PARSED_RULEBOOK_VERSION = 1
+
+
+class StorageFormat(StrEnum):
+    """Format of the parsed rulebook file."""
+
+    COMPACT = "compact"
+    """Minified JSON."""
+
+    PRETTY = "pretty"
+    """Indented JSON that is easier to read and edit by hand."""
+
+
+DEFAULT_STORAGE_FORMAT = StorageFormat.COMPACT
+
+
+@dataclass(frozen=True, kw_only=True)
+class _CachedRulebook:
+    """A parsed rulebook along with the file metadata it was read from."""
+
+    mtime_ns: int
+    size: int
+    parsed_rulebook: ParsedHomeDetails
+    index: RulebookIndex
+
+
+class ParsedRulebookCache:
+    """In-memory cache of parsed rulebooks keyed by config entry id.
+
+    Entries are validated against the modification time and size of the file
+    on disk, so an external edit of the file is picked up on the next read.
+    The index of each rulebook is compiled once when it is cached. Cached
+    objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the ParsedRulebookCache."""
+        self._entries: dict[str, _CachedRulebook] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, config_entry_id: str, stat_result: os.stat_result
+    ) -> _CachedRulebook | None:
+        """Return the cached rulebook if it matches the file metadata."""
+        cached = self._entries.get(config_entry_id)
+        if (
+            cached is None
+            or cached.mtime_ns != stat_result.st_mtime_ns
+            or cached.size != stat_result.st_size
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached
+
+    def put(
+        self,
+        config_entry_id: str,
+        stat_result: os.stat_result,
+        parsed_rulebook: ParsedHomeDetails,
+    ) -> _CachedRulebook:
+        """Store a parsed rulebook and its index for the file metadata."""
+        cached = self._entries[config_entry_id] = _CachedRulebook(
+            mtime_ns=stat_result.st_mtime_ns,
+            size=stat_result.st_size,
+            parsed_rulebook=parsed_rulebook,
+            index=RulebookIndex(parsed_rulebook),
+        )
+        return cached
+
+    def invalidate(self, config_entry_id: str) -> None:
+        """Drop any cached rulebook for the config entry."""
+        self._entries.pop(config_entry_id, None)
+
+    def stats(self) -> dict[str, int]:
+        """Return cache counters for diagnostics."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+DATA_PARSED_RULEBOOK_CACHE: HassKey[ParsedRulebookCache] = HassKey(
+    f"{DOMAIN}_parsed_rulebook_cache"
+)
+
+
+def async_get_parsed_rulebook_cache(hass: HomeAssistant) -> ParsedRulebookCache:
+    """Return the parsed rulebook cache shared by all config entries."""
+    if (cache := hass.data.get(DATA_PARSED_RULEBOOK_CACHE)) is None:
+        cache = hass.data[DATA_PARSED_RULEBOOK_CACHE] = ParsedRulebookCache()
+    return cache
+
 
 async def async_write_parsed_rulebook(
-    hass: HomeAssistant, parsed_rulebook: ParsedHomeDetails, config_entry_id: str
+    hass: HomeAssistant,
+    parsed_rulebook: ParsedHomeDetails,
+    config_entry_id: str,
+    storage_format: StorageFormat = DEFAULT_STORAGE_FORMAT,
 ) -> None:
     """Write the parsed rulebook to a file specific to the config entry.
 
     The rulebook is stored as a JSON file in the Home Assistant config directory,
     under a subdirectory named after the config_entry_id.
     """
+    cache = async_get_parsed_rulebook_cache(hass)
+    cache.invalidate(config_entry_id)
+
     entry_storage_path = hass.config.path(STORAGE_DIR, config_entry_id)
     await aio_makedirs(entry_storage_path, exist_ok=True)
 
@@ -32,13 +149,53 @@ async def async_write_parsed_rulebook(
         "Writing parsed rulebook for entry %s to %s", config_entry_id, file_path
     )
     try:
-        async with aio_open(file_path, "w") as f:
-            await f.write(parsed_rulebook.model_dump_json(indent=2))
+        stat_result = await _async_write_parsed_rulebook_file(
+            file_path, parsed_rulebook, storage_format
+        )
     except OSError as err:
         _LOGGER.error("Error writing parsed rulebook to %s: %s", file_path, err)
         raise HomeAssistantError(
             f"Could not write parsed rulebook to {file_path}: {err}"
         ) from err
+    cache.put(config_entry_id, stat_result, parsed_rulebook)
+
+
+async def _async_write_parsed_rulebook_file(
+    file_path: str, parsed_rulebook: ParsedHomeDetails, storage_format: StorageFormat
+) -> os.stat_result:
+    """Write the versioned parsed rulebook file and return its metadata."""
+    header = json.dumps(
+        {"version": PARSED_RULEBOOK_VERSION, "format": storage_format},
+        separators=(",", ":"),
+    )
+    body = parsed_rulebook.model_dump_json(
+        indent=2 if storage_format == StorageFormat.PRETTY else None
+    )
+    await async_write_file_atomic(file_path, f"{header}\n{body}")
+    return await aio_os.stat(file_path)
+
+
+def _decode_parsed_rulebook(content: str) -> tuple[ParsedHomeDetails, int | None]:
+    """Decode the parsed rulebook file and return it with its version.
+
+    The version is None for a file written before the version header was
+    added, which held only the rulebook JSON.
+
+    Raises ValueError if the file can't be decoded.
+    """
+    header_line, _, body = content.partition("\n")
+    try:
+        header = json.loads(header_line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or not isinstance(header.get("version"), int):
+        return ParsedHomeDetails.model_validate_json(content), None
+    if header["version"] > PARSED_RULEBOOK_VERSION:
+        raise ValueError(
+            f"Unsupported parsed rulebook version {header['version']}, expected "
+            f"at most {PARSED_RULEBOOK_VERSION}"
+        )
+    return ParsedHomeDetails.model_validate_json(body), header["version"]
 
 
 async def async_read_parsed_rulebook(
@@ -46,16 +203,55 @@ async def async_read_parsed_rulebook(
 ) -> ParsedHomeDetails | None:
     """Read the parsed rulebook from a file specific to the config entry.
 
+    The result is served from an in-memory cache unless the file was written
+    or changed on disk since it was last read.
+
     Returns the parsed rulebook or None if the file does not exist or is invalid.
     """
+    if (cached := await _async_read_cached_rulebook(hass, config_entry_id)) is None:
+        return None
+    return cached.parsed_rulebook
+
+
+async def async_read_rulebook_index(
+    hass: HomeAssistant, config_entry_id: str
+) -> RulebookIndex | None:
+    """Read the compiled index of the parsed rulebook for the config entry.
+
+    The index is shared with all other callers and is only rebuilt when the
+    parsed rulebook changes.
+
+    Returns the index or None if the parsed rulebook does not exist.
+    """
+    if (cached := await _async_read_cached_rulebook(hass, config_entry_id)) is None:
+        return None
+    return cached.index
+
+
+async def _async_read_cached_rulebook(
+    hass: HomeAssistant, config_entry_id: str
+) -> _CachedRulebook | None:
+    """Read the parsed rulebook through the cache."""
+    cache = async_get_parsed_rulebook_cache(hass)
     file_path = hass.config.path(STORAGE_DIR, config_entry_id, PARSED_RULEBOOK_FILENAME)
-    if not await aio_path.exists(file_path):
+    try:
+        stat_result = await aio_os.stat(file_path)
+    except FileNotFoundError:
         _LOGGER.debug(
             "Parsed rulebook file for entry %s not found at %s",
             config_entry_id,
             file_path,
         )
+        cache.invalidate(config_entry_id)
         return None
+    except OSError as err:
+        _LOGGER.error("Error reading parsed rulebook from %s: %s", file_path, err)
+        raise HomeAssistantError(
+            f"Could not read parsed rulebook from {file_path}: {err}"
+        ) from err
+
+    if (cached := cache.get(config_entry_id, stat_result)) is not None:
+        return cached
 
     _LOGGER.debug(
         "Reading parsed rulebook for entry %s from %s", config_entry_id, file_path
@@ -63,20 +259,163 @@ async def async_read_parsed_rulebook(
     try:
         async with aio_open(file_path, "r") as f:
             content = await f.read()
-            data: dict[str, Any] = json.loads(content)
-            return ParsedHomeDetails(**data)
     except OSError as err:
         _LOGGER.error("Error reading parsed rulebook from %s: %s", file_path, err)
         raise HomeAssistantError(
             f"Could not read parsed rulebook from {file_path}: {err}"
         ) from err
-    except json.JSONDecodeError as err:
+    try:
+        parsed_rulebook, version = _decode_parsed_rulebook(content)
+    except ValueError as err:
         _LOGGER.error("Error decoding parsed rulebook from %s: %s", file_path, err)
         raise HomeAssistantError(
             f"Could not decode parsed rulebook from {file_path}: {err}"
         ) from err
-    except Exception as err:
-        _LOGGER.error("Unexpected error reading rulebook from %s: %s", file_path, err)
+
+    if version is None:
+        _LOGGER.info(
+            "Migrating parsed rulebook %s to version %d",
+            file_path,
+            PARSED_RULEBOOK_VERSION,
+        )
+        try:
+            stat_result = await _async_write_parsed_rulebook_file(
+                file_path, parsed_rulebook, DEFAULT_STORAGE_FORMAT
+            )
+        except OSError as err:
+            # The previous file is left in place and migrated on the next read
+            _LOGGER.warning("Error migrating parsed rulebook %s: %s", file_path, err)
+
+    return cache.put(config_entry_id, stat_result, parsed_rulebook)
+
+
+def rulebook_text_hash(rulebook_text: str, parser: str) -> str:
+    """Return the content hash of the rulebook text and the parser.
+
+    The parser identifies the models and prompt version used to parse the
+    rulebook, so that changing them causes the rulebook to be parsed again.
+    """
+    return hashlib.sha256(f"{parser}\n{rulebook_text}".encode()).hexdigest()
+
+
+async def async_write_rulebook_hash(
+    hass: HomeAssistant, rulebook_hash: str, config_entry_id: str
+) -> None:
+    """Write the hash of the rulebook text the parsed rulebook was built from.
+
+    The hash is stored next to the parsed rulebook file so that unchanged
+    rulebook text can be detected without parsing it again.
+    """
+    entry_storage_path = hass.config.path(STORAGE_DIR, config_entry_id)
+    await aio_makedirs(entry_storage_path, exist_ok=True)
+
+    file_path = hass.config.path(STORAGE_DIR, config_entry_id, RULEBOOK_HASH_FILENAME)
+    try:
+        await async_write_file_atomic(file_path, rulebook_hash)
+    except OSError as err:
+        _LOGGER.error("Error writing rulebook hash to %s: %s", file_path, err)
         raise HomeAssistantError(
-            f"Unexpected error reading rulebook from {file_path}: {err}"
+            f"Could not write rulebook hash to {file_path}: {err}"
         ) from err
+
+
+async def async_read_rulebook_hash(
+    hass: HomeAssistant, config_entry_id: str
+) -> str | None:
+    """Read the hash of the rulebook text the parsed rulebook was built from.
+
+    Returns the hash or None if it has not been written yet.
+    """
+    file_path = hass.config.path(STORAGE_DIR, config_entry_id, RULEBOOK_HASH_FILENAME)
+    try:
+        async with aio_open(file_path, "r") as f:
+            return (await f.read()).strip() or None
+    except FileNotFoundError:
+        return None
+    except OSError as err:
+        _LOGGER.error("Error reading rulebook hash from %s: %s", file_path, err)
+        raise HomeAssistantError(
+            f"Could not read rulebook hash from {file_path}: {err}"
+        ) from err
+
+
+def rule_parse_cache_key(rule_text: str, model: str) -> str:
+    """Return the rule parse cache key for a rule snippet and parser model.
+
+    Case and whitespace are normalized so that reformatting the rulebook does
+    not cause a rule to be parsed again.
+    """
+    normalized_text = normalize_text(rule_text)
+    return hashlib.sha256(f"{model}\n{normalized_text}".encode()).hexdigest()
+
+
+async def async_write_rule_parse_cache(
+    hass: HomeAssistant,
+    rule_parse_cache: dict[str, ParsedSmartHomeRule],
+    config_entry_id: str,
+) -> None:
+    """Write the cache of parsed smart home rules keyed by rule_parse_cache_key."""
+    entry_storage_path = hass.config.path(STORAGE_DIR, config_entry_id)
+    await aio_makedirs(entry_storage_path, exist_ok=True)
+
+    file_path = hass.config.path(
+        STORAGE_DIR, config_entry_id, RULE_PARSE_CACHE_FILENAME
+    )
+    _LOGGER.debug(
+        "Writing %d cached rules for entry %s to %s",
+        len(rule_parse_cache),
+        config_entry_id,
+        file_path,
+    )
+    data = {key: rule.model_dump() for key, rule in rule_parse_cache.items()}
+    try:
+        await async_write_file_atomic(file_path, json.dumps(data))
+    except OSError as err:
+        _LOGGER.error("Error writing rule parse cache to %s: %s", file_path, err)
+        raise HomeAssistantError(
+            f"Could not write rule parse cache to {file_path}: {err}"
+        ) from err
+
+
+async def async_read_rule_parse_cache(
+    hass: HomeAssistant, config_entry_id: str
+) -> dict[str, ParsedSmartHomeRule]:
+    """Read the cache of parsed smart home rules keyed by rule_parse_cache_key.
+
+    Returns an empty cache if the file does not exist or can't be decoded, in
+    which case all rules are parsed again.
+    """
+    file_path = hass.config.path(
+        STORAGE_DIR, config_entry_id, RULE_PARSE_CACHE_FILENAME
+    )
+    try:
+        async with aio_open(file_path, "r") as f:
+            data: dict[str, Any] = json.loads(await f.read())
+        return {key: ParsedSmartHomeRule(**value) for key, value in data.items()}
+    except FileNotFoundError:
+        return {}
+    except OSError as err:
+        _LOGGER.error("Error reading rule parse cache from %s: %s", file_path, err)
+        raise HomeAssistantError(
+            f"Could not read rule parse cache from {file_path}: {err}"
+        ) from err
+    except Exception as err:  # noqa: BLE001
+        _LOGGER.warning("Ignoring invalid rule parse cache %s: %s", file_path, err)
+        return {}
+
+
+async def async_write_file_atomic(file_path: str, content: str) -> None:
+    """Write a file through a temporary file that is renamed into place.
+
+    Readers see either the previous or the new contents, and never a partially
+    written file if Home Assistant stops in the middle of a write.
+    """
+    tmp_path = f"{file_path}.tmp"
+    try:
+        async with aio_open(tmp_path, "w") as f:
+            await f.write(content)
+        await aio_os.replace(tmp_path, file_path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            await aio_os.remove(tmp_path)
+        raise
@@ -6,6 +6,12 @@ from google import genai
 from google.adk.agents import BaseAgent
 from homeassistant.config_entries import ConfigEntry
 
+from .automation_index import AutomationIndex
+from .entity_resolver import EntityResolver
+from .history import RulebookHistory
+from .interaction_layer import RegistrySnapshot
+from .sqlite_session_service import SqliteSessionService
+
 
 @dataclass(frozen=True, kw_only=True)
 class RulebookContext:
@@ -13,6 +19,11 @@ class RulebookContext:
 
     agent: BaseAgent
     client: genai.Client
+    session_service: SqliteSessionService
+    history: RulebookHistory
+    registry_snapshot: RegistrySnapshot
+    entity_resolver: EntityResolver
+    automation_index: AutomationIndex
 
 
 type RulebookConfigEntry = ConfigEntry[RulebookContext]
@@ -0,0 +1,110 @@
+"""Micro-benchmark of the per-turn overhead of running the conversation agent.
+
+Compares building a new Runner and looking up or creating the session on
+every turn with reusing a single Runner that creates sessions on demand. The
+agent answers without calling a model, so only the framework overhead is
+measured.
+
+Usage: python3 script/benchmark_turn_overhead.py [--turns N] [--conversations N]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events.event import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+APP_NAME = "rulebook"
+USER_ID = "benchmark_user"
+RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+class EchoAgent(BaseAgent):
+    """Agent that responds immediately without calling a model."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event]:
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text="OK")]),
+        )
+
+
+def _message(turn: int) -> types.Content:
+    return types.Content(role="user", parts=[types.Part(text=f"Message {turn}")])
+
+
+async def run_per_turn_runner(
+    agent: BaseAgent, turns: int, conversations: int
+) -> float:
+    """Run turns building a Runner and looking up the session every turn."""
+    session_service = InMemorySessionService()
+    start = time.perf_counter()
+    for turn in range(turns):
+        session_id = f"conversation-{turn % conversations}"
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+        if not session:
+            await session_service.create_session(
+                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+            )
+        runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+        async for _ in runner.run_async(
+            session_id=session_id,
+            new_message=_message(turn),
+            user_id=USER_ID,
+            run_config=RUN_CONFIG,
+        ):
+            pass
+    return time.perf_counter() - start
+
+
+async def run_reused_runner(agent: BaseAgent, turns: int, conversations: int) -> float:
+    """Run turns reusing a single Runner that creates sessions on demand."""
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+        auto_create_session=True,
+    )
+    start = time.perf_counter()
+    for turn in range(turns):
+        async for _ in runner.run_async(
+            session_id=f"conversation-{turn % conversations}",
+            new_message=_message(turn),
+            user_id=USER_ID,
+            run_config=RUN_CONFIG,
+        ):
+            pass
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    """Run the benchmark and print the per-turn overhead."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--conversations", type=int, default=10)
+    args = parser.parse_args()
+
+    agent = EchoAgent(name="EchoAgent")
+    # Warm up imports and caches before measuring
+    await run_reused_runner(agent, turns=10, conversations=1)
+
+    before = await run_per_turn_runner(agent, args.turns, args.conversations)
+    after = await run_reused_runner(agent, args.turns, args.conversations)
+    print(f"Turns: {args.turns}, conversations: {args.conversations}")
+    print(f"Runner per turn: {before / args.turns * 1000:.3f} ms/turn")
+    print(f"Reused runner:   {after / args.turns * 1000:.3f} ms/turn")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+"""Tests for compiling smart home rules into automations."""
+
+import pytest
+
+from custom_components.rulebook.data.automation import (
+    CompiledAutomation,
+    UncompiledRule,
+    compile_rule,
+    compile_rules,
+    rule_id,
+)
+from custom_components.rulebook.data.home import ParsedSmartHomeRule
+
+ENTITIES = {
+    "porch light": ["light.porch"],
+    "coffee maker": ["switch.coffee_maker"],
+    "hallway light": ["light.hallway"],
+    "hallway motion": ["sensor.hallway_illuminance", "binary_sensor.hallway_motion"],
+}
+
+
+def _resolve(mention: str) -> list[str]:
+    """Resolve a mention to the test entities."""
+    return ENTITIES.get(mention.removeprefix("the "), [])
+
+
+def _compile(text: str) -> CompiledAutomation | UncompiledRule:
+    """Compile a rule with the text as its core logic."""
+    rule = ParsedSmartHomeRule(
+        rule_raw_text=f"Rule: {text}", rule_name="Test rule", core_logic_text=text
+    )
+    return compile_rule(rule, _resolve)
+
+
+@pytest.mark.parametrize(
+    ("text", "trigger", "action"),
+    [
+        (
+            "Turn on the porch light at sunset.",
+            {"trigger": "sun", "event": "sunset"},
+            "light.turn_on",
+        ),
+        (
+            "30 minutes before sunrise, turn the porch light off",
+            {"trigger": "sun", "event": "sunrise", "offset": "-00:30:00"},
+            "light.turn_off",
+        ),
+        (
+            "Turn on the porch light 1 hour after sunset",
+            {"trigger": "sun", "event": "sunset", "offset": "01:00:00"},
+            "light.turn_on",
+        ),
+        (
+            "Every day at 6:45 am, turn on the coffee maker",
+            {"trigger": "time", "at": "06:45:00"},
+            "switch.turn_on",
+        ),
+        (
+            "Switch off the porch light at 23:00",
+            {"trigger": "time", "at": "23:00:00"},
+            "light.turn_off",
+        ),
+        (
+            "Turn on the porch light at 19:30",
+            {"trigger": "time", "at": "19:30:00"},
+            "light.turn_on",
+        ),
+        (
+            "Turn off the porch light at 0:15",
+            {"trigger": "time", "at": "00:15:00"},
+            "light.turn_off",
+        ),
+        (
+            "Turn off the porch light at 12 a.m.",
+            {"trigger": "time", "at": "00:00:00"},
+            "light.turn_off",
+        ),
+    ],
+)
+def test_compile_switch(text: str, trigger: dict[str, str], action: str) -> None:
+    """Test compiling rules that turn an entity on or off at a time."""
+    result = _compile(text)
+
+    assert isinstance(result, CompiledAutomation)
+    assert result.config["triggers"] == [trigger]
+    [compiled_action] = result.config["actions"]
+    assert compiled_action["action"] == action
+    assert result.config["alias"] == "Test rule"
+    assert result.config["id"] == rule_id(result.rule)
+
+
+def test_compile_motion_light() -> None:
+    """Test compiling a motion activated light that turns off after a delay."""
+    result = _compile(
+        "When motion is detected in the hallway, turn on the hallway light "
+        "and turn it off after 5 minutes of no motion."
+    )
+
+    assert isinstance(result, CompiledAutomation)
+    assert result.template == "motion_light"
+    assert result.config == {
+        "id": rule_id(result.rule),
+        "alias": "Test rule",
+        "description": result.rule.rule_raw_text,
+        "triggers": [
+            {
+                "trigger": "state",
+                "entity_id": "binary_sensor.hallway_motion",
+                "to": "on",
+            }
+        ],
+        "actions": [
+            {"action": "light.turn_on", "target": {"entity_id": "light.hallway"}},
+            {
+                "wait_for_trigger": [
+                    {
+                        "trigger": "state",
+                        "entity_id": "binary_sensor.hallway_motion",
+                        "from": "on",
+                        "to": "off",
+                    }
+                ]
+            },
+            {"delay": {"minutes": 5}},
+            {"action": "light.turn_off", "target": {"entity_id": "light.hallway"}},
+        ],
+        "mode": "restart",
+    }
+
+
+@pytest.mark.parametrize(
+    ("text", "reason"),
+    [
+        ("Turn on the porch light at sunset on weekdays", "does not match"),
+        (
+            "Turn on the porch light at sunset and turn it off at 11 pm",
+            "does not match",
+        ),
+        ("Turn on the garage light at sunset", "'the garage light'"),
+        ("Turn on the coffee maker at 7", "am or pm"),
+        ("Turn on the porch light at 7:30", "am or pm"),
+        ("Turn on the porch light at 12:30", "am or pm"),
+        ("Turn on the coffee maker at 13 pm", "Invalid time"),
+        ("When motion is detected in the hallway, turn off the porch light", "motion"),
+    ],
+)
+def test_uncompiled(text: str, reason: str) -> None:
+    """Test rules that are left for the LLM to write."""
+    result = _compile(text)
+
+    assert isinstance(result, UncompiledRule)
+    assert reason in result.reason
+
+
+def test_compile_rules() -> None:
+    """Test compiling a list of rules with the raw text as a fallback."""
+    rules = [
+        ParsedSmartHomeRule(rule_raw_text="Turn on the porch light at sunset."),
+        ParsedSmartHomeRule(
+            rule_raw_text="Keep the house warm", core_logic_text="Heat to 70F"
+        ),
+    ]
+
+    result = compile_rules(rules, _resolve)
+
+    assert [automation.rule for automation in result.compiled] == rules[:1]
+    assert [rule.rule for rule in result.uncompiled] == rules[1:]
+    assert rule_id(rules[0]) != rule_id(rules[1])
+    assert result.uncompiled[0].as_dict()["rulebook_id"] == rule_id(rules[1])
@@ -0,0 +1,84 @@
+"""Tests for the index of the loaded automations."""
+
+from typing import Any
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.rulebook.automation_index import AutomationIndex
+
+PORCH_LIGHT = {
+    "id": "rulebook_porch",
+    "alias": "Porch light at sunset",
+    "triggers": [{"trigger": "sun", "event": "sunset"}],
+    "actions": [{"action": "light.turn_on", "target": {"entity_id": "light.porch"}}],
+}
+HALLWAY_LIGHT = {
+    "id": "hallway",
+    "alias": "Hallway motion light",
+    "triggers": [
+        {"trigger": "state", "entity_id": "binary_sensor.hallway_motion", "to": "on"}
+    ],
+    "actions": [{"action": "light.turn_on", "target": {"entity_id": "light.hallway"}}],
+}
+
+
+async def _async_reload(hass: HomeAssistant, automations: list[dict[str, Any]]) -> None:
+    """Reload the automations with a new configuration."""
+    with patch(
+        "homeassistant.config.load_yaml_config_file",
+        return_value={"automation": automations},
+    ):
+        await hass.services.async_call("automation", "reload", blocking=True)
+    await hass.async_block_till_done()
+
+
+async def test_automation_index(hass: HomeAssistant) -> None:
+    """Test looking up automations and updating the index on reload."""
+    assert await async_setup_component(
+        hass, "automation", {"automation": [PORCH_LIGHT, HALLWAY_LIGHT]}
+    )
+    await hass.async_block_till_done()
+
+    index = AutomationIndex(hass)
+    unsub = index.async_start()
+
+    [porch] = index.for_entity("light.porch")
+    assert porch.alias == "Porch light at sunset"
+    assert index.for_rulebook_id("rulebook_porch") == porch
+    assert index.for_rulebook_id("hallway") is None
+    assert index.with_trigger_type("sun") == [porch]
+    [hallway] = index.for_entity("binary_sensor.hallway_motion")
+    assert index.for_entities(["light.porch", "light.hallway"]) == [hallway, porch]
+    assert index.rulebook_automations() == [porch]
+    assert index.stats()["automations"] == 2
+
+    # Only the changed automation is updated
+    updates = index.updates
+    await _async_reload(
+        hass,
+        [
+            {
+                **PORCH_LIGHT,
+                "triggers": [{"trigger": "time", "at": "20:00:00"}],
+                "actions": [
+                    {"action": "light.turn_on", "target": {"entity_id": "light.garden"}}
+                ],
+            },
+            HALLWAY_LIGHT,
+        ],
+    )
+    assert index.updates == updates + 1
+    assert index.for_entity("light.porch") == []
+    assert index.with_trigger_type("sun") == []
+    [porch] = index.with_trigger_type("time")
+    assert index.for_entity("light.garden") == [porch]
+    assert index.for_entity("binary_sensor.hallway_motion") == [hallway]
+
+    await _async_reload(hass, [HALLWAY_LIGHT])
+    assert index.for_rulebook_id("rulebook_porch") is None
+    assert index.for_entity("light.garden") == []
+    assert index.stats()["automations"] == 1
+
+    unsub()
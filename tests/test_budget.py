@@ -0,0 +1,79 @@
+"""Tests for the prompt size budget."""
+
+import json
+from types import SimpleNamespace
+from typing import Any
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from custom_components.rulebook.agents.budget import (
+    PromptStats,
+    compact_text,
+    estimate_tokens,
+    fit_json,
+)
+
+
+def test_compact_text() -> None:
+    """Test that whitespace is removed while keeping the indentation."""
+    text = "# Rules  \n\n\n\n- Turn on the    porch light\n    - At sunset\t\n\n"
+
+    assert compact_text(text) == "# Rules\n\n- Turn on the porch light\n    - At sunset"
+
+
+def test_fit_json() -> None:
+    """Test that JSON over the budget is shortened and summarized."""
+    value: dict[str, Any] = {
+        "is_initial": True,
+        "changed_smart_home_rules": [
+            {"rule_raw_text": f"Rule {i} " + "x" * 500} for i in range(20)
+        ],
+    }
+
+    assert json.loads(fit_json(value, max_tokens=100000)) == value
+
+    # Long strings are shortened first
+    shortened = json.loads(fit_json(value, max_tokens=1500))
+    assert len(shortened["changed_smart_home_rules"]) == 20
+    assert shortened["changed_smart_home_rules"][0]["rule_raw_text"].endswith("…")
+    assert "omitted" not in shortened
+
+    # Then the items that do not fit are left out
+    summarized = fit_json(value, max_tokens=500)
+    assert estimate_tokens(summarized) <= 500
+    fitted = json.loads(summarized)
+    assert fitted["is_initial"]
+    kept = len(fitted["changed_smart_home_rules"])
+    assert 0 < kept < 20
+    assert fitted["omitted"] == {"changed_smart_home_rules": 20 - kept}
+
+
+def test_prompt_stats() -> None:
+    """Test recording the prompt size of each agent."""
+    prompt_stats = PromptStats(max_prompt_tokens=10)
+    context: Any = SimpleNamespace(agent_name="RulebookParserAgent")
+    llm_request = LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text="Parse it")])],
+        config=types.GenerateContentConfig(system_instruction="x" * 100),
+    )
+
+    llm_response = LlmResponse(
+        usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=30)
+    )
+
+    assert prompt_stats.before_model(context, llm_request) is None
+    assert prompt_stats.after_model(context, llm_response) is None
+    # Responses without usage metadata are not counted
+    assert prompt_stats.after_model(context, LlmResponse()) is None
+
+    assert prompt_stats.stats() == {
+        "RulebookParserAgent": {
+            "calls": 1,
+            "over_budget": 1,
+            "estimated_prompt_tokens": 28,
+            "max_estimated_prompt_tokens": 28,
+            "prompt_tokens": 30,
+            "total_prompt_tokens": 30,
+        }
+    }
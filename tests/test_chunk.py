@@ -0,0 +1,163 @@
+"""Tests for splitting a large rulebook into chunks."""
+
+from custom_components.rulebook.data.chunk import merge_home_details, split_rulebook
+from custom_components.rulebook.data.home import (
+    BasicInfo,
+    LocationDetails,
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+
+RULEBOOK = """# My Home
+
+## People
+
+Mario and Luigi live here.
+
+## Rules
+
+### Lights
+
+Turn on the porch light at sunset.
+
+Turn off the porch light at 11pm.
+
+### Climate
+
+Keep the living room at 70 degrees.
+"""
+
+PORCH_LIGHT_RULE = ParsedSmartHomeRule(
+    rule_raw_text="Turn on the porch light at sunset.",
+    rule_name="Porch Light at Sunset",
+    entities_mentioned=["porch light"],
+    core_logic_text="At sunset, turn on the porch light.",
+)
+CLIMATE_RULE = ParsedSmartHomeRule(
+    rule_raw_text="Keep the living room at 70 degrees.",
+    rule_name="Living Room Temperature",
+    entities_mentioned=["living room thermostat"],
+    core_logic_text="Keep the living room at 70 degrees.",
+)
+
+
+def _location(**kwargs: str | None) -> LocationDetails:
+    """Return location details with only some fields set."""
+    fields = ("description", "address", "city", "state", "country", "timezone")
+    return LocationDetails(
+        **{field: kwargs.get(field) for field in fields},
+        latitude=None,
+        longitude=None,
+    )
+
+
+def test_small_rulebook_is_not_split() -> None:
+    """Test that a rulebook that fits in a chunk is returned unchanged."""
+    assert split_rulebook(RULEBOOK, len(RULEBOOK)) == [RULEBOOK]
+
+
+def test_split_by_section() -> None:
+    """Test that sections are split with the headings they are part of."""
+    chunks = split_rulebook(RULEBOOK, 90)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 90 for chunk in chunks)
+    assert chunks[0].startswith("# My Home")
+    [climate] = [chunk for chunk in chunks if "70 degrees" in chunk]
+    assert climate.startswith("# My Home\n\n## Rules\n\n### Climate")
+    # Every line of the rulebook is in a chunk
+    for line in RULEBOOK.splitlines():
+        assert any(line in chunk for chunk in chunks)
+
+
+def test_split_large_section() -> None:
+    """Test that a section larger than a chunk is split between paragraphs."""
+    rules = [f"Rule number {i} turns on a light." for i in range(20)]
+    rulebook = "# Rules\n\n" + "\n\n".join(rules)
+
+    chunks = split_rulebook(rulebook, 200)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.startswith("# Rules\n\n") for chunk in chunks)
+    assert [rule for chunk in chunks for rule in chunk.split("\n\n")[1:]] == rules
+
+
+def test_split_ignores_code_blocks() -> None:
+    """Test that comments in a fenced code block are not section headings."""
+    rulebook = (
+        "# Rules\n\nUse this automation for the porch light.\n\n"
+        "```yaml\n# Porch light\ntriggers:\n  - trigger: sun\n```\n\n"
+        "# People\n\nMario lives here."
+    )
+
+    chunks = split_rulebook(rulebook, 120)
+
+    assert chunks[0].startswith("# Rules")
+    assert "# Porch light\ntriggers:" in chunks[0]
+    assert chunks[1] == "# People\n\nMario lives here."
+
+
+def test_merge_home_details() -> None:
+    """Test merging the details parsed from each chunk."""
+    merged = merge_home_details(
+        [
+            ParsedHomeDetails(
+                raw_text="",
+                parsed_status="completed_successfully",
+                basic_info=BasicInfo(home_name="My Home", default_language=None),
+                location_details=_location(city="Brooklyn"),
+                key_people=["Mario", "Luigi"],
+                area_mentions=["Porch"],
+                raw_smart_home_rules_text=[PORCH_LIGHT_RULE.rule_raw_text],
+                smart_home_rules=[PORCH_LIGHT_RULE],
+            ),
+            ParsedHomeDetails(
+                raw_text="",
+                parsed_status="completed_successfully",
+                location_details=_location(city="Queens", state="NY"),
+                key_people=["luigi", "Peach"],
+                area_mentions=["Living Room", "porch"],
+                raw_smart_home_rules_text=[
+                    PORCH_LIGHT_RULE.rule_raw_text,
+                    CLIMATE_RULE.rule_raw_text,
+                ],
+                smart_home_rules=[PORCH_LIGHT_RULE, CLIMATE_RULE],
+            ),
+        ],
+        RULEBOOK,
+    )
+
+    assert merged.raw_text == RULEBOOK
+    assert merged.parsed_status == "completed_successfully"
+    assert merged.error_message is None
+    assert merged.basic_info is not None
+    assert merged.basic_info.home_name == "My Home"
+    assert merged.location_details is not None
+    assert merged.location_details.city == "Brooklyn"
+    assert merged.location_details.state == "NY"
+    assert merged.key_people == ["Mario", "Luigi", "Peach"]
+    assert merged.area_mentions == ["Porch", "Living Room"]
+    assert merged.raw_smart_home_rules_text == [
+        PORCH_LIGHT_RULE.rule_raw_text,
+        CLIMATE_RULE.rule_raw_text,
+    ]
+    assert merged.smart_home_rules == [PORCH_LIGHT_RULE, CLIMATE_RULE]
+
+
+def test_merge_failed_chunk() -> None:
+    """Test that a chunk that was not parsed successfully is reported."""
+    merged = merge_home_details(
+        [
+            ParsedHomeDetails(raw_text="", parsed_status="completed_successfully"),
+            ParsedHomeDetails(
+                raw_text="", parsed_status="failed", error_message="No rules found"
+            ),
+        ],
+        RULEBOOK,
+    )
+
+    assert merged.parsed_status == "failed"
+    assert merged.error_message == "No rules found"
+    assert merged.basic_info is None
+    assert merged.location_details is None
@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import pytest
+from google.adk.runners import Runner
 from google.genai import types
 from google.genai.errors import APIError, ClientError
 from homeassistant.components import conversation
@@ -13,6 +14,8 @@ from homeassistant.core import Context, HomeAssistant
 from homeassistant.helpers import intent
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from custom_components.rulebook.const import RULEBOOK
+
 TEST_AGENT_ID = "conversation.mock_title"
 
 API_ERROR_500 = APIError(
@@ -267,3 +270,75 @@ async def test_multiple_parts(
         result.response.as_dict()["speech"]["plain"]["speech"]
         == "The capital of France is Paris."
     )
+
+
+def _text_response(text: str) -> list[types.GenerateContentResponse]:
+    """Return a model response stream with a single text part."""
+    return [
+        types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(
+                    content=types.Content(parts=[types.Part(text=text)], role="model"),
+                    finish_reason=types.FinishReason.STOP,
+                )
+            ],
+        ),
+    ]
+
+
+@pytest.mark.parametrize("expected_lingering_tasks", [True])
+async def test_runner_reused_across_turns(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    mock_send_message_stream: AsyncMock,
+) -> None:
+    """Test that one runner handles every turn and creates new conversations."""
+    mock_send_message_stream.return_value = [
+        _text_response("Hello, how can I help you?"),
+        _text_response("The porch light is on."),
+    ]
+
+    with patch.object(
+        Runner, "run_async", autospec=True, side_effect=Runner.run_async
+    ) as mock_run_async:
+        result = await conversation.async_converse(
+            hass, "Hello", None, Context(), agent_id=TEST_AGENT_ID
+        )
+        assert result.response.response_type == intent.IntentResponseType.ACTION_DONE
+
+        # The first turn created the session for the new conversation
+        session_service = config_entry.runtime_data.session_service
+        session = await session_service.get_session(
+            app_name=RULEBOOK,
+            user_id="unknown_user",
+            session_id=result.conversation_id,
+        )
+        assert session is not None
+
+        result = await conversation.async_converse(
+            hass,
+            "Is the porch light on?",
+            result.conversation_id,
+            Context(),
+            agent_id=TEST_AGENT_ID,
+        )
+        assert (
+            result.response.as_dict()["speech"]["plain"]["speech"]
+            == "The porch light is on."
+        )
+
+    [first_call, second_call] = mock_run_async.call_args_list
+    assert first_call.args[0] is second_call.args[0]
+
+
+@pytest.mark.parametrize("expected_lingering_tasks", [True])
+async def test_runner_closed_on_unload(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+) -> None:
+    """Test that the runner is closed when the config entry is unloaded."""
+    with patch.object(Runner, "close") as mock_close:
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    mock_close.assert_awaited_once()
@@ -0,0 +1,108 @@
+"""Tests for the parsed rulebook diff."""
+
+from custom_components.rulebook.data.diff import diff_home_details
+from custom_components.rulebook.data.home import (
+    LocationDetails,
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+
+from .conftest import TEST_RULEBOOK
+
+PORCH_LIGHT_RULE = ParsedSmartHomeRule(
+    rule_raw_text="Turn on the porch light at sunset.",
+    rule_name="Porch Light at Sunset",
+    entities_mentioned=["porch light", "sunset"],
+    core_logic_text="At sunset, turn on the porch light.",
+)
+PREVIOUS_RULEBOOK = ParsedHomeDetails(
+    raw_text=TEST_RULEBOOK,
+    parsed_status="completed_successfully",
+    location_details=LocationDetails(
+        description=None,
+        address="500 Smith Street",
+        city="Brooklyn",
+        state="NY",
+        country="US",
+        timezone="America/New_York",
+        latitude=40.6782,
+        longitude=-73.9442,
+    ),
+    key_people=["Mario", "Peach", "Bowser", "Luigi"],
+    area_mentions=["Kitchen", "Living Room"],
+    raw_smart_home_rules_text=[PORCH_LIGHT_RULE.rule_raw_text],
+    smart_home_rules=[PORCH_LIGHT_RULE],
+)
+
+
+def test_initial_rulebook() -> None:
+    """Test that a rulebook without a previous version is structural."""
+    rulebook_diff = diff_home_details(None, PREVIOUS_RULEBOOK)
+    assert rulebook_diff.is_structural
+    assert not rulebook_diff.is_empty
+
+
+def test_equivalent_rulebook() -> None:
+    """Test that order, case, whitespace and small coordinate changes are ignored."""
+    current = PREVIOUS_RULEBOOK.model_copy(
+        update={
+            "raw_text": TEST_RULEBOOK + "\n",
+            "key_people": ["luigi", "Bowser", "Peach ", "Mario"],
+            "area_mentions": ["living  room", "Kitchen"],
+            "location_details": LocationDetails(
+                **{
+                    **PREVIOUS_RULEBOOK.location_details.model_dump(),
+                    "latitude": 40.6785,
+                }
+            ),
+        }
+    )
+    rulebook_diff = diff_home_details(PREVIOUS_RULEBOOK, current)
+    assert rulebook_diff.is_empty
+    assert rulebook_diff.as_dict() == {}
+
+
+def test_structural_changes() -> None:
+    """Test that added areas and removed rules are structural."""
+    current = PREVIOUS_RULEBOOK.model_copy(
+        update={
+            "area_mentions": ["Kitchen", "Living Room", "Garage"],
+            "raw_smart_home_rules_text": [],
+            "smart_home_rules": [],
+        }
+    )
+    rulebook_diff = diff_home_details(PREVIOUS_RULEBOOK, current)
+    assert rulebook_diff.is_structural
+    assert rulebook_diff.as_dict() == {
+        "area_mentions": {"added": ["Garage"]},
+        "smart_home_rules": {"removed": [PORCH_LIGHT_RULE.rule_raw_text]},
+    }
+    assert rulebook_diff.describe() == [
+        "area added: Garage",
+        "1 smart home rules removed",
+    ]
+
+
+def test_reworded_rule() -> None:
+    """Test that a reworded rule needs a judgement call."""
+    reworded_rule = PORCH_LIGHT_RULE.model_copy(
+        update={"core_logic_text": "At sunset, turn on the porch light for an hour."}
+    )
+    current = PREVIOUS_RULEBOOK.model_copy(update={"smart_home_rules": [reworded_rule]})
+    rulebook_diff = diff_home_details(PREVIOUS_RULEBOOK, current)
+    assert not rulebook_diff.is_empty
+    assert not rulebook_diff.is_structural
+    assert rulebook_diff.as_dict() == {
+        "changed_smart_home_rules": [
+            {
+                "rule_raw_text": PORCH_LIGHT_RULE.rule_raw_text,
+                "changes": [
+                    {
+                        "field": "core_logic_text",
+                        "previous": "At sunset, turn on the porch light.",
+                        "current": "At sunset, turn on the porch light for an hour.",
+                    }
+                ],
+            }
+        ]
+    }
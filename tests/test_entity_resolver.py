@@ -0,0 +1,58 @@
+"""Tests for resolving entity mentions to entity ids."""
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.rulebook.entity_resolver import EntityResolver
+
+
+async def test_resolve(hass: HomeAssistant) -> None:
+    """Test resolving mentions by name, alias, area and domain."""
+    kitchen = ar.async_get(hass).async_create("Kitchen")
+    entity_reg = er.async_get(hass)
+    ceiling = entity_reg.async_get_or_create(
+        "light", "test", "ceiling", suggested_object_id="ceiling_light"
+    )
+    entity_reg.async_update_entity(
+        ceiling.entity_id, area_id=kitchen.id, aliases={"Big Light"}
+    )
+    hass.states.async_set(ceiling.entity_id, "on", {"friendly_name": "Ceiling Light"})
+    hass.states.async_set("light.porch", "off", {"friendly_name": "Porch Light"})
+    hass.states.async_set(
+        "binary_sensor.porch_motion", "off", {"friendly_name": "Porch Motion"}
+    )
+
+    resolver = EntityResolver(hass)
+    unsub = resolver.async_start()
+
+    [porch_light, *_] = resolver.resolve("the porch light")
+    assert porch_light.entity_id == "light.porch"
+    assert porch_light.score == 1.0
+    assert next(iter(resolver.resolve("porch motion"))).entity_id == (
+        "binary_sensor.porch_motion"
+    )
+    assert resolver.resolve("big light")[0].entity_id == ceiling.entity_id
+    # A mention qualified by the area matches entities in the area
+    [kitchen_light] = resolver.resolve("kitchen light")
+    assert kitchen_light.entity_id == ceiling.entity_id
+    assert kitchen_light.area == "Kitchen"
+    assert resolver.resolve("garage door") == []
+
+    resolved = resolver.resolve_all(["Porch Light", "porch light", "garage door"])
+    assert resolved["Porch Light"] == resolved["porch light"]
+    assert resolved["garage door"] == []
+
+    # The index is updated when entities are renamed, added or moved
+    hass.states.async_set("light.porch", "off", {"friendly_name": "Front Door Light"})
+    hass.states.async_set("cover.garage", "closed", {"friendly_name": "Garage Door"})
+    garage = ar.async_get(hass).async_create("Garage")
+    entity_reg.async_update_entity(ceiling.entity_id, area_id=garage.id)
+    await hass.async_block_till_done()
+
+    assert resolver.resolve("front door light")[0].entity_id == "light.porch"
+    assert resolver.resolve("garage door")[0].entity_id == "cover.garage"
+    assert resolver.resolve("kitchen light") == []
+    assert resolver.resolve("garage light")[0].entity_id == ceiling.entity_id
+
+    unsub()
@@ -0,0 +1,173 @@
+"""Tests for the parsed rulebook history."""
+
+import pathlib
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.rulebook.const import HISTORY_FILENAME, STORAGE_DIR
+from custom_components.rulebook.data.home import (
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+from custom_components.rulebook.history import (
+    RulebookHistory,
+    apply_delta,
+    diff_versions,
+)
+
+from .conftest import TEST_RULEBOOK
+
+TEST_ENTRY_ID = "test-entry-id"
+
+
+def _rulebook(version: int) -> ParsedHomeDetails:
+    """Return a parsed rulebook where one rule changes in each version."""
+    rules = [
+        ParsedSmartHomeRule(
+            rule_raw_text=f"Rule {i}",
+            rule_name=f"Rule {i} version {version if i == version % 5 else 0}",
+            entities_mentioned=["porch light"],
+        )
+        for i in range(5)
+    ]
+    return ParsedHomeDetails(
+        raw_text=TEST_RULEBOOK,
+        parsed_status="completed_successfully",
+        key_people=["Mario", "Peach"],
+        raw_smart_home_rules_text=[rule.rule_raw_text for rule in rules],
+        smart_home_rules=rules,
+    )
+
+
+def test_delta_round_trip() -> None:
+    """Test that applying a delta reconstructs the current version."""
+    previous = _rulebook(1).model_dump(mode="json")
+    current = _rulebook(2).model_dump(mode="json")
+    current["key_people"].append("Luigi")
+    current["parsed_status"] = "failed_validation"
+
+    delta = diff_versions(previous, current)
+    assert delta["fields"] == {"parsed_status": "failed_validation"}
+    assert set(delta["lists"]) == {"key_people", "smart_home_rules"}
+    assert apply_delta(previous, delta) == current
+    assert diff_versions(current, current) == {}
+
+
+def test_text_delta() -> None:
+    """Test that only the changed lines of the rulebook text are stored."""
+    previous = _rulebook(1).model_dump(mode="json")
+    current = _rulebook(1).model_dump(mode="json")
+    current["raw_text"] = previous["raw_text"].replace("Mario", "Toad")
+
+    delta = diff_versions(previous, current)
+    assert set(delta) == {"lines"}
+    assert "Smith Street" not in str(delta)
+    assert apply_delta(previous, delta) == current
+
+
+async def test_append_and_reconstruct(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test appending versions and reading any retained version."""
+    hass.config.config_dir = str(tmp_path)
+    history = RulebookHistory(hass, TEST_ENTRY_ID, keyframe_interval=3)
+
+    assert await history.async_latest() is None
+    for version in range(1, 8):
+        assert await history.async_append(_rulebook(version)) == version
+
+    # An unchanged rulebook does not add a version
+    assert await history.async_append(_rulebook(7)) == 7
+    assert history.stats() == {"versions": 7, "latest_version": 7, "keyframes": 3}
+    assert await history.async_latest() == _rulebook(7)
+    for version in range(1, 8):
+        assert await history.async_get(version) == _rulebook(version)
+    assert await history.async_get(8) is None
+
+    # A new instance reads the same history from storage
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID, keyframe_interval=3)
+    assert await reloaded.async_latest() == _rulebook(7)
+    assert await reloaded.async_get(5) == _rulebook(5)
+    assert [v["version"] for v in await reloaded.async_versions()] == list(range(1, 8))
+
+
+async def test_retention(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that only the most recent versions are retained."""
+    hass.config.config_dir = str(tmp_path)
+    history = RulebookHistory(hass, TEST_ENTRY_ID, max_versions=3)
+
+    for version in range(1, 6):
+        await history.async_append(_rulebook(version))
+
+    assert [v["version"] for v in await history.async_versions()] == [3, 4, 5]
+    assert await history.async_get(2) is None
+    assert await history.async_get(3) == _rulebook(3)
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID, max_versions=3)
+    assert await reloaded.async_get(3) == _rulebook(3)
+    assert await reloaded.async_latest() == _rulebook(5)
+
+
+async def test_truncated_record(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that a partially written record is ignored."""
+    hass.config.config_dir = str(tmp_path)
+    history = RulebookHistory(hass, TEST_ENTRY_ID)
+    await history.async_append(_rulebook(1))
+    await history.async_append(_rulebook(2))
+
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / HISTORY_FILENAME
+    content = await hass.async_add_executor_job(file_path.read_text)
+    await hass.async_add_executor_job(file_path.write_text, content[:-10])
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID)
+    assert await reloaded.async_latest() == _rulebook(1)
+    assert await reloaded.async_append(_rulebook(3)) == 2
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID)
+    assert await reloaded.async_get(1) == _rulebook(1)
+    assert await reloaded.async_latest() == _rulebook(3)
+
+
+async def test_invalid_record(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that records after an invalid record are dropped."""
+    hass.config.config_dir = str(tmp_path)
+    history = RulebookHistory(hass, TEST_ENTRY_ID)
+    for version in range(1, 4):
+        await history.async_append(_rulebook(version))
+
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / HISTORY_FILENAME
+    lines = (await hass.async_add_executor_job(file_path.read_text)).splitlines()
+    lines[1] = "{invalid"
+    await hass.async_add_executor_job(file_path.write_text, "\n".join(lines) + "\n")
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID)
+    assert await reloaded.async_latest() == _rulebook(1)
+    assert await reloaded.async_get(3) is None
+    assert await reloaded.async_append(_rulebook(4)) == 2
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID)
+    assert await reloaded.async_get(2) == _rulebook(4)
+
+
+async def test_failed_write(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that a version that fails to be written is not kept in memory."""
+    hass.config.config_dir = str(tmp_path)
+    history = RulebookHistory(hass, TEST_ENTRY_ID)
+    await history.async_append(_rulebook(1))
+
+    with (
+        patch(
+            "custom_components.rulebook.history.aio_open", side_effect=OSError("full")
+        ),
+        pytest.raises(HomeAssistantError, match="Could not write"),
+    ):
+        await history.async_append(_rulebook(2))
+
+    assert await history.async_latest() == _rulebook(1)
+    assert await history.async_append(_rulebook(3)) == 2
+
+    reloaded = RulebookHistory(hass, TEST_ENTRY_ID)
+    assert await reloaded.async_get(2) == _rulebook(3)
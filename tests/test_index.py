@@ -0,0 +1,84 @@
+"""Tests for the compiled parsed rulebook index."""
+
+import pytest
+
+from custom_components.rulebook.data.home import (
+    LocationDetails,
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+from custom_components.rulebook.data.index import RulebookIndex
+
+from .conftest import TEST_RULEBOOK
+
+PORCH_LIGHT_RULE = ParsedSmartHomeRule(
+    rule_raw_text="Turn on the porch light at sunset.",
+    rule_name="Porch Light at Sunset",
+    entities_mentioned=["porch light", "sunset"],
+)
+PORCH_MOTION_RULE = ParsedSmartHomeRule(
+    rule_raw_text="Notify Mario when there is motion on the porch at night.",
+    rule_name="Porch Motion",
+    entities_mentioned=["Porch Motion Sensor", "Mario", "mario"],
+)
+PARSED_RULEBOOK = ParsedHomeDetails(
+    raw_text=TEST_RULEBOOK,
+    parsed_status="completed_successfully",
+    location_details=LocationDetails(
+        description=None,
+        address=None,
+        city="Brooklyn",
+        state="NY",
+        country="US",
+        timezone="America/New_York",
+        latitude=None,
+        longitude=None,
+    ),
+    key_people=["Mario", "Peach", "Bowser", "Luigi"],
+    floor_mentions=["Upstairs"],
+    area_mentions=["Kitchen", "Living Room", "the kitchen"],
+    smart_home_rules=[PORCH_LIGHT_RULE, PORCH_MOTION_RULE],
+)
+
+
+def test_index() -> None:
+    """Test that names are listed once, like they are matched with Home Assistant."""
+    index = RulebookIndex(PARSED_RULEBOOK)
+
+    assert index.areas == ("Kitchen", "Living Room")
+    assert index.people == ("Mario", "Peach", "Bowser", "Luigi")
+    assert index.floors == ("Upstairs",)
+    assert index.rules == (PORCH_LIGHT_RULE, PORCH_MOTION_RULE)
+    assert index.mentions == (
+        "porch light",
+        "sunset",
+        "Porch Motion Sensor",
+        "Mario",
+    )
+    assert index.location_details == {
+        "city": "Brooklyn",
+        "state": "NY",
+        "country": "US",
+        "timezone": "America/New_York",
+    }
+
+
+def test_index_is_read_only() -> None:
+    """Test that the shared index can't be modified."""
+    index = RulebookIndex(PARSED_RULEBOOK)
+
+    with pytest.raises(AttributeError):
+        index.areas = ()
+    with pytest.raises(AttributeError):
+        index.extra = "value"
+
+
+def test_empty_rulebook() -> None:
+    """Test an index for a rulebook without any details."""
+    index = RulebookIndex(
+        ParsedHomeDetails(raw_text="", parsed_status="completed_successfully")
+    )
+
+    assert index.areas == ()
+    assert index.location_details is None
+    assert index.mentions == ()
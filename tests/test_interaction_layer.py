@@ -0,0 +1,210 @@
+"""Tests for the Home Assistant interaction layer."""
+
+import pathlib
+
+import pytest
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import area_registry as ar
+from homeassistant.setup import async_setup_component
+from homeassistant.util import yaml as yaml_util
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+from custom_components.rulebook.const import AUTOMATIONS_FILENAME
+from custom_components.rulebook.interaction_layer import (
+    ADD_PERSONS_NOTIFICATION_ID,
+    AutomationsTransaction,
+    RegistrySnapshot,
+    async_create_areas,
+    async_guide_user_to_create_person,
+    async_guide_user_to_create_persons,
+)
+
+
+async def test_registry_snapshot(hass: HomeAssistant) -> None:
+    """Test that the snapshot tracks area and person changes."""
+    area_reg = ar.async_get(hass)
+    kitchen = area_reg.async_create("Kitchen")
+    hass.states.async_set("person.mario", "home", {"friendly_name": "Mario"})
+
+    snapshot = RegistrySnapshot(hass)
+    unsub = snapshot.async_start()
+    assert snapshot.areas() == [{"name": "Kitchen", "id": kitchen.id, "aliases": []}]
+    assert snapshot.persons() == [{"name": "Mario", "id": "person.mario"}]
+    version = snapshot.version
+
+    garage = area_reg.async_create("Garage")
+    area_reg.async_update(kitchen.id, name="Cocina")
+    hass.states.async_set("person.peach", "home", {"friendly_name": "Peach"})
+    # A person changing location is not a change to the persons
+    hass.states.async_set("person.mario", "not_home", {"friendly_name": "Mario"})
+    await hass.async_block_till_done()
+
+    assert snapshot.changes_since(version) == {
+        "version": version + 3,
+        "full": False,
+        "areas": {
+            "changed": [
+                {"name": "Garage", "id": garage.id, "aliases": []},
+                {"name": "Cocina", "id": kitchen.id, "aliases": []},
+            ],
+            "removed": [],
+        },
+        "persons": {
+            "changed": [{"name": "Peach", "id": "person.peach"}],
+            "removed": [],
+        },
+    }
+
+    version = snapshot.version
+    area_reg.async_delete(garage.id)
+    hass.states.async_remove("person.peach")
+    await hass.async_block_till_done()
+
+    assert snapshot.changes_since(version) == {
+        "version": version + 2,
+        "full": False,
+        "areas": {"changed": [], "removed": [garage.id]},
+        "persons": {"changed": [], "removed": ["person.peach"]},
+    }
+    assert snapshot.changes_since(snapshot.version)["areas"] == {
+        "changed": [],
+        "removed": [],
+    }
+
+    unsub()
+    area_reg.async_create("Basement")
+    await hass.async_block_till_done()
+    assert snapshot.areas() == [{"name": "Cocina", "id": kitchen.id, "aliases": []}]
+
+
+async def test_registry_snapshot_truncated_changes(hass: HomeAssistant) -> None:
+    """Test that all items are returned when old changes were dropped."""
+    snapshot = RegistrySnapshot(hass)
+    unsub = snapshot.async_start()
+
+    for i in range(600):
+        hass.states.async_set("person.mario", "home", {"friendly_name": f"Mario {i}"})
+    await hass.async_block_till_done()
+
+    changes = snapshot.changes_since(0)
+    assert changes["full"]
+    assert changes["persons"]["changed"] == [
+        {"name": "Mario 599", "id": "person.mario"}
+    ]
+    assert not snapshot.changes_since(snapshot.version - 1)["full"]
+    unsub()
+
+
+async def test_create_areas(hass: HomeAssistant) -> None:
+    """Test creating several areas and skipping those that already exist."""
+    area_reg = ar.async_get(hass)
+    kitchen = area_reg.async_create("Kitchen")
+    lounge = area_reg.async_create("Lounge", aliases={"Living Room"})
+
+    results = await async_create_areas(
+        hass, ["kitchen", "Living Room", "Garage", "Kid's Room", "garage"]
+    )
+
+    garage = area_reg.async_get_area_by_name("Garage")
+    kids_room = area_reg.async_get_area_by_name("Kid's Room")
+    assert garage is not None
+    assert kids_room is not None
+    assert results == [
+        {"name": "kitchen", "status": "exists", "id": kitchen.id},
+        {"name": "Living Room", "status": "exists", "id": lounge.id},
+        {"name": "Garage", "status": "created", "id": garage.id},
+        {"name": "Kid's Room", "status": "created", "id": kids_room.id},
+        {"name": "garage", "status": "duplicate", "id": garage.id},
+    ]
+    assert len(area_reg.async_list_areas()) == 4
+
+
+async def test_guide_user_to_create_persons(hass: HomeAssistant) -> None:
+    """Test creating one notification for several missing persons."""
+    assert await async_setup_component(hass, "persistent_notification", {})
+    hass.states.async_set("person.mario", "home", {"friendly_name": "Mario"})
+    await async_guide_user_to_create_person(hass, "Peach")
+
+    result = await async_guide_user_to_create_persons(
+        hass, ["mario", "Peach", "Luigi", "peach"]
+    )
+
+    assert result == {
+        "status": "success",
+        "notification_id": ADD_PERSONS_NOTIFICATION_ID,
+        "persons": [
+            {"person_name": "mario", "status": "exists"},
+            {"person_name": "Peach", "status": "notified"},
+            {"person_name": "Luigi", "status": "notified"},
+            {"person_name": "peach", "status": "duplicate"},
+        ],
+    }
+    notifications = persistent_notification._async_get_or_create_notifications(hass)
+    assert list(notifications) == [ADD_PERSONS_NOTIFICATION_ID]
+    message = notifications[ADD_PERSONS_NOTIFICATION_ID]["message"]
+    assert "- Peach\n- Luigi" in message
+
+    # Calling again keeps the people that have not been added yet
+    hass.states.async_set("person.peach", "home", {"friendly_name": "Peach"})
+    await async_guide_user_to_create_persons(hass, ["Toad"])
+    assert list(notifications) == [ADD_PERSONS_NOTIFICATION_ID]
+    message = notifications[ADD_PERSONS_NOTIFICATION_ID]["message"]
+    assert "- Luigi\n- Toad" in message
+    assert "Peach" not in message
+
+    # The notification is dismissed once everyone has been added
+    hass.states.async_set("person.luigi", "home", {"friendly_name": "Luigi"})
+    hass.states.async_set("person.toad", "home", {"friendly_name": "Toad"})
+    result = await async_guide_user_to_create_persons(hass, ["Mario"])
+    assert result["notification_id"] is None
+    assert ADD_PERSONS_NOTIFICATION_ID not in notifications
+
+
+async def test_automations_transaction(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test applying automation changes with one write and one reload."""
+    hass.config.config_dir = str(tmp_path)
+    reload_calls = async_mock_service(hass, "automation", "reload")
+    file_path = tmp_path / AUTOMATIONS_FILENAME
+    porch = {"id": "rulebook_porch", "alias": "Porch", "triggers": [], "actions": []}
+    coffee = {"id": "rulebook_coffee", "alias": "Coffee", "triggers": [], "actions": []}
+
+    transaction = AutomationsTransaction(hass)
+    transaction.upsert(porch)
+    transaction.upsert(coffee)
+    result = await transaction.async_commit()
+
+    assert result == {
+        "status": "success",
+        "created": ["rulebook_porch", "rulebook_coffee"],
+        "updated": [],
+        "deleted": [],
+        "changed": True,
+        "reloaded": True,
+    }
+    assert len(reload_calls) == 1
+    content = await hass.async_add_executor_job(file_path.read_text)
+    assert yaml_util.parse_yaml(content) == [porch, coffee]
+
+    # Staging the same automations does not write the file or reload
+    transaction.upsert(porch)
+    transaction.delete("rulebook_unknown")
+    result = await transaction.async_commit()
+    assert not result["changed"]
+    assert not result["reloaded"]
+    assert len(reload_calls) == 1
+
+    transaction.upsert({**porch, "alias": "Porch light"})
+    transaction.delete("rulebook_coffee")
+    result = await transaction.async_commit()
+    assert result["updated"] == ["rulebook_porch"]
+    assert result["deleted"] == ["rulebook_coffee"]
+    assert len(reload_calls) == 2
+    content = await hass.async_add_executor_job(file_path.read_text)
+    assert yaml_util.parse_yaml(content) == [{**porch, "alias": "Porch light"}]
+
+    with pytest.raises(HomeAssistantError):
+        transaction.upsert({"alias": "No id"})
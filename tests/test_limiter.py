@@ -0,0 +1,54 @@
+"""Tests for the adaptive concurrency limiter."""
+
+import asyncio
+
+import pytest
+from google.genai.errors import ClientError
+
+from custom_components.rulebook.agents.limiter import AdaptiveConcurrencyLimiter
+
+
+async def test_limit_grows_with_healthy_requests() -> None:
+    """Test that the limit grows by one after a window of healthy requests."""
+    limiter = AdaptiveConcurrencyLimiter(max_limit=3, initial_limit=2)
+
+    for _ in range(3):
+        async with limiter.slot():
+            pass
+    assert limiter.limit == 3
+
+    # The limit does not grow past the quota of the model
+    for _ in range(10):
+        async with limiter.slot():
+            pass
+    assert limiter.limit == 3
+    assert limiter.stats()["successes"] == 13
+
+
+async def test_limit_backs_off_when_rate_limited() -> None:
+    """Test that the limit is halved once for a burst of rate limit errors."""
+    limiter = AdaptiveConcurrencyLimiter(max_limit=50, initial_limit=8)
+
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            async with limiter.slot():
+                raise ClientError(429, {"error": {"message": "Quota exceeded"}})
+
+    assert limiter.limit == 4
+    assert limiter.stats()["rate_limited"] == 3
+
+
+async def test_concurrent_requests_are_limited() -> None:
+    """Test that no more than the limit of requests run at once."""
+    limiter = AdaptiveConcurrencyLimiter(max_limit=2, initial_limit=2)
+    max_in_flight = 0
+
+    async def request() -> None:
+        nonlocal max_in_flight
+        async with limiter.slot():
+            max_in_flight = max(max_in_flight, limiter.stats()["in_flight"])
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert max_in_flight == 2
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,32 @@
+"""Tests for the model call policy."""
+
+from custom_components.rulebook.agents.policy import (
+    RULE_PARSER_POLICY,
+    LatencyTracker,
+    generate_content_config,
+)
+
+
+def test_generate_content_config() -> None:
+    """Test that the policy sets a per-call deadline and jittered retries."""
+    config = generate_content_config(RULE_PARSER_POLICY)
+
+    assert config.http_options
+    assert config.http_options.timeout == 30000
+    assert config.http_options.retry_options
+    assert config.http_options.retry_options.attempts == 3
+    assert config.http_options.retry_options.jitter
+    assert 429 in (config.http_options.retry_options.http_status_codes or [])
+
+
+def test_hedge_threshold() -> None:
+    """Test that runs are only hedged once enough latencies are known."""
+    latency_tracker = LatencyTracker()
+    for latency in range(1, 5):
+        latency_tracker.record(float(latency))
+    assert latency_tracker.hedge_threshold() is None
+
+    for latency in range(5, 21):
+        latency_tracker.record(float(latency))
+    assert latency_tracker.hedge_threshold() == 20.0
+    assert latency_tracker.stats()["samples"] == 20
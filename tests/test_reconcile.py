@@ -0,0 +1,73 @@
+"""Tests for reconciling rulebook names with Home Assistant items."""
+
+from custom_components.rulebook.data.reconcile import (
+    name_similarity,
+    normalize_name,
+    reconcile,
+)
+
+AREAS = [
+    {"name": "Kitchen", "id": "kitchen"},
+    {"name": "Lounge", "id": "lounge", "aliases": ["Living Room"]},
+    {"name": "Kids Bedroom", "id": "kids_bedroom"},
+    {"name": "Patio", "id": "patio"},
+]
+
+
+def test_normalize_name() -> None:
+    """Test names are normalized ignoring case, punctuation and articles."""
+    assert normalize_name("  The Kid's   Room! ") == "kids room"
+    assert normalize_name("living_room") == "living room"
+    assert name_similarity("kitchen", "kitchen") == 1.0
+    assert name_similarity("bedroom", "bedrooms") > 0.9
+    assert name_similarity("kitchen", "garage") < 0.5
+
+
+def test_reconcile() -> None:
+    """Test exact, alias and fuzzy matches along with missing and extra items."""
+    report = reconcile(
+        ["kitchen", "Living Room", "Kid's Bedrooms", "Garage", "Kitchen"], AREAS
+    )
+
+    assert not report.is_aligned
+    assert report.as_dict() == {
+        "aligned": False,
+        "matched": [
+            {"rulebook_name": "kitchen", "name": "Kitchen", "id": "kitchen"},
+            {
+                "rulebook_name": "Living Room",
+                "name": "Lounge",
+                "id": "lounge",
+                "aliases": ["Living Room"],
+            },
+        ],
+        "likely_matches": [
+            {
+                "rulebook_name": "Kid's Bedrooms",
+                "name": "Kids Bedroom",
+                "id": "kids_bedroom",
+                "score": 0.96,
+            },
+        ],
+        "missing_in_home_assistant": ["Garage"],
+        "missing_in_rulebook": [{"name": "Patio", "id": "patio"}],
+    }
+
+
+def test_reconcile_best_match_wins() -> None:
+    """Test that each item is matched to the most similar name."""
+    report = reconcile(
+        ["Mario", "Mario Rossi"],
+        [{"name": "Mario Rossi", "id": "person.mario"}],
+    )
+
+    assert [match.rulebook_name for match in report.matched] == ["Mario Rossi"]
+    assert report.missing == ("Mario",)
+
+
+def test_aligned() -> None:
+    """Test a report without any differences."""
+    report = reconcile(["Kitchen", "the patio"], [AREAS[0], AREAS[3]])
+
+    assert report.is_aligned
+    assert report.as_dict()["aligned"]
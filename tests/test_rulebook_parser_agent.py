@@ -0,0 +1,178 @@
+"""Tests for the rulebook parser pipeline agent."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from typing import Any
+from unittest.mock import Mock, patch
+
+from google.adk.agents import LlmAgent
+from google.adk.events.event import Event
+from google.genai import types
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.rulebook.agents.rulebook_parser_agent import (
+    _PARSED_RULEBOOK_REF_KEY,
+    PendingRulebookStore,
+    RulebookPipelineAgent,
+    RulebookStorageTool,
+    async_create_agent,
+)
+from custom_components.rulebook.data.home import ParsedHomeDetails, ParsedSmartHomeRule
+from custom_components.rulebook.storage import async_read_parsed_rulebook
+
+from .conftest import TEST_RULEBOOK
+
+SNIPPETS = ["Turn on the porch light at sunset.", "Turn off the porch light at 11pm."]
+
+
+def _response(rule_text: str) -> list[Event]:
+    """Return the events of a rule parser that parsed the rule."""
+    rule = ParsedSmartHomeRule(rule_raw_text=rule_text, rule_name=rule_text)
+    return [
+        Event(
+            author="SmartHomeRuleParserAgent",
+            content=types.Content(
+                role="model", parts=[types.Part(text=rule.model_dump_json())]
+            ),
+        )
+    ]
+
+
+async def _run_hedged(ctx: Any, agent_factory: Any, latency_tracker: Any) -> Any:
+    """Run the agent factory of a test instead of an agent."""
+    return await agent_factory()
+
+
+def _create_pipeline_agent(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> RulebookPipelineAgent:
+    """Create the rulebook pipeline agent."""
+    agent = async_create_agent(hass, config_entry)
+    assert isinstance(agent, RulebookPipelineAgent)
+    return agent
+
+
+async def test_rules_yielded_as_parsed(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> None:
+    """Test that rules are yielded as soon as each parser completes."""
+    agent = _create_pipeline_agent(hass, config_entry)
+    release = asyncio.Event()
+
+    async def slow_parser() -> list[Event]:
+        await release.wait()
+        return _response(SNIPPETS[0])
+
+    async def fast_parser() -> list[Event]:
+        return _response(SNIPPETS[1])
+
+    with patch(
+        "custom_components.rulebook.agents.rulebook_parser_agent.async_run_hedged",
+        side_effect=_run_hedged,
+    ):
+        stream = agent._async_run_rule_parsers(
+            Mock(), SNIPPETS, [([0], slow_parser), ([1], fast_parser)]
+        )
+        [(rule_index, rule)] = await anext(stream)
+        assert rule_index == 1
+        assert rule.rule_raw_text == SNIPPETS[1]
+
+        release.set()
+        [(rule_index, _)] = await anext(stream)
+        assert rule_index == 0
+        assert [rules async for rules in stream] == []
+
+
+async def test_unexpected_parser_error(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> None:
+    """Test that a parser raising an unexpected error still ends the stream."""
+    agent = _create_pipeline_agent(hass, config_entry)
+
+    async def failing_parser() -> list[Event]:
+        raise RuntimeError("Connection reset")
+
+    async def parser() -> list[Event]:
+        return _response(SNIPPETS[1])
+
+    with patch(
+        "custom_components.rulebook.agents.rulebook_parser_agent.async_run_hedged",
+        side_effect=_run_hedged,
+    ):
+        results = [
+            rules
+            async for rules in agent._async_run_rule_parsers(
+                Mock(), SNIPPETS, [([0], failing_parser), ([1], parser)]
+            )
+        ]
+
+    assert [rule_index for rules in results for rule_index, _ in rules] == [1]
+
+
+async def test_state_delta_holds_reference(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> None:
+    """Test that the session state references the pending parsed rulebook."""
+    agent = _create_pipeline_agent(hass, config_entry)
+    parsed = ParsedHomeDetails(raw_text="", parsed_status="completed_successfully")
+
+    async def parser_run_async(self: LlmAgent, ctx: Any) -> AsyncGenerator[Event]:
+        yield Event(
+            author=self.name,
+            content=types.Content(
+                role="model", parts=[types.Part(text=parsed.model_dump_json())]
+            ),
+        )
+
+    ctx = Mock()
+    ctx.invocation_id = "invocation-id"
+    ctx.session.id = "session-id"
+    with patch.object(LlmAgent, "run_async", parser_run_async):
+        stream = agent._run_async_impl(ctx)
+        async for event in stream:
+            if event.actions.state_delta:
+                break
+        await stream.aclose()
+
+    assert list(event.actions.state_delta) == [_PARSED_RULEBOOK_REF_KEY]
+    ref = event.actions.state_delta[_PARSED_RULEBOOK_REF_KEY]
+    assert ref.startswith("session-id:")
+    assert TEST_RULEBOOK not in ref
+
+    tool = RulebookStorageTool(hass, config_entry, agent.pending_rulebooks)
+    result = await tool.store_rulebook(Mock(state={_PARSED_RULEBOOK_REF_KEY: ref}))
+    assert result["success"]
+
+    stored = await async_read_parsed_rulebook(hass, config_entry.entry_id)
+    assert stored is not None
+    assert stored.raw_text == TEST_RULEBOOK
+
+
+def test_pending_rulebooks_keyed_by_session() -> None:
+    """Test that sessions parsing the same rulebook keep their own result."""
+    store = PendingRulebookStore()
+    first = ParsedHomeDetails(raw_text="", parsed_status="completed_successfully")
+    second = ParsedHomeDetails(raw_text="", parsed_status="failed")
+
+    first_ref = store.put("session-1", "hash", first)
+    second_ref = store.put("session-2", "hash", second)
+
+    assert first_ref != second_ref
+    assert store.get(first_ref) is first
+    assert store.get(second_ref) is second
+
+
+async def test_store_stale_reference(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+) -> None:
+    """Test storing a rulebook that is no longer pending, such as after a restart."""
+    tool = RulebookStorageTool(hass, config_entry, PendingRulebookStore())
+    tool_context = Mock(state={_PARSED_RULEBOOK_REF_KEY: "session-id:hash"})
+
+    result = await tool.store_rulebook(tool_context)
+
+    assert not result["success"]
+    assert "parse the rulebook again" in result["message"]
+    assert tool_context.state[_PARSED_RULEBOOK_REF_KEY] is None
+    assert await async_read_parsed_rulebook(hass, config_entry.entry_id) is None
@@ -0,0 +1,90 @@
+"""Tests for the bounded session service."""
+
+import json
+from datetime import timedelta
+
+from freezegun.api import FrozenDateTimeFactory
+from google.adk.events.event import Event
+from google.genai import types
+
+from custom_components.rulebook.session_service import BoundedInMemorySessionService
+
+APP_NAME = "rulebook"
+USER_ID = "test-user"
+
+
+async def test_least_recently_used_eviction() -> None:
+    """Test that the least recently used session is evicted."""
+    session_service = BoundedInMemorySessionService(max_sessions=2)
+    for session_id in ("session-1", "session-2"):
+        await session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=session_id
+        )
+
+    # Using the first session makes the second the least recently used
+    assert await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-3"
+    )
+
+    assert not await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-2"
+    )
+    assert await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    assert session_service.stats()["sessions"] == 2
+    assert session_service.stats()["evicted"] == 1
+
+
+async def test_idle_eviction(freezer: FrozenDateTimeFactory) -> None:
+    """Test that sessions are evicted after the idle TTL."""
+    session_service = BoundedInMemorySessionService(idle_ttl=timedelta(minutes=10))
+    await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+
+    freezer.tick(timedelta(minutes=5))
+    assert await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+
+    freezer.tick(timedelta(minutes=11))
+    assert not await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    assert session_service.stats()["sessions"] == 0
+
+
+async def test_event_limit() -> None:
+    """Test that only the most recent events of a session are kept."""
+    session_service = BoundedInMemorySessionService(max_events=3)
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    for i in range(5):
+        await session_service.append_event(
+            session,
+            Event(
+                author="user",
+                content=types.Content(role="user", parts=[types.Part(text=str(i))]),
+            ),
+        )
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    assert session
+    assert [event.content.parts[0].text for event in session.events] == ["2", "3", "4"]
+    assert session_service.stats()["events"] == 3
+    # The footprint only counts the events that are kept
+    assert session_service.stats()["memory_footprint_bytes"] == len(
+        json.dumps(session.state)
+    ) + sum(len(event.model_dump_json(exclude_none=True)) for event in session.events)
+
+    await session_service.delete_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id="session-1"
+    )
+    assert session_service.stats()["memory_footprint_bytes"] == 0
@@ -0,0 +1,25 @@
+"""Tests for the smart home rule parser agent."""
+
+from custom_components.rulebook.agents.budget import estimate_tokens
+from custom_components.rulebook.agents.smart_home_rule_parser_agent import (
+    split_rule_batches,
+)
+
+
+def test_split_rule_batches() -> None:
+    """Test that rule snippets are split by token budget and batch size."""
+    short_rule = "Turn on the porch light at sunset."
+    long_rule = "Turn on the kitchen lights when motion is detected. " * 20
+    budget = estimate_tokens(short_rule) * 3
+
+    assert split_rule_batches([], token_budget=budget, max_batch_size=10) == []
+    assert split_rule_batches(
+        [short_rule] * 4, token_budget=budget, max_batch_size=10
+    ) == [[0, 1, 2], [3]]
+    assert split_rule_batches(
+        [short_rule] * 4, token_budget=budget, max_batch_size=2
+    ) == [[0, 1], [2, 3]]
+    # A snippet over the budget is placed in a batch of its own
+    assert split_rule_batches(
+        [short_rule, long_rule, short_rule], token_budget=budget, max_batch_size=10
+    ) == [[0], [1], [2]]
@@ -0,0 +1,119 @@
+"""Tests for the SQLite session service."""
+
+import pathlib
+import sqlite3
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+from homeassistant.core import HomeAssistant
+
+from custom_components.rulebook.sqlite_session_service import SqliteSessionService
+
+from .conftest import TEST_RULEBOOK
+
+APP_NAME = "rulebook"
+USER_ID = "test-user"
+SESSION_ID = "session-1"
+PARSED_RULEBOOK = {"raw_text": TEST_RULEBOOK * 100, "key_people": ["Mario"]}
+
+
+async def test_sessions_persist(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that sessions, events and state are restored from the database."""
+    db_path = str(tmp_path / "sessions.db")
+    session_service = SqliteSessionService(hass, db_path)
+    await session_service.async_setup()
+
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    for text in ("Parse my rulebook", "Parse it again"):
+        await session_service.append_event(
+            session,
+            Event(
+                author="user",
+                content=types.Content(role="user", parts=[types.Part(text=text)]),
+                actions=EventActions(
+                    state_delta={"parsed_rulebook": PARSED_RULEBOOK, "turn": text}
+                ),
+            ),
+        )
+    await session_service.async_close()
+
+    # The large state value is stored once for the session and both events
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone() == (1,)
+
+    session_service = SqliteSessionService(hass, db_path)
+    await session_service.async_setup()
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    assert session
+    assert session.state == {
+        "parsed_rulebook": PARSED_RULEBOOK,
+        "turn": "Parse it again",
+    }
+    assert [event.content.parts[0].text for event in session.events] == [
+        "Parse my rulebook",
+        "Parse it again",
+    ]
+    assert session.events[0].actions.state_delta["parsed_rulebook"] == PARSED_RULEBOOK
+
+    listed = await session_service.list_sessions(app_name=APP_NAME, user_id=USER_ID)
+    assert [listed_session.id for listed_session in listed.sessions] == [SESSION_ID]
+
+    await session_service.delete_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    assert not await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    await session_service.async_close()
+
+
+async def test_append_to_loaded_session(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test appending an event to a session loaded back from the database."""
+    db_path = str(tmp_path / "sessions.db")
+    session_service = SqliteSessionService(hass, db_path)
+    await session_service.async_setup()
+    session = await session_service.create_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    await session_service.append_event(
+        session,
+        Event(
+            author="user",
+            content=types.Content(role="user", parts=[types.Part(text="Hello")]),
+        ),
+    )
+    await session_service.async_close()
+
+    session_service = SqliteSessionService(hass, db_path)
+    await session_service.async_setup()
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    assert session
+    footprint = session_service.stats()["memory_footprint_bytes"]
+    assert footprint > 0
+
+    await session_service.append_event(
+        session,
+        Event(
+            author="user",
+            content=types.Content(role="user", parts=[types.Part(text="Again")]),
+        ),
+    )
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
+    )
+    assert session
+    assert [event.content.parts[0].text for event in session.events] == [
+        "Hello",
+        "Again",
+    ]
+    assert session_service.stats()["memory_footprint_bytes"] > footprint
+    await session_service.async_close()
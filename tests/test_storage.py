@@ -0,0 +1,206 @@
+"""Tests for the parsed rulebook storage."""
+
+import pathlib
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.rulebook.const import PARSED_RULEBOOK_FILENAME, STORAGE_DIR
+from custom_components.rulebook.data.home import (
+    ParsedHomeDetails,
+    ParsedSmartHomeRule,
+)
+from custom_components.rulebook.storage import (
+    PARSED_RULEBOOK_VERSION,
+    StorageFormat,
+    async_get_parsed_rulebook_cache,
+    async_read_parsed_rulebook,
+    async_read_rule_parse_cache,
+    async_read_rulebook_hash,
+    async_read_rulebook_index,
+    async_write_parsed_rulebook,
+    async_write_rule_parse_cache,
+    async_write_rulebook_hash,
+    rule_parse_cache_key,
+    rulebook_text_hash,
+)
+
+from .conftest import TEST_RULEBOOK
+
+TEST_ENTRY_ID = "test-entry-id"
+
+
+async def test_read_missing_rulebook(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test reading a rulebook that was never written."""
+    hass.config.config_dir = str(tmp_path)
+
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) is None
+
+
+async def test_parsed_rulebook_cache(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test that reads are served from the cache until the file changes."""
+    hass.config.config_dir = str(tmp_path)
+    cache = async_get_parsed_rulebook_cache(hass)
+    parsed_rulebook = ParsedHomeDetails(
+        raw_text=TEST_RULEBOOK,
+        parsed_status="completed_successfully",
+        key_people=["Mario", "Peach"],
+    )
+
+    await async_write_parsed_rulebook(hass, parsed_rulebook, TEST_ENTRY_ID)
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == parsed_rulebook
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == parsed_rulebook
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 0}
+
+    # Editing the file outside of the integration invalidates the cache
+    updated_rulebook = parsed_rulebook.model_copy(
+        update={"key_people": ["Mario", "Peach", "Bowser", "Luigi"]}
+    )
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / PARSED_RULEBOOK_FILENAME
+    await hass.async_add_executor_job(
+        file_path.write_text, updated_rulebook.model_dump_json()
+    )
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == updated_rulebook
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1}
+
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == updated_rulebook
+    assert cache.stats() == {"entries": 1, "hits": 3, "misses": 1}
+
+
+async def test_parsed_rulebook_format(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test the versioned parsed rulebook file in each storage format."""
+    hass.config.config_dir = str(tmp_path)
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / PARSED_RULEBOOK_FILENAME
+    parsed_rulebook = ParsedHomeDetails(
+        raw_text=TEST_RULEBOOK,
+        parsed_status="completed_successfully",
+        key_people=["Mario", "Peach"],
+    )
+
+    sizes = {}
+    for storage_format in StorageFormat:
+        await async_write_parsed_rulebook(
+            hass, parsed_rulebook, TEST_ENTRY_ID, storage_format=storage_format
+        )
+        content = await hass.async_add_executor_job(file_path.read_text)
+        header = content.split("\n", 1)[0]
+        assert header == (
+            f'{{"version":{PARSED_RULEBOOK_VERSION},"format":"{storage_format}"}}'
+        )
+        sizes[storage_format] = len(content)
+
+        async_get_parsed_rulebook_cache(hass).invalidate(TEST_ENTRY_ID)
+        assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == parsed_rulebook
+
+    assert sizes[StorageFormat.COMPACT] < sizes[StorageFormat.PRETTY]
+    assert not list(file_path.parent.glob("*.tmp"))
+
+
+async def test_migrate_parsed_rulebook(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test that a parsed rulebook without a version header is migrated."""
+    hass.config.config_dir = str(tmp_path)
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / PARSED_RULEBOOK_FILENAME
+    file_path.parent.mkdir(parents=True)
+    parsed_rulebook = ParsedHomeDetails(
+        raw_text=TEST_RULEBOOK,
+        parsed_status="completed_successfully",
+        area_mentions=["Kitchen"],
+    )
+    await hass.async_add_executor_job(
+        file_path.write_text, parsed_rulebook.model_dump_json(indent=2)
+    )
+
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == parsed_rulebook
+    content = await hass.async_add_executor_job(file_path.read_text)
+    assert content.startswith(f'{{"version":{PARSED_RULEBOOK_VERSION},')
+
+    async_get_parsed_rulebook_cache(hass).invalidate(TEST_ENTRY_ID)
+    assert await async_read_parsed_rulebook(hass, TEST_ENTRY_ID) == parsed_rulebook
+
+
+async def test_unsupported_parsed_rulebook_version(
+    hass: HomeAssistant, tmp_path: pathlib.Path
+) -> None:
+    """Test that a file from a newer version is not read."""
+    hass.config.config_dir = str(tmp_path)
+    file_path = tmp_path / STORAGE_DIR / TEST_ENTRY_ID / PARSED_RULEBOOK_FILENAME
+    file_path.parent.mkdir(parents=True)
+    await hass.async_add_executor_job(
+        file_path.write_text,
+        f'{{"version":{PARSED_RULEBOOK_VERSION + 1}}}\n{{}}',
+    )
+
+    with pytest.raises(HomeAssistantError, match="Could not decode"):
+        await async_read_parsed_rulebook(hass, TEST_ENTRY_ID)
+
+
+async def test_rulebook_index(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test that the rulebook index is shared until the rulebook changes."""
+    hass.config.config_dir = str(tmp_path)
+
+    assert await async_read_rulebook_index(hass, TEST_ENTRY_ID) is None
+
+    parsed_rulebook = ParsedHomeDetails(
+        raw_text=TEST_RULEBOOK,
+        parsed_status="completed_successfully",
+        area_mentions=["Kitchen"],
+    )
+    await async_write_parsed_rulebook(hass, parsed_rulebook, TEST_ENTRY_ID)
+    index = await async_read_rulebook_index(hass, TEST_ENTRY_ID)
+    assert index is not None
+    assert index.areas == ("Kitchen",)
+    assert await async_read_rulebook_index(hass, TEST_ENTRY_ID) is index
+
+    updated_rulebook = parsed_rulebook.model_copy(
+        update={"area_mentions": ["Kitchen", "Garage"]}
+    )
+    await async_write_parsed_rulebook(hass, updated_rulebook, TEST_ENTRY_ID)
+    updated_index = await async_read_rulebook_index(hass, TEST_ENTRY_ID)
+    assert updated_index is not index
+    assert updated_index.areas == ("Kitchen", "Garage")
+
+
+async def test_rulebook_hash(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test reading and writing the hash of the parsed rulebook text."""
+    hass.config.config_dir = str(tmp_path)
+
+    assert await async_read_rulebook_hash(hass, TEST_ENTRY_ID) is None
+
+    rulebook_hash = rulebook_text_hash(TEST_RULEBOOK, "model:1")
+    await async_write_rulebook_hash(hass, rulebook_hash, TEST_ENTRY_ID)
+    assert await async_read_rulebook_hash(hass, TEST_ENTRY_ID) == rulebook_hash
+    assert rulebook_hash != rulebook_text_hash(TEST_RULEBOOK + "\nNew rule", "model:1")
+    assert rulebook_hash != rulebook_text_hash(TEST_RULEBOOK, "model:2")
+    assert rulebook_hash != rulebook_text_hash(TEST_RULEBOOK, "other-model:1")
+
+
+async def test_rule_parse_cache(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
+    """Test reading and writing the cache of parsed smart home rules."""
+    hass.config.config_dir = str(tmp_path)
+    rule_text = "Turn on the porch light at sunset."
+    rule = ParsedSmartHomeRule(
+        rule_raw_text=rule_text,
+        rule_name="Porch Light at Sunset",
+        entities_mentioned=["porch light", "sunset"],
+    )
+
+    assert await async_read_rule_parse_cache(hass, TEST_ENTRY_ID) == {}
+
+    key = rule_parse_cache_key(rule_text, "model-1")
+    await async_write_rule_parse_cache(hass, {key: rule}, TEST_ENTRY_ID)
+    assert await async_read_rule_parse_cache(hass, TEST_ENTRY_ID) == {key: rule}
+
+    # Case and whitespace changes share a key, while text or model changes do not
+    assert rule_parse_cache_key(f"  {rule_text}\n", "model-1") == key
+    assert rule_parse_cache_key(rule_text.upper(), "model-1") == key
+    assert rule_parse_cache_key(rule_text, "model-2") != key
+    assert rule_parse_cache_key("Turn off the porch light.", "model-1") != key